@@ -0,0 +1,216 @@
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from logging_config import logger
+
+PENDING = 'pending'
+IN_PROGRESS = 'in_progress'
+DONE = 'done'
+FAILED = 'failed'
+ABANDONED = 'abandoned'  # orphaned too many times to be tried again
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS actions (
+    id INTEGER PRIMARY KEY,
+    action TEXT NOT NULL,
+    server_url TEXT,
+    state TEXT NOT NULL,
+    enqueued_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    lease_owner TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS action_requests (
+    action_id INTEGER NOT NULL REFERENCES actions(id),
+    guild_id INTEGER,
+    user_id INTEGER,
+    requested_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS actions_by_state ON actions(state, lease_until);
+CREATE INDEX IF NOT EXISTS requests_by_action ON action_requests(action_id);
+CREATE INDEX IF NOT EXISTS requests_by_guild ON action_requests(guild_id, requested_at);
+CREATE INDEX IF NOT EXISTS requests_by_user ON action_requests(user_id, requested_at);
+"""
+
+
+class ActionStore:
+    """SQLite (WAL) record of queued server actions, their leases and results.
+
+    Writes go into an open transaction that is committed at most
+    `commit_interval` seconds later, or as soon as `max_batch` writes are
+    waiting, so enqueueing costs no fsync. A crash loses at most the
+    last interval. In-progress actions hold a lease that the queue
+    renews; an expired lease marks an action orphaned by a dead process.
+    """
+
+    def __init__(self, path, commit_interval: float = 0.05, max_batch: int = 500,
+                 lease_seconds: float = 30):
+        self.path = path
+        self.commit_interval = commit_interval
+        self.max_batch = max_batch
+        self.lease_seconds = lease_seconds
+        # Identifies this process's leases
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # With WAL, NORMAL only syncs at checkpoints and stays crash-safe
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._uncommitted = 0
+        self._commit_handle = None
+        self.stats = {'writes': 0, 'commits': 0}
+
+    def _written(self, count=1):
+        self._uncommitted += count
+        self.stats['writes'] += count
+        if self._uncommitted >= self.max_batch:
+            self.commit()
+        elif self._commit_handle is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self.commit()
+                return
+            self._commit_handle = loop.call_later(self.commit_interval, self.commit)
+
+    def commit(self):
+        """Commit the writes batched so far"""
+        if self._commit_handle is not None:
+            self._commit_handle.cancel()
+            self._commit_handle = None
+        if self._uncommitted:
+            self.conn.commit()
+            self._uncommitted = 0
+            self.stats['commits'] += 1
+
+    def enqueue(self, action, server_url, guild_id, user_id):
+        """Record a new pending action and return its id"""
+        now = time.time()
+        cursor = self.conn.execute(
+            "INSERT INTO actions (action, server_url, state, enqueued_at) VALUES (?, ?, ?, ?)",
+            (action, server_url, PENDING, now)
+        )
+        self.conn.execute(
+            "INSERT INTO action_requests (action_id, guild_id, user_id, requested_at) VALUES (?, ?, ?, ?)",
+            (cursor.lastrowid, guild_id, user_id, now)
+        )
+        self._written(2)
+        return cursor.lastrowid
+
+    def add_requester(self, action_id, guild_id, user_id):
+        """Record another caller whose request was coalesced into an action"""
+        self.conn.execute(
+            "INSERT INTO action_requests (action_id, guild_id, user_id, requested_at) VALUES (?, ?, ?, ?)",
+            (action_id, guild_id, user_id, time.time())
+        )
+        self._written()
+
+    def lease(self, action_id):
+        """Mark an action in progress under this process's lease"""
+        now = time.time()
+        self.conn.execute(
+            "UPDATE actions SET state = ?, started_at = ?, lease_owner = ?, lease_until = ?, "
+            "attempts = attempts + 1 WHERE id = ?",
+            (IN_PROGRESS, now, self.owner, now + self.lease_seconds, action_id)
+        )
+        self._written()
+
+    def renew(self, action_id):
+        """Extend the lease of an action that is still running"""
+        self.conn.execute(
+            "UPDATE actions SET lease_until = ? WHERE id = ? AND lease_owner = ?",
+            (time.time() + self.lease_seconds, action_id, self.owner)
+        )
+        self._written()
+
+    def finish(self, action_id, success: bool, result=None, error=None):
+        """Record how an action ended and release its lease"""
+        self.conn.execute(
+            "UPDATE actions SET state = ?, finished_at = ?, lease_owner = NULL, lease_until = NULL, "
+            "result = ?, error = ? WHERE id = ?",
+            (DONE if success else FAILED, time.time(),
+             json.dumps(result, default=str) if success else None, error, action_id)
+        )
+        self._written()
+
+    def recover(self, max_attempts: int, orphans_only: bool = False):
+        """Reclaim actions whose lease expired and return them with every pending action.
+
+        Orphans that already had `max_attempts` attempts are abandoned
+        instead of being tried again. With `orphans_only`, only the actions
+        reclaimed by this call are returned, not ones this process queued.
+        Returned rows are dicts with the action's requesters as
+        (guild_id, user_id) tuples, oldest first.
+        """
+        now = time.time()
+        reclaimed = [row[0] for row in self.conn.execute(
+            "SELECT id FROM actions WHERE state = ? AND lease_until < ? AND attempts < ?",
+            (IN_PROGRESS, now, max_attempts)
+        )]
+        abandoned = self.conn.execute(
+            "UPDATE actions SET state = ?, finished_at = ?, lease_owner = NULL, lease_until = NULL, "
+            "error = 'Abandoned after repeated interruptions' "
+            "WHERE state = ? AND lease_until < ? AND attempts >= ?",
+            (ABANDONED, now, IN_PROGRESS, now, max_attempts)
+        ).rowcount
+        orphaned = self.conn.execute(
+            "UPDATE actions SET state = ?, lease_owner = NULL, lease_until = NULL "
+            "WHERE state = ? AND lease_until < ?",
+            (PENDING, IN_PROGRESS, now)
+        ).rowcount
+        self.commit()
+        if abandoned or orphaned:
+            logger.warning(f"Recovered {orphaned} orphaned actions, abandoned {abandoned}")
+
+        rows = [dict(row) for row in self.conn.execute(
+            "SELECT * FROM actions WHERE state = ? ORDER BY id", (PENDING,)
+        )]
+        if orphans_only:
+            rows = [row for row in rows if row['id'] in reclaimed]
+        for row in rows:
+            row['requested_by'] = [
+                (request['guild_id'], request['user_id']) for request in self.conn.execute(
+                    "SELECT guild_id, user_id FROM action_requests WHERE action_id = ? ORDER BY rowid",
+                    (row['id'],)
+                )
+            ]
+        return rows
+
+    def next_lease_expiry(self):
+        """When the earliest lease held by another process runs out, or None"""
+        row = self.conn.execute(
+            "SELECT MIN(lease_until) FROM actions WHERE state = ? AND lease_owner != ?",
+            (IN_PROGRESS, self.owner)
+        ).fetchone()
+        return row[0]
+
+    def recent(self, guild_id=None, user_id=None, limit: int = 20):
+        """Most recent actions requested in a guild and/or by a user, newest first"""
+        conditions, params = [], []
+        if guild_id is not None:
+            conditions.append("r.guild_id = ?")
+            params.append(guild_id)
+        if user_id is not None:
+            conditions.append("r.user_id = ?")
+            params.append(user_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self.conn.execute(
+            "SELECT a.*, r.guild_id, r.user_id, r.requested_at FROM action_requests r "
+            f"JOIN actions a ON a.id = r.action_id {where} "
+            "ORDER BY r.requested_at DESC LIMIT ?",
+            (*params, limit)
+        )
+        return [dict(row) for row in rows]
+
+    def close(self):
+        self.commit()
+        self.conn.close()
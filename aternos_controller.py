@@ -1,29 +1,93 @@
 import asyncio
+import json
+import logging
+import os
 import time
-import cloudscraper
-from bs4 import BeautifulSoup
-from logging_config import logger
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+from logging_config import logger, request_dumps
+from http_fixtures import make_transport
+from server_page import STOPPED_STATES, ServerPage, parse_server_page
+from snapshot_cache import SnapshotCache
+from page_revalidator import PageRevalidator
+from metrics import HTTP_LATENCY, HTTP_REQUESTS, HTTP_RETRIES, PARSE_SECONDS, url_class
+from tracing import span
+from circuit_breaker import CircuitBreakers, CircuitOpenError, CLOSED
+from parsing import get_backend, make_soup
+from server_directory import ServerDirectory, parse_server_list
+from status_socket import StatusSocket
+from rate_limiter import (
+    AdaptiveRateLimiter,
+    backoff_delay,
+    classify_error,
+    parse_retry_after,
+    CHALLENGE,
+    CLIENT,
+    THROTTLED
+)
 from config import (
     ATERNOS_USERNAME,
     ATERNOS_PASSWORD,
+    ATERNOS_BASE_URL,
     ATERNOS_LOGIN_URL,
-    ATERNOS_SERVER_LIST_URL
+    ATERNOS_SERVER_LIST_URL,
+    SNAPSHOT_CACHE_TTL,
+    HTML_PARSER,
+    SESSION_FILE,
+    SERVER_DIRECTORY_REFRESH,
+    UPSTREAM_RATE,
+    UPSTREAM_BURST,
+    UPSTREAM_MIN_RATE,
+    UPSTREAM_MAX_RATE,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY,
+    CHALLENGE_RETRY_DELAY,
+    CONFIRM_POLL_DELAYS,
+    BREAKER_SETTINGS,
+    LOGIN_VERIFY_DELAY,
+    HTTP_RECORD_DIR,
+    HTTP_REPLAY_DIR,
+    ATERNOS_WS_ENABLED
 )
 
+@dataclass(frozen=True)
+class LoginForm:
+    """Structure of the login form, kept so re-authentication can skip scraping"""
+    action: str
+    hidden_fields: dict
+    username_field: str
+    password_field: str
+    referer: str
+
+
 class AternosController:
     def __init__(self):
-        self.scraper = cloudscraper.create_scraper(
-            browser={
-                'browser': 'firefox',
-                'platform': 'windows',
-                'mobile': False
-            },
-            delay=10
+        self.transport = make_transport(
+            HTTP_RECORD_DIR, HTTP_REPLAY_DIR, secrets=(ATERNOS_USERNAME, ATERNOS_PASSWORD)
         )
         self._setup_lock = asyncio.Lock()
         self._max_retries = 3
-        self._retry_delay = 5  # seconds
-        self.selected_server = None
+        self.breakers = CircuitBreakers(BREAKER_SETTINGS)
+        self.rate_limiter = AdaptiveRateLimiter(
+            UPSTREAM_RATE, UPSTREAM_BURST, UPSTREAM_MIN_RATE, UPSTREAM_MAX_RATE
+        )
+        self._selected_servers = {}  # guild id (None = default) -> server URL
+        self._server_locks = {}      # server URL -> asyncio.Lock
+        self._login_lock = asyncio.Lock()
+        self._login_form = None      # LoginForm found by the last full login
+        self._session_generation = 0  # bumped on every successful login
+        self.page_cache = SnapshotCache(SNAPSHOT_CACHE_TTL)
+        self.revalidator = PageRevalidator()
+        self.parser = get_backend(HTML_PARSER)
+        self.directory = ServerDirectory(self.list_servers, SERVER_DIRECTORY_REFRESH)
+        self.live_status = None
+        if ATERNOS_WS_ENABLED:
+            self.live_status = StatusSocket(lambda: self.scraper.cookies.get_dict(),
+                                            on_update=self._on_live_status)
+
+    @property
+    def scraper(self):
+        return self.transport.scraper
 
     async def initialize(self):
         """Initialize session"""
@@ -39,594 +103,594 @@ class AternosController:
             logger.error(f"Failed to initialize: {e}")
             raise
 
-    async def _make_request(self, method, url, **kwargs):
-        """Make a request with retry logic"""
-        for attempt in range(self._max_retries):
+    async def _make_request(self, method, url, idempotent: bool = None, reauth: bool = True, **kwargs):
+        """Make a request, logging in again and replaying it once if the session expired.
+
+        Every request that finds the session expired waits for the same
+        single re-login before it is replayed.
+        """
+        generation = self._session_generation
+        response = await self._send_request(method, url, idempotent, **kwargs)
+        if reauth and self._session_expired(url, response):
+            logger.warning(f"Session expired while requesting {url}, logging in again")
+            await self._reauthenticate(generation)
+            response = await self._send_request(method, url, idempotent, **kwargs)
+            if self._session_expired(url, response):
+                raise Exception("Session expired and could not be renewed")
+        return response
+
+    async def _send_request(self, method, url, idempotent: bool = None, **kwargs):
+        """Make a rate-limited request, retrying idempotent ones with backoff.
+
+        Non-idempotent requests (POSTs by default, or anything passed
+        idempotent=False such as start/stop links) are sent exactly once.
+        Raises CircuitOpenError without sending anything while the
+        circuit for this kind of request is open.
+        """
+        if idempotent is None:
+            idempotent = method.lower() == 'get'
+        attempts = self._max_retries if idempotent else 1
+        label = url_class(url)
+        breaker = self.breakers.for_url(url)
+
+        for attempt in range(attempts):
+            probe = breaker.before_request()
             try:
-                # Add common browser-like headers
-                headers = kwargs.get('headers', {})
-                headers.update({
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:123.0) Gecko/20100101 Firefox/123.0',
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
-                    'Accept-Language': 'en-US,en;q=0.9',
-                    'Accept-Encoding': 'gzip, deflate, br',
-                    'Connection': 'keep-alive',
-                    'Upgrade-Insecure-Requests': '1'
-                })
-                kwargs['headers'] = headers
-
-                if method.lower() == 'get':
-                    response = self.scraper.get(url, **kwargs)
-                else:
-                    response = self.scraper.post(url, **kwargs)
-
-                # Log response details
-                logger.debug(f"Request URL: {url}")
-                logger.debug(f"Response status: {response.status_code}")
-                logger.debug(f"Response URL: {response.url}")
-                logger.debug(f"Response headers: {dict(response.headers)}")
-
-                try:
-                    logger.debug(f"Response content: {response.text[:500]}...")
-                except:
-                    logger.debug("Could not log response content")
-
-                response.raise_for_status()
-                return response
-
-            except Exception as e:
-                logger.warning(f"Request attempt {attempt + 1} failed: {e}")
-                if attempt + 1 == self._max_retries:
-                    raise
-                await asyncio.sleep(self._retry_delay)
+                await self.rate_limiter.acquire(url)
+                started = time.perf_counter()
+                with span('http.request', method=method.upper(), url_class=label, attempt=attempt + 1) as attempt_span:
+                    try:
+                        # Add common browser-like headers
+                        headers = kwargs.get('headers', {})
+                        headers.update({
+                            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:123.0) Gecko/20100101 Firefox/123.0',
+                            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
+                            'Accept-Language': 'en-US,en;q=0.9',
+                            'Accept-Encoding': 'gzip, deflate, br',
+                            'Connection': 'keep-alive',
+                            'Upgrade-Insecure-Requests': '1'
+                        })
+                        kwargs['headers'] = headers
+
+                        # The blocking cloudscraper call runs on the transport's
+                        # thread pool, so concurrent commands overlap their waits
+                        response = await self.transport.request(method, url, **kwargs)
+                        HTTP_LATENCY.observe(time.perf_counter() - started, url_class=label)
+                        HTTP_REQUESTS.inc(url_class=label, status=response.status_code)
+                        attempt_span.set(status=response.status_code)
+
+                        # Log response details; full dumps only for a sample of requests
+                        logger.debug(f"Request {method.upper()} {url} -> {response.status_code} ({response.url})")
+                        if logger.isEnabledFor(logging.DEBUG) and request_dumps.sample():
+                            logger.debug(f"Response headers: {dict(response.headers)}")
+                            # Slice the raw bytes instead of decoding the whole body
+                            snippet = response.content[:500].decode('utf-8', 'replace')
+                            logger.debug(f"Response content: {snippet}...")
+
+                        response.raise_for_status()
+                        self.rate_limiter.on_success(url)
+                        breaker.record_success()
+                        return response
+
+                    except Exception as e:
+                        kind = classify_error(e)
+                        attempt_span.set(error_class=kind)
+                        if kind == CLIENT:
+                            # A 4xx is about the request, not upstream health
+                            breaker.record_ignored()
+                        else:
+                            breaker.record_failure()
+                        if getattr(e, 'response', None) is None:
+                            # No response at all: count the failure here
+                            HTTP_REQUESTS.inc(url_class=label, status=kind)
+                        retry_after = None
+                        if kind in (THROTTLED, CHALLENGE):
+                            response = getattr(e, 'response', None)
+                            if response is not None:
+                                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                            self.rate_limiter.on_throttled(url, retry_after)
+
+                        logger.warning(f"Request attempt {attempt + 1} failed ({kind}): {e}")
+                        if attempt + 1 == attempts or kind == CLIENT:
+                            raise
+                        if retry_after is not None and retry_after > RETRY_MAX_DELAY:
+                            # Waiting that long would tie up the command; let it fail
+                            raise
+
+                        HTTP_RETRIES.inc(url_class=label, kind=kind)
+                        base = CHALLENGE_RETRY_DELAY if kind == CHALLENGE else RETRY_BASE_DELAY
+                        delay = backoff_delay(attempt, base, RETRY_MAX_DELAY, retry_after)
+            finally:
+                # Also reached when the attempt is cancelled, so a half-open
+                # breaker is never left waiting on a probe that will not finish
+                if probe:
+                    breaker.release_probe()
+            # Backoff happens between attempt spans
+            await asyncio.sleep(delay)
 
     async def login(self):
         """Login to Aternos"""
         try:
             await self.initialize()
+            form = await self._scrape_login_form()
+            # Remembered so that re-authentication can skip the scraping
+            self._login_form = form
 
-            logger.info("Accessing homepage to find signup/login links...")
-            homepage_url = "https://aternos.org/:en/"
-            homepage_response = await self._make_request('get', homepage_url)
-            homepage_soup = BeautifulSoup(homepage_response.text, 'html.parser')
-            
-            # Look for the mod-signup class that contains login links
-            signup_mod = homepage_soup.find(class_="mod-signup")
-            
-            login_link = None
-            if signup_mod:
-                logger.info("Found mod-signup section")
-                # Look for login link
-                links = signup_mod.find_all('a')
-                for link in links:
-                    if 'login' in link.get_text().lower() or 'login' in link.get('href', '').lower():
-                        login_link = link.get('href')
-                        logger.info(f"Found login link: {login_link}")
-                        break
-            
-            if not login_link:
-                logger.warning("Could not find login link in mod-signup, using default login URL")
-                login_link = ATERNOS_LOGIN_URL
-            
-            # Make sure it's a full URL
-            if not login_link.startswith('http'):
-                login_link = f"https://aternos.org{login_link}"
-            
-            logger.info(f"Navigating to login page: {login_link}")
-            response = await self._make_request('get', login_link)
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # Based on the HTML content, find the login form
-            # The form might be in different structures, so we'll try multiple approaches
-            # Find all login form divs
-            form_divs = soup.find_all("div", class_="login-form")
-
-            if not form_divs:
-                logger.error("Could not find login form")
-                raise Exception("Login form not found")
-
-            # Since find_all() returns a list, pick the first form if multiple exist
-            form = form_divs[0]
-
-            # Find username and password inputs
-            username_input = form.find("input", class_="username")  # Username field
-            password_input = form.find("input", class_="password")  # Password field
-
-            if not username_input or not password_input:
-                logger.error("Could not find username/password inputs")
-                logger.debug(f"Form HTML: {form.prettify()}")
-                raise Exception("Login form elements not found")
-
-            # Get the form action URL
-            form_action = form.get('action', '')
-            if form_action:
-                if not form_action.startswith('http'):
-                    form_action = f"https://aternos.org{form_action}"
-            else:
-                form_action = ATERNOS_LOGIN_URL
-
-            # Extract hidden fields
-            hidden_inputs = {}
-            for hidden in form.find_all("input", type="hidden"):
-                name = hidden.get('name')
-                value = hidden.get('value', '')
-                if name:
-                    hidden_inputs[name] = value
-                    logger.debug(f"Found hidden input: {name}={value}")
-
-            # Submit login form
-            logger.info("Submitting login form...")
-            headers = {
-                'Content-Type': 'application/x-www-form-urlencoded',
-                'Origin': 'https://aternos.org',
-                'Referer': response.url
-            }
-
-            login_data = {
-                **hidden_inputs,
-                username_input.get('name', 'user'): ATERNOS_USERNAME,
-                password_input.get('name', 'password'): ATERNOS_PASSWORD,
-                'remember': 'true'
-            }
-            
-            logger.debug(f"Login data keys: {login_data.keys()}")
-            
-            login_response = await self._make_request(
-                'post',
-                form_action,
-                data=login_data,
-                headers=headers,
-                allow_redirects=True
-            )
-
-            # Save cookies after login
-            self.scraper.cookies.update(login_response.cookies)
-            
-            # Wait briefly before verifying
-            await asyncio.sleep(2)
-
-            # Verify login by accessing server list
-            logger.info("Verifying login...")
-            verify_response = await self._make_request('get', ATERNOS_SERVER_LIST_URL)
-            
-            # Check if logged in by looking for signs of logged-in state
-            if 'logout' in verify_response.text.lower() or 'account' in verify_response.text.lower():
+            if await self._submit_login(form):
                 logger.info("Successfully logged into Aternos")
                 return True
-            else:
-                logger.error("Login verification failed")
-                raise Exception("Login verification failed")
+            logger.error("Login verification failed")
+            raise Exception("Login verification failed")
 
         except Exception as e:
             logger.error(f"Login failed: {e}")
             raise
 
-    async def select_server(self, server_name: str = None):
-        """Select a server from the list by name"""
-        try:
-            # Get the server list page
-            response = await self._make_request('get', ATERNOS_SERVER_LIST_URL)
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # Try different selectors for server cards based on the HTML snippet
-            server_cards = []
-            
-            # Try different selectors
-            selectors = [
-                'div.server',
-                '.servercardlist div',
-                'a[href^="/server/"]',
-                'div[data-id]'  # From the HTML it appears servers have data-id
-            ]
-            
-            for selector in selectors:
-                server_cards = soup.select(selector)
-                if server_cards:
-                    logger.debug(f"Found {len(server_cards)} server cards using selector: {selector}")
+    async def _scrape_login_form(self):
+        """Find the login form via the homepage and return its structure"""
+        logger.info("Accessing homepage to find signup/login links...")
+        homepage_url = f"{ATERNOS_BASE_URL}/:en/"
+        homepage_response = await self._make_request('get', homepage_url)
+        homepage_soup = make_soup(homepage_response.text, self.parser)
+        
+        # Look for the mod-signup class that contains login links
+        signup_mod = homepage_soup.find(class_="mod-signup")
+        
+        login_link = None
+        if signup_mod:
+            logger.info("Found mod-signup section")
+            # Look for login link
+            links = signup_mod.find_all('a')
+            for link in links:
+                if 'login' in link.get_text().lower() or 'login' in link.get('href', '').lower():
+                    login_link = link.get('href')
+                    logger.info(f"Found login link: {login_link}")
                     break
-            
-            if not server_cards:
-                # If no servers found with selectors, try looking for server information directly
-                server_headers = soup.find_all(['h2', 'h3', 'div'], string=lambda s: s and "#" in s)
-                if server_headers:
-                    server_cards = server_headers
-                    logger.debug(f"Found {len(server_cards)} server headers")
-            
-            if not server_cards:
-                # Last resort: look for any element with server IDs or names
-                for tag in soup.find_all(['div', 'a', 'span']):
-                    if tag.get('data-id') or (tag.text and "#" in tag.text):
-                        server_cards.append(tag)
-
-            if not server_cards:
-                raise Exception("No servers found")
-
-            selected = None
-            actual_name = None
-            server_id = None
-            
-            if server_name:
-                # Find server by name in various attributes and content
-                for card in server_cards:
-                    card_text = card.get_text(strip=True)
-                    title = card.get('title', '').strip()
-                    
-                    # Check various places where the name might be
-                    potential_names = [
-                        title,
-                        card_text,
-                        card.get('data-name', ''),
-                        card.get('id', '')
-                    ]
-                    
-                    if any(server_name.lower() in name.lower() for name in potential_names if name):
-                        selected = card
-                        actual_name = next((name for name in potential_names if name), "Unknown")
-                        logger.debug(f"Found matching server: {actual_name}")
-                        break
-
-                if not selected:
-                    raise Exception(f"Server '{server_name}' not found")
-            else:
-                # Select first server
-                selected = server_cards[0]
-                actual_name = (
-                    selected.get('title', '') or 
-                    selected.get_text(strip=True) or 
-                    selected.get('data-name', 'Unknown Server')
+        
+        if not login_link:
+            logger.warning("Could not find login link in mod-signup, using default login URL")
+            login_link = ATERNOS_LOGIN_URL
+        
+        # Make sure it's a full URL
+        if not login_link.startswith('http'):
+            login_link = f"{ATERNOS_BASE_URL}{login_link}"
+        
+        logger.info(f"Navigating to login page: {login_link}")
+        response = await self._make_request('get', login_link)
+        soup = make_soup(response.text, self.parser)
+
+        # Based on the HTML content, find the login form
+        # The form might be in different structures, so we'll try multiple approaches
+        # Find all login form divs
+        form_divs = soup.find_all("div", class_="login-form")
+
+        if not form_divs:
+            logger.error("Could not find login form")
+            raise Exception("Login form not found")
+
+        # Since find_all() returns a list, pick the first form if multiple exist
+        form = form_divs[0]
+
+        # Find username and password inputs
+        username_input = form.find("input", class_="username")  # Username field
+        password_input = form.find("input", class_="password")  # Password field
+
+        if not username_input or not password_input:
+            logger.error("Could not find username/password inputs")
+            logger.debug(f"Form HTML: {form.prettify()}")
+            raise Exception("Login form elements not found")
+
+        # Get the form action URL
+        form_action = form.get('action', '')
+        if form_action:
+            if not form_action.startswith('http'):
+                form_action = f"{ATERNOS_BASE_URL}{form_action}"
+        else:
+            form_action = ATERNOS_LOGIN_URL
+
+        # Extract hidden fields
+        hidden_inputs = {}
+        for hidden in form.find_all("input", type="hidden"):
+            name = hidden.get('name')
+            value = hidden.get('value', '')
+            if name:
+                hidden_inputs[name] = value
+                logger.debug(f"Found hidden input: {name}={value}")
+
+        return LoginForm(
+            action=form_action,
+            hidden_fields=hidden_inputs,
+            username_field=username_input.get('name', 'user'),
+            password_field=password_input.get('name', 'password'),
+            referer=response.url
+        )
+
+    async def _submit_login(self, form):
+        """Post the credentials through a login form; returns whether the session works"""
+        logger.info("Submitting login form...")
+        headers = {
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'Origin': ATERNOS_BASE_URL,
+            'Referer': form.referer
+        }
+
+        login_data = {
+            **form.hidden_fields,
+            form.username_field: ATERNOS_USERNAME,
+            form.password_field: ATERNOS_PASSWORD,
+            'remember': 'true'
+        }
+        
+        logger.debug(f"Login data keys: {login_data.keys()}")
+        
+        login_response = await self._make_request(
+            'post',
+            form.action,
+            data=login_data,
+            headers=headers,
+            allow_redirects=True
+        )
+
+        # Save cookies after login
+        self.scraper.cookies.update(login_response.cookies)
+        
+        # Wait briefly before verifying
+        await asyncio.sleep(LOGIN_VERIFY_DELAY)
+
+        # Verify login by accessing server list
+        logger.info("Verifying login...")
+        verify_response = await self._make_request('get', ATERNOS_SERVER_LIST_URL, reauth=False)
+        if not self._is_logged_in(verify_response):
+            return False
+        self._session_generation += 1
+        self.save_session()
+        return True
+
+    async def _reauthenticate(self, generation):
+        """Log in again after the session expired; concurrent callers share one login"""
+        async with self._login_lock:
+            if self._session_generation != generation:
+                # Someone else logged in again while we waited for the lock
+                return
+            if self._login_form:
+                try:
+                    if await self._submit_login(self._login_form):
+                        logger.info("Re-authenticated with the cached login form")
+                        return
+                except CircuitOpenError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Re-login with the cached form failed: {e}")
+                # Hidden fields may have expired with the session
+                logger.info("Cached login form was rejected, scraping a fresh one")
+            await self.login()
+
+    def _session_expired(self, url, response):
+        """Whether a response shows that we are no longer logged in"""
+        if url_class(url) in ('login', 'home'):
+            return False
+        # Expired sessions are redirected to the login page
+        if urlsplit(response.url).path.startswith('/go'):
+            return True
+        # The server list always shows the account menu to a logged-in user
+        return url_class(url) == 'server_list' and not self._is_logged_in(response)
+
+    def _is_logged_in(self, response):
+        """Check a response for signs of a logged-in session"""
+        # Expired sessions are redirected to the login page
+        if response.url.endswith('/go/'):
+            return False
+        text = response.text.lower()
+        return 'logout' in text or 'account' in text
+
+    def save_session(self):
+        """Persist the cookie jar (session and Cloudflare clearance) to SESSION_FILE"""
+        if not SESSION_FILE:
+            return
+        cookies = [
+            {
+                'name': cookie.name,
+                'value': cookie.value,
+                'domain': cookie.domain,
+                'path': cookie.path,
+                'expires': cookie.expires,
+                'secure': cookie.secure,
+            }
+            for cookie in self.scraper.cookies
+        ]
+        try:
+            # Per process: controller workers may save at the same time
+            tmp_path = f"{SESSION_FILE}.{os.getpid()}.tmp"
+            # The file holds live credentials, keep it private to this user
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'saved_at': time.time(), 'cookies': cookies}, f)
+            os.replace(tmp_path, SESSION_FILE)
+            logger.info(f"Saved session with {len(cookies)} cookies to {SESSION_FILE}")
+        except OSError as e:
+            logger.warning(f"Could not save session: {e}")
+
+    def load_session(self):
+        """Load cookies saved by save_session(); returns False if there are none"""
+        if not SESSION_FILE or not os.path.exists(SESSION_FILE):
+            return False
+        try:
+            with open(SESSION_FILE) as f:
+                saved = json.load(f)
+            now = time.time()
+            loaded = 0
+            for cookie in saved.get('cookies', []):
+                if cookie.get('expires') and cookie['expires'] < now:
+                    continue
+                self.scraper.cookies.set(
+                    cookie['name'],
+                    cookie['value'],
+                    domain=cookie.get('domain', ''),
+                    path=cookie.get('path', '/'),
+                    expires=cookie.get('expires'),
+                    secure=cookie.get('secure', False)
                 )
-                logger.debug(f"Selected default server: {actual_name}")
+                loaded += 1
+            logger.info(f"Loaded {loaded} cookies from {SESSION_FILE}")
+            return loaded > 0
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Could not load saved session: {e}")
+            return False
+
+    async def restore_session(self):
+        """Reuse a saved session if it is still valid, with a single request"""
+        if not self.load_session():
+            return False
+        try:
+            response = await self._make_request('get', ATERNOS_SERVER_LIST_URL, reauth=False)
+            if self._is_logged_in(response):
+                self._session_generation += 1
+                logger.info("Restored saved Aternos session")
+                return True
+            logger.info("Saved session has expired")
+        except Exception as e:
+            logger.warning(f"Could not validate saved session: {e}")
+        self.scraper.cookies.clear()
+        return False
 
-            # Try to get server ID using different methods
-            server_id = (
-                selected.get('data-id') or 
-                selected.get('href', '').split('/')[-1] if selected.name == 'a' else None
-            )
-            
-            # If no ID found, try to extract from text (e.g., "#NXQg3wb6jW304RtI")
-            if not server_id and '#' in selected.get_text():
-                text = selected.get_text()
-                hash_index = text.find('#')
-                if hash_index >= 0:
-                    potential_id = text[hash_index+1:].strip()
-                    # Take the first "word" after # as ID
-                    server_id = potential_id.split()[0] if ' ' in potential_id else potential_id
-            
-            if not server_id:
-                # If still no ID, look for any child elements that might contain the ID
-                for child in selected.find_all():
-                    if child.get('data-id'):
-                        server_id = child.get('data-id')
-                        break
-                    elif child.get('href') and '/server/' in child.get('href'):
-                        server_id = child.get('href').split('/')[-1]
-                        break
-            
-            if not server_id:
-                raise Exception("Could not find server ID")
-
-            self.selected_server = f"https://aternos.org/server/{server_id}"
-            logger.info(f"Successfully selected server: {actual_name}")
+    async def ensure_logged_in(self):
+        """Restore the saved session, falling back to a full login"""
+        if await self.restore_session():
             return True
+        return await self.login()
+
+    async def list_servers(self):
+        """Fetch the server list page and return its servers as ServerEntry objects"""
+        response = await self._make_request('get', ATERNOS_SERVER_LIST_URL)
+        with span('parse.server_list'), PARSE_SECONDS.time(page='server_list'):
+            entries = parse_server_list(response.text, self.parser, ATERNOS_SERVER_LIST_URL)
+        if not entries:
+            raise Exception("No servers found")
+        return entries
+
+    async def select_server(self, server_name: str = None, guild_id=None):
+        """Select a server by name or id for one guild and return its ServerEntry"""
+        try:
+            if not self.directory.entries:
+                await self.directory.refresh()
+
+            entry = self.directory.lookup(server_name)
+            if not entry and server_name:
+                # The server may have been created since the last refresh
+                await self.directory.refresh()
+                entry = self.directory.lookup(server_name)
+
+            if not entry:
+                raise Exception(f"Server '{server_name}' not found")
+
+            self._selected_servers[guild_id] = entry.url
+            logger.info(f"Successfully selected server: {entry.name} (guild {guild_id})")
+            return entry
 
         except Exception as e:
             logger.error(f"Failed to select server: {e}")
             raise
 
-    async def get_server_status(self):
-        """Get current server status"""
-        try:
-            if not self.selected_server:
-                # If no server is selected, try to select the first one
-                await self.select_server()
-                if not self.selected_server:
-                    raise Exception("No server selected and couldn't auto-select one")
-
-            response = await self._make_request('get', self.selected_server)
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # Based on HTML, try different status element selectors
-            status_selectors = [
-                '.status', 
-                '.server-status', 
-                '.statuslabel-label',
-                'div:contains("Offline")',  # From the attached HTML
-                'div[class*="status"]',
-                '.statusicon',
-                'div.status-label'
-            ]
-            
-            status_element = None
-            for selector in status_selectors:
+    async def server_for(self, guild_id=None):
+        """Return the guild's selected server URL, auto-selecting the first server"""
+        server_url = self._selected_servers.get(guild_id)
+        if not server_url:
+            entry = await self.select_server(guild_id=guild_id)
+            if not entry:
+                raise Exception("No server selected and couldn't auto-select one")
+            server_url = entry.url
+        return server_url
+
+    async def get_all_status_pages(self, concurrency: int):
+        """Status of every server from one server list fetch plus bounded page fetches.
+
+        Returns (entry, page, error) tuples in server list order; see
+        get_status_pages().
+        """
+        entries = await self.directory.refresh_or_last()
+        with span('aternos.status_all', servers=len(entries)):
+            return await self.get_status_pages(entries, concurrency)
+
+    async def get_status_pages(self, entries, concurrency: int):
+        """Status of the given server list entries.
+
+        Servers whose card already shows them stopped are answered from the
+        card; the others are looked up with get_status_page(), at most
+        `concurrency` at a time. Returns (entry, page, error) tuples in
+        the order given, with page None when the lookup failed.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def status_of(entry):
+            if entry.status and entry.status.lower() in STOPPED_STATES:
+                return entry, ServerPage(url=entry.url, status=entry.status), None
+            async with semaphore:
                 try:
-                    if selector.startswith('div:contains'):
-                        # Special case for contains selector
-                        text = selector.split('"')[1]
-                        for div in soup.find_all('div'):
-                            if text in div.get_text():
-                                status_element = div
-                                break
-                    else:
-                        status_element = soup.select_one(selector)
-                    
-                    if status_element:
-                        logger.debug(f"Found status element with selector: {selector}")
-                        break
+                    return entry, await self.get_status_page(entry.url), None
                 except Exception as e:
-                    logger.debug(f"Selector {selector} failed: {e}")
-            
-            if status_element:
-                status_text = status_element.get_text(strip=True)
-                logger.info(f"Server status: {status_text}")
-                return status_text
-            
-            # If we couldn't find a status element with specific classes,
-            # look for common status text in the page
-            for status_text in ["Offline", "Online", "Starting", "Stopping", "In Queue"]:
-                if soup.find(string=lambda s: s and status_text in s):
-                    logger.info(f"Found status text: {status_text}")
-                    return status_text
-            
-            # Last resort - check for start/stop buttons to infer status
-            start_button = soup.find('a', class_='btn-start') or soup.find('a', class_='start')
-            stop_button = soup.find('a', class_='btn-stop') or soup.find('a', class_='stop')
-            
-            if stop_button and not start_button:
-                return "Online"
-            elif start_button and not stop_button:
-                return "Offline"
-            
-            logger.warning("Status element not found")
-            return "Status unavailable"
+                    logger.error(f"Failed to get status of {entry.name}: {e}")
+                    return entry, None, e
+
+        return await asyncio.gather(*(status_of(entry) for entry in entries))
+
+    def _server_lock(self, server_url):
+        """Actions on one server are serialized; different servers run concurrently"""
+        lock = self._server_locks.get(server_url)
+        if lock is None:
+            lock = self._server_locks[server_url] = asyncio.Lock()
+        return lock
+
+    async def _fetch_server_page(self, server_url):
+        response = await self._make_request(
+            'get', server_url, headers=self.revalidator.conditional_headers(server_url)
+        )
+        return self.revalidator.page_from(
+            server_url, response, lambda html: parse_server_page(html, server_url, self.parser)
+        )
 
+    async def get_server_page(self, server_url: str = None, max_age: float = None):
+        """Get a server page (default: the default selection) as a ServerPage.
+
+        Snapshots younger than `max_age` (default: the cache TTL) are served
+        from the cache; concurrent callers share a single fetch.
+        """
+        try:
+            server_url = server_url or await self.server_for()
+            return await self.page_cache.get(
+                server_url,
+                lambda: self._fetch_server_page(server_url),
+                max_age=max_age
+            )
+        except Exception as e:
+            logger.error(f"Failed to fetch server page: {e}")
+            raise
+
+    def _on_live_status(self, old_page, new_page):
+        if old_page is None or old_page.status != new_page.status:
+            # The buttons on the cached HTML page no longer match the state
+            self.page_cache.invalidate(new_page.url)
+
+    async def get_status_page(self, server_url: str = None, max_age: float = None):
+        """Latest status snapshot: the websocket push when connected, else the HTML page.
+
+        Pushed snapshots carry no start/stop links; use get_server_page()
+        before acting on a server. While the circuit is open the last
+        cached snapshot is returned, however old.
+        """
+        server_url = server_url or await self.server_for()
+        if self.live_status:
+            page = self.live_status.page(server_url)
+            if page is not None:
+                return page
+        try:
+            return await self.get_server_page(server_url, max_age=max_age)
+        except Exception as e:
+            # Also covers the request whose failure tripped the breaker
+            tripped = isinstance(e, CircuitOpenError) or self.breakers.for_url(server_url).state != CLOSED
+            stale = self.page_cache.peek(server_url)
+            if stale is None or not tripped:
+                raise
+            logger.info(f"Circuit open, serving {stale.age:.0f}s old snapshot of {server_url}")
+            return stale
+
+    def peek_status_page(self, server_url):
+        """Last known status snapshot without any upstream request, or None"""
+        if self.live_status:
+            page = self.live_status.page(server_url)
+            if page is not None:
+                return page
+        return self.page_cache.peek(server_url)
+
+    async def wait_for_status_change(self, server_url, timeout: float):
+        """Sleep up to `timeout` seconds, waking early when the websocket pushes news"""
+        if self.live_status and self.live_status.connected:
+            await self.live_status.wait_for_update(server_url, timeout)
+        else:
+            await asyncio.sleep(timeout)
+
+    async def get_server_status(self, page: ServerPage = None, server_url: str = None):
+        """Get current server status, reusing `page` when the caller already has one"""
+        try:
+            if page is None:
+                page = await self.get_status_page(server_url)
+            logger.info(f"Server status: {page.status}")
+            return page.status
         except Exception as e:
             logger.error(f"Failed to get server status: {e}")
             raise
 
-    async def start_server(self):
-        """Start the Minecraft server"""
+    async def _trigger_action(self, action, action_url, server_url):
+        """Request a start/stop URL and follow the confirmation link if one appears"""
+        logger.info(f"Requesting server {action} with URL: {action_url}")
         try:
-            if not self.selected_server:
-                # If no server is selected, try to select the first one
-                await self.select_server()
-                if not self.selected_server:
-                    raise Exception("No server selected and couldn't auto-select one")
-
-            # First, check if the server is already running
-            current_status = await self.get_server_status()
-            if current_status.lower() in ["online", "starting", "in queue"]:
-                logger.info(f"Server is already {current_status}, no need to start")
-                return False
-
-            response = await self._make_request('get', self.selected_server)
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # Try multiple approaches to find start button
-            start_button = None
-            
-            # 1. Look for start button by class
-            start_selectors = [
-                'a.btn-start', 
-                'a.start', 
-                'div.start', 
-                'button.start',
-                'a:contains("Start")',
-                'button:contains("Start")'
-            ]
-            
-            for selector in start_selectors:
-                try:
-                    if ':contains' in selector:
-                        # Handle contains selector
-                        tag_type = selector.split(':')[0]
-                        text = selector.split('"')[1]
-                        for elem in soup.find_all(tag_type):
-                            if text in elem.get_text():
-                                start_button = elem
-                                break
-                    else:
-                        start_button = soup.select_one(selector)
-                    
-                    if start_button:
-                        logger.debug(f"Found start button with selector: {selector}")
-                        break
-                except Exception as e:
-                    logger.debug(f"Selector {selector} failed: {e}")
-            
-            # 2. Look for any element with text "Start" or href containing "start"
-            if not start_button:
-                for a in soup.find_all('a'):
-                    href = a.get('href', '')
-                    if 'start' in href.lower() or 'start' in a.get_text().lower():
-                        start_button = a
-                        break
-            
-            # 3. Look for any buttons with text "Start"
-            if not start_button:
-                for button in soup.find_all(['button', 'input', 'div']):
-                    if 'start' in button.get_text().lower():
-                        start_button = button
-                        break
-
-            if start_button:
-                # Get the start URL
-                start_url = None
-                if start_button.name == 'a':
-                    start_url = start_button.get('href')
-                elif start_button.get('onclick'):
-                    # Try to extract URL from onclick attribute
-                    onclick = start_button.get('onclick')
-                    if 'window.location' in onclick and 'http' in onclick:
-                        start_url = onclick.split("'")[1] if "'" in onclick else onclick.split('"')[1]
-                
-                if not start_url:
-                    # Try data attributes 
-                    start_url = start_button.get('data-href') or start_button.get('data-url')
-                
-                if not start_url:
-                    # Last resort: look for form with action
-                    form = start_button.find_parent('form')
-                    if form and form.get('action'):
-                        start_url = form.get('action')
-                
-                if not start_url:
-                    # If still no URL, try AJAX approach
-                    logger.info("No direct URL found, using default start endpoint")
-                    start_url = f"{self.selected_server}/start"
-                
-                if not start_url.startswith('http'):
-                    start_url = f"https://aternos.org{start_url}"
-
-                # Make the request to start the server
-                logger.info(f"Starting server with URL: {start_url}")
-                await self._make_request('get', start_url)
-                
-                # Sometimes Aternos requires confirmation
-                await asyncio.sleep(2)
-                confirm_response = await self._make_request('get', self.selected_server)
-                confirm_soup = BeautifulSoup(confirm_response.text, 'html.parser')
-                
-                # Look for confirm button
-                confirm_button = confirm_soup.find(string=lambda s: s and "Confirm" in s)
-                if confirm_button:
-                    confirm_element = confirm_button.parent
-                    confirm_url = confirm_element.get('href')
-                    if confirm_url:
-                        if not confirm_url.startswith('http'):
-                            confirm_url = f"https://aternos.org{confirm_url}"
-                        await self._make_request('get', confirm_url)
-                        logger.info("Confirmed server start")
-                
-                logger.info("Server start initiated")
-                return True
+            # Action links change server state, so they are never retried blindly
+            await self._make_request('get', action_url, idempotent=False)
+            self.page_cache.invalidate(server_url)
+
+            # Sometimes Aternos requires confirmation. Check early and back
+            # off, stopping as soon as the confirm link or the new state shows.
+            for delay in CONFIRM_POLL_DELAYS:
+                await asyncio.sleep(delay)
+                confirm_page = await self.get_server_page(server_url, max_age=0)
+                if confirm_page.confirm_url:
+                    await self._make_request('get', confirm_page.confirm_url, idempotent=False)
+                    logger.info(f"Confirmed server {action}")
+                    break
+                if confirm_page.is_running if action == 'start' else confirm_page.is_stopped:
+                    break
+        finally:
+            # Whatever we cached before (or during) the action is stale now
+            self.page_cache.invalidate(server_url)
+
+    async def _run_action(self, action, page, server_url):
+        """Run a start/stop action under the server's lock; returns False if not applicable"""
+        if page is None:
+            page = await self.get_server_page(server_url)
+        lock = self._server_lock(page.url)
+        contended = lock.locked()
+        async with lock:
+            if contended:
+                # Another action on this server finished while we waited
+                page = await self.get_server_page(page.url, max_age=0)
+
+            if action == 'start':
+                # First, check if the server is already running
+                if page.is_running:
+                    logger.info(f"Server is already {page.status}, no need to start")
+                    return False
+                if not page.start_url:
+                    logger.warning("Start button not found - server might be already running")
+                    return False
+                await self._trigger_action('start', page.start_url, page.url)
             else:
-                logger.warning("Start button not found - server might be already running")
-                return False
+                # First, check if the server is already stopped
+                if page.is_stopped:
+                    logger.info(f"Server is already {page.status}, no need to stop")
+                    return False
+                if not page.stop_url:
+                    logger.warning("Stop button not found - server might be already stopped")
+                    return False
+                await self._trigger_action('stop', page.stop_url, page.url)
+            return True
 
+    async def start_server(self, page: ServerPage = None, server_url: str = None):
+        """Start the Minecraft server"""
+        try:
+            started = await self._run_action('start', page, server_url)
+            if started:
+                logger.info("Server start initiated")
+            return started
         except Exception as e:
             logger.error(f"Failed to start server: {e}")
             raise
 
-    async def stop_server(self):
+    async def stop_server(self, page: ServerPage = None, server_url: str = None):
         """Stop the Minecraft server"""
         try:
-            if not self.selected_server:
-                # If no server is selected, try to select the first one
-                await self.select_server()
-                if not self.selected_server:
-                    raise Exception("No server selected and couldn't auto-select one")
-            
-            # First, check if the server is already stopped
-            current_status = await self.get_server_status()
-            if current_status.lower() in ["offline", "stopping"]:
-                logger.info(f"Server is already {current_status}, no need to stop")
-                return False
-
-            response = await self._make_request('get', self.selected_server)
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # Try multiple approaches to find stop button
-            stop_button = None
-            
-            # 1. Look for stop button by class
-            stop_selectors = [
-                'a.btn-stop', 
-                'a.stop', 
-                'div.stop', 
-                'button.stop',
-                'a:contains("Stop")',
-                'button:contains("Stop")'
-            ]
-            
-            for selector in stop_selectors:
-                try:
-                    if ':contains' in selector:
-                        # Handle contains selector
-                        tag_type = selector.split(':')[0]
-                        text = selector.split('"')[1]
-                        for elem in soup.find_all(tag_type):
-                            if text in elem.get_text():
-                                stop_button = elem
-                                break
-                    else:
-                        stop_button = soup.select_one(selector)
-                    
-                    if stop_button:
-                        logger.debug(f"Found stop button with selector: {selector}")
-                        break
-                except Exception as e:
-                    logger.debug(f"Selector {selector} failed: {e}")
-            
-            # 2. Look for any element with text "Stop" or href containing "stop"
-            if not stop_button:
-                for a in soup.find_all('a'):
-                    href = a.get('href', '')
-                    if 'stop' in href.lower() or 'stop' in a.get_text().lower():
-                        stop_button = a
-                        break
-            
-            # 3. Look for any buttons with text "Stop"
-            if not stop_button:
-                for button in soup.find_all(['button', 'input', 'div']):
-                    if 'stop' in button.get_text().lower():
-                        stop_button = button
-                        break
-
-            if stop_button:
-                # Get the stop URL
-                stop_url = None
-                if stop_button.name == 'a':
-                    stop_url = stop_button.get('href')
-                elif stop_button.get('onclick'):
-                    # Try to extract URL from onclick attribute
-                    onclick = stop_button.get('onclick')
-                    if 'window.location' in onclick and 'http' in onclick:
-                        stop_url = onclick.split("'")[1] if "'" in onclick else onclick.split('"')[1]
-                
-                if not stop_url:
-                    # Try data attributes 
-                    stop_url = stop_button.get('data-href') or stop_button.get('data-url')
-                
-                if not stop_url:
-                    # Last resort: look for form with action
-                    form = stop_button.find_parent('form')
-                    if form and form.get('action'):
-                        stop_url = form.get('action')
-                
-                if not stop_url:
-                    # If still no URL, try AJAX approach
-                    logger.info("No direct URL found, using default stop endpoint")
-                    stop_url = f"{self.selected_server}/stop"
-                
-                if not stop_url.startswith('http'):
-                    stop_url = f"https://aternos.org{stop_url}"
-
-                # Make the request to stop the server
-                logger.info(f"Stopping server with URL: {stop_url}")
-                await self._make_request('get', stop_url)
-                
-                # Sometimes Aternos requires confirmation
-                await asyncio.sleep(2)
-                confirm_response = await self._make_request('get', self.selected_server)
-                confirm_soup = BeautifulSoup(confirm_response.text, 'html.parser')
-                
-                # Look for confirm button
-                confirm_button = confirm_soup.find(string=lambda s: s and "Confirm" in s)
-                if confirm_button:
-                    confirm_element = confirm_button.parent
-                    confirm_url = confirm_element.get('href')
-                    if confirm_url:
-                        if not confirm_url.startswith('http'):
-                            confirm_url = f"https://aternos.org{confirm_url}"
-                        await self._make_request('get', confirm_url)
-                        logger.info("Confirmed server stop")
-                
+            stopped = await self._run_action('stop', page, server_url)
+            if stopped:
                 logger.info("Server stop initiated")
-                return True
-            else:
-                logger.warning("Stop button not found - server might be already stopped")
-                return False
-
+            return stopped
         except Exception as e:
             logger.error(f"Failed to stop server: {e}")
             raise
@@ -634,6 +698,9 @@ class AternosController:
     async def cleanup(self):
         """Clean up browser resources"""
         try:
-            self.scraper.close()
+            self.directory.stop()
+            if self.live_status:
+                self.live_status.stop()
+            self.transport.close()
         except Exception as e:
             logger.error(f"Error during cleanup: {e}")
\ No newline at end of file
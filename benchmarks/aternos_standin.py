@@ -0,0 +1,277 @@
+"""Local stand-in for the parts of aternos.org the controller scrapes.
+
+Usage: python benchmarks/aternos_standin.py [--port N] [--servers N]
+                                            [--latency MS] [--failure-rate R]
+
+Serves the homepage, the login form, the server list, server pages and
+the start/stop/confirm endpoints. Servers move through the same states
+as on Aternos (Offline -> In Queue -> Starting -> Online -> Stopping ->
+Offline) on a timer. Every response is delayed by --latency (with
+jitter), and a --failure-rate share of them fails with a 503. Point the
+bot at it with ATERNOS_BASE_URL=http://127.0.0.1:PORT.
+
+The status websocket is served on /hermes/: it sends every server's
+status on connect and again whenever one changes. Enable it in the bot
+with ATERNOS_WS_ENABLED=true ATERNOS_WS_URL=ws://127.0.0.1:PORT/hermes/.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from aiohttp import web
+
+USERNAME = 'standin'
+PASSWORD = 'standin'
+SESSION_COOKIE = 'ATERNOS_SESSION'
+
+HOMEPAGE = '''<!DOCTYPE html><html><head><title>Aternos</title></head><body>
+<div class="mod-signup"><a href="/signup/">Sign up</a><a href="/go/">Login</a></div>
+</body></html>'''
+
+LOGIN_PAGE = '''<!DOCTYPE html><html><head><title>Login | Aternos</title></head><body>
+<div class="login-form">
+<input type="hidden" name="token" value="{token}">
+<input type="text" class="username" name="user">
+<input type="password" class="password" name="password">
+</div></body></html>'''
+
+SERVER_LIST = '''<!DOCTYPE html><html><head><title>Servers | Aternos</title></head><body>
+<header><a href="/account/">Account</a><a href="/go/?logout">Logout</a></header>
+<div class="servercardlist">{cards}</div></body></html>'''
+
+SERVER_CARD = '''<div class="server" data-id="{id}" title="{name}">
+<div class="server-name">{name}</div><div class="server-id">#{id}</div>
+<div class="statuslabel-label">{status}</div></div>'''
+
+SERVER_PAGE = '''<!DOCTYPE html><html><head><title>{name} | Aternos</title></head><body>
+<header><a href="/account/">Account</a><a href="/go/?logout">Logout</a></header>
+<div class="status {css}"><div class="status-label"><span class="statuslabel-label">{label}</span></div></div>
+<div class="server-ip">{name}.aternos.me</div>
+<div class="server-players">Players: {players}/20</div>
+{queue}
+<a href="/server/{id}/start" class="btn btn-start start"{start_hidden}>Start</a>
+<a href="/server/{id}/stop" class="btn btn-stop stop"{stop_hidden}>Stop</a>
+{confirm}
+</body></html>'''
+
+HIDDEN = ' style="display:none"'
+
+# How often the websocket checks for status changes to push
+PUSH_INTERVAL = 0.05
+
+
+class StandinServer:
+    """One simulated server and its state machine"""
+
+    def __init__(self, server_id, name, transition):
+        self.id = server_id
+        self.name = name
+        self.transition = transition
+        self.status = 'Offline'
+        self.changed_at = time.monotonic()
+        self.confirmed = False
+
+    def advance(self):
+        """Move along the state machine as time passes"""
+        elapsed = time.monotonic() - self.changed_at
+        if elapsed < self.transition:
+            return
+        following = {
+            'In Queue': 'Starting' if self.confirmed else None,
+            'Starting': 'Online',
+            'Stopping': 'Offline',
+        }.get(self.status)
+        if following:
+            self.set(following)
+
+    def set(self, status):
+        self.status = status
+        self.changed_at = time.monotonic()
+
+    def status_frame(self):
+        """The websocket frame Aternos pushes for this server's status"""
+        message = {
+            'id': self.id,
+            'name': self.name,
+            'label': self.status,
+            'class': self.status.lower().replace(' ', '-'),
+            'players': random.randint(0, 5) if self.status == 'Online' else 0,
+            'max': 20,
+            'address': f"{self.name}.aternos.me",
+        }
+        if self.status == 'In Queue':
+            message['queue'] = {'position': 3, 'count': 120}
+        return json.dumps({'type': 'status', 'message': json.dumps(message)})
+
+    def render(self):
+        self.advance()
+        running = self.status in ('Online', 'Starting', 'In Queue')
+        queued = self.status == 'In Queue'
+        return SERVER_PAGE.format(
+            id=self.id,
+            name=self.name,
+            css=self.status.lower().replace(' ', '-'),
+            label=self.status,
+            players=random.randint(0, 5) if self.status == 'Online' else 0,
+            queue='<div class="queue-time">In queue: #3 of 120</div>' if queued else '',
+            start_hidden=HIDDEN if running else '',
+            stop_hidden='' if running else HIDDEN,
+            confirm=(f'<a href="/panel/ajax/confirm.php?server={self.id}" class="btn">Confirm now</a>'
+                     if queued and not self.confirmed else ''),
+        )
+
+
+class AternosStandin:
+    def __init__(self, servers: int = 3, latency: float = 0.05, failure_rate: float = 0.0,
+                 transition: float = 2.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.servers = {
+            f"standin{i:04d}": StandinServer(f"standin{i:04d}", f"server{i}", transition)
+            for i in range(servers)
+        }
+        self.requests = Counter()  # route name -> requests served
+        self.app = web.Application(middlewares=[self._middleware])
+        self.app.router.add_get('/', self.homepage)
+        self.app.router.add_get('/:en/', self.homepage)
+        self.app.router.add_get('/go/', self.login_page)
+        self.app.router.add_post('/go/', self.login)
+        self.app.router.add_get('/server/', self.server_list)
+        self.app.router.add_get('/server/{id}', self.server_page)
+        self.app.router.add_get('/server/{id}/{action:start|stop}', self.action)
+        self.app.router.add_get('/panel/ajax/confirm.php', self.confirm)
+        self.app.router.add_get('/hermes/', self.hermes)
+        self.sockets = set()
+        self._runner = None
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        route = request.match_info.route.resource
+        self.requests[route.canonical if route else request.path] += 1
+        if self.latency:
+            await asyncio.sleep(random.uniform(0.5, 1.5) * self.latency)
+        if random.random() < self.failure_rate:
+            return web.Response(status=503, text="Service unavailable")
+        return await handler(request)
+
+    def _logged_in(self, request):
+        return request.cookies.get(SESSION_COOKIE) == 'standin-session'
+
+    def _require_login(self, request):
+        if not self._logged_in(request):
+            raise web.HTTPFound('/go/')
+
+    async def homepage(self, request):
+        return web.Response(text=HOMEPAGE, content_type='text/html')
+
+    async def login_page(self, request):
+        return web.Response(text=LOGIN_PAGE.format(token=random.randrange(1 << 32)),
+                            content_type='text/html')
+
+    async def login(self, request):
+        form = await request.post()
+        if form.get('user') != USERNAME or form.get('password') != PASSWORD:
+            return web.json_response({'success': False, 'error': 'Wrong credentials'})
+        response = web.json_response({'success': True})
+        response.set_cookie(SESSION_COOKIE, 'standin-session', path='/')
+        return response
+
+    async def server_list(self, request):
+        self._require_login(request)
+        for server in self.servers.values():
+            server.advance()
+        cards = ''.join(SERVER_CARD.format(id=s.id, name=s.name, status=s.status)
+                        for s in self.servers.values())
+        return web.Response(text=SERVER_LIST.format(cards=cards), content_type='text/html')
+
+    def _server(self, server_id):
+        server = self.servers.get(server_id)
+        if server is None:
+            raise web.HTTPNotFound()
+        return server
+
+    async def server_page(self, request):
+        self._require_login(request)
+        return web.Response(text=self._server(request.match_info['id']).render(),
+                            content_type='text/html')
+
+    async def action(self, request):
+        self._require_login(request)
+        server = self._server(request.match_info['id'])
+        server.advance()
+        if request.match_info['action'] == 'start' and server.status == 'Offline':
+            server.confirmed = False
+            server.set('In Queue')
+        elif request.match_info['action'] == 'stop' and server.status in ('Online', 'Starting'):
+            server.set('Stopping')
+        return web.json_response({'success': True})
+
+    async def confirm(self, request):
+        self._require_login(request)
+        server = self._server(request.query.get('server'))
+        server.confirmed = True
+        return web.json_response({'success': True})
+
+    async def hermes(self, request):
+        """Push status frames: all servers on connect, then every change"""
+        if not self._logged_in(request):
+            raise web.HTTPForbidden()
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.sockets.add(ws)
+        sent = {}  # server id -> status last pushed
+        try:
+            while not ws.closed:
+                for server in self.servers.values():
+                    server.advance()
+                    if sent.get(server.id) != server.status:
+                        sent[server.id] = server.status
+                        await ws.send_str(server.status_frame())
+                await asyncio.sleep(PUSH_INTERVAL)
+        except ConnectionResetError:
+            pass
+        finally:
+            self.sockets.discard(ws)
+        return ws
+
+    async def drop_sockets(self):
+        """Close every websocket, as when the connection to Aternos drops"""
+        for ws in list(self.sockets):
+            await ws.close()
+
+    async def start(self, host='127.0.0.1', port=0):
+        """Start serving; returns the base URL"""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{port}"
+
+    async def stop(self):
+        await self.drop_sockets()
+        if self._runner:
+            await self._runner.cleanup()
+
+
+async def _serve(args):
+    standin = AternosStandin(args.servers, args.latency / 1000, args.failure_rate, args.transition)
+    base_url = await standin.start(args.host, args.port)
+    print(f"Aternos stand-in on {base_url} (user '{USERNAME}', password '{PASSWORD}')")
+    await asyncio.Event().wait()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8800)
+    parser.add_argument('--servers', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=50, help='mean response delay in ms')
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--transition', type=float, default=2.0, help='seconds per state change')
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,81 @@
+"""Measure durable action queue throughput.
+
+Usage: python benchmarks/bench_action_store.py [--actions N] [--commit-interval S]
+                                               [--db PATH]
+
+Pushes N actions through the SQLite store directly (enqueue, lease,
+finish) and then through ServerActionQueue with a no-op handler, and
+reports actions per second for both. Every action targets its own
+server so nothing is coalesced. The database defaults to a temporary
+file that is removed afterwards.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault('DISCORD_TOKEN', 'benchmark')
+os.environ.setdefault('ATERNOS_USERNAME', 'benchmark')
+os.environ.setdefault('ATERNOS_PASSWORD', 'benchmark')
+os.environ.update({'LOG_LEVEL': 'WARNING', 'LOG_FILE': os.devnull})
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from action_store import ActionStore  # noqa: E402
+from queue_manager import ServerActionQueue  # noqa: E402
+
+
+async def bench_store(store, count):
+    started = time.perf_counter()
+    ids = [store.enqueue('start', f"server{i}", 1, i % 50) for i in range(count)]
+    enqueued = time.perf_counter()
+    for action_id in ids:
+        store.lease(action_id)
+        store.finish(action_id, True, result=True)
+    store.commit()
+    finished = time.perf_counter()
+    return count / (enqueued - started), count / (finished - enqueued)
+
+
+async def bench_queue(store, count, workers):
+    queue = ServerActionQueue(workers=workers, store=store)
+
+    async def handler(item):
+        return True
+
+    queue.register('start', handler)
+    started = time.perf_counter()
+    futures = [queue.add_action('start', 1, i % 50, f"queued{i}") for i in range(count)]
+    await asyncio.gather(*futures)
+    store.commit()
+    return count / (time.perf_counter() - started)
+
+
+async def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ActionStore(args.db or os.path.join(tmp, 'queue.db'), args.commit_interval)
+        enqueue_rate, complete_rate = await bench_store(store, args.actions)
+        queue_rate = await bench_queue(store, args.actions, args.workers)
+
+        started = time.perf_counter()
+        recent = store.recent(guild_id=1, user_id=7, limit=20)
+        query_ms = (time.perf_counter() - started) * 1000
+
+        print(f"store enqueue:        {enqueue_rate:10.0f} actions/s")
+        print(f"store lease + finish: {complete_rate:10.0f} actions/s")
+        print(f"queue end to end:     {queue_rate:10.0f} actions/s ({args.workers} workers)")
+        print(f"recent() for a user:  {query_ms:10.2f} ms ({len(recent)} rows of {2 * args.actions})")
+        print(f"{store.stats['writes']} writes in {store.stats['commits']} commits")
+        store.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--actions', type=int, default=10000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--commit-interval', type=float, default=0.05)
+    parser.add_argument('--db', help='database file (default: a temporary one)')
+    asyncio.run(main(parser.parse_args()))
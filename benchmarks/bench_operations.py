@@ -0,0 +1,126 @@
+"""Time controller operations offline against recorded HTTP fixtures.
+
+Usage: python benchmarks/bench_operations.py [--fixtures DIR] [--rounds N]
+                                             [--json OUT] [--compare BASELINE]
+
+Each operation runs against a fresh AternosController whose transport
+replays the fixture directory of the same name, so no network (and no
+Aternos account) is needed. The script reports the median and p95
+latency per operation plus the peak and retained memory allocated by
+one traced run. --json writes the results for later runs to --compare
+against, e.g. between two commits.
+
+The bundled fixtures are synthetic. Record real ones by running the bot
+with HTTP_RECORD_DIR set; credentials are scrubbed on the way to disk.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# Benchmark settings, applied before config is imported: no pacing, no
+# fixed sleeps, no session file and no log noise
+os.environ.setdefault('DISCORD_TOKEN', 'benchmark')
+os.environ.setdefault('ATERNOS_USERNAME', 'benchmark')
+os.environ.setdefault('ATERNOS_PASSWORD', 'benchmark')
+os.environ.update({
+    'UPSTREAM_RATE': '1000000', 'UPSTREAM_BURST': '1000000', 'UPSTREAM_MAX_RATE': '1000000',
+    'CONFIRM_POLL_DELAYS': '0', 'LOGIN_VERIFY_DELAY': '0', 'ATERNOS_SESSION_FILE': '',
+    'LOG_LEVEL': 'WARNING', 'LOG_FILE': os.devnull,
+})
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aternos_controller import AternosController  # noqa: E402
+from http_fixtures import ReplayTransport  # noqa: E402
+
+FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures'
+SERVER_URL = 'https://aternos.org/server/NXQg3wb6jW304RtI'
+
+
+def _format_status_message(page):
+    # Imported lazily: main pulls in discord.py
+    from main import format_status_message
+    return format_status_message(page)
+
+
+async def _status_format(controller):
+    return _format_status_message(await controller.get_status_page(SERVER_URL))
+
+# Operation name -> (fixture directory, coroutine function taking the controller)
+OPERATIONS = {
+    'login': ('login', lambda c: c.login()),
+    'select_server': ('select_server', lambda c: c.select_server('myserver')),
+    'get_server_status': ('get_server_status', lambda c: c.get_server_status(server_url=SERVER_URL)),
+    'start_server': ('start_server', lambda c: c.start_server(server_url=SERVER_URL)),
+    'stop_server': ('stop_server', lambda c: c.stop_server(server_url=SERVER_URL)),
+    'status_format': ('get_server_status', _status_format),
+}
+
+
+def _controller(transport):
+    controller = AternosController()
+    controller.transport = transport
+    return controller
+
+
+async def _run_once(operation, transport):
+    transport.rewind()
+    controller = _controller(transport)
+    started = time.perf_counter()
+    await operation(controller)
+    return time.perf_counter() - started
+
+
+async def bench(fixtures: Path, rounds: int):
+    results = {}
+    for name, (fixture_dir, operation) in OPERATIONS.items():
+        transport = ReplayTransport(fixtures / fixture_dir)
+        # Warm-up round: imports, selector compilation and lazy setup
+        await _run_once(operation, transport)
+        timings = sorted([await _run_once(operation, transport) for _ in range(rounds)])
+
+        tracemalloc.start()
+        await _run_once(operation, transport)
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        results[name] = {
+            'median_ms': statistics.median(timings) * 1000,
+            'p95_ms': timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000,
+            'peak_kib': peak / 1024,
+            'retained_kib': retained / 1024,
+        }
+    return results
+
+
+def report(results, baseline=None):
+    print(f"{'operation':20} {'median ms':>10} {'p95 ms':>10} {'peak KiB':>10} {'kept KiB':>10}")
+    for name, result in results.items():
+        line = (f"{name:20} {result['median_ms']:10.3f} {result['p95_ms']:10.3f} "
+                f"{result['peak_kib']:10.1f} {result['retained_kib']:10.1f}")
+        previous = (baseline or {}).get(name)
+        if previous and previous['median_ms']:
+            change = (result['median_ms'] / previous['median_ms'] - 1) * 100
+            line += f"   {change:+.1f}% vs baseline"
+        print(line)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fixtures', type=Path, default=FIXTURES_DIR)
+    parser.add_argument('--rounds', type=int, default=50)
+    parser.add_argument('--json', type=Path, help='write results to this file')
+    parser.add_argument('--compare', type=Path, help='results file from an earlier run')
+    args = parser.parse_args()
+
+    results = asyncio.run(bench(args.fixtures, args.rounds))
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+    report(results, baseline)
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=1))
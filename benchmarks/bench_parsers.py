@@ -0,0 +1,70 @@
+"""Compare the HTML parser backends on saved server pages.
+
+Usage: python benchmarks/bench_parsers.py [--pages DIR] [--rounds N]
+
+Every *.html file in the pages directory is parsed into a ServerPage by
+each available backend. The script checks that all backends extract the
+same snapshot and prints the median and best parse time per page.
+"""
+import argparse
+import logging
+import statistics
+import sys
+import time
+from dataclasses import asdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from parsing import BACKENDS, get_backend  # noqa: E402
+from server_page import parse_server_page  # noqa: E402
+
+PAGES_DIR = Path(__file__).resolve().parent / 'pages'
+
+
+def _snapshot_fields(page):
+    fields = asdict(page)
+    fields.pop('fetched_at')
+    return fields
+
+
+def bench(pages_dir: Path, rounds: int):
+    # Per-parse debug logging would dominate the timings
+    logging.getLogger('minecraft_bot').setLevel(logging.WARNING)
+    pages = sorted(pages_dir.glob('*.html'))
+    if not pages:
+        sys.exit(f"No *.html pages found in {pages_dir}")
+
+    backends = [get_backend(name) for name in BACKENDS]
+    print(f"{'page':32} {'backend':12} {'median ms':>10} {'best ms':>10}")
+    mismatches = 0
+    for path in pages:
+        html = path.read_text(encoding='utf-8')
+        url = 'https://aternos.org/server/benchmark'
+        results = {}
+        for backend in backends:
+            timings = []
+            for _ in range(rounds):
+                started = time.perf_counter()
+                page = parse_server_page(html, url, backend)
+                timings.append((time.perf_counter() - started) * 1000)
+            results[backend.name] = _snapshot_fields(page)
+            print(f"{path.name:32} {backend.name:12} "
+                  f"{statistics.median(timings):10.3f} {min(timings):10.3f}")
+
+        reference = results['html.parser']
+        for name, fields in results.items():
+            if fields != reference:
+                mismatches += 1
+                print(f"  ! {name} disagrees with html.parser: {fields} != {reference}")
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=Path, default=PAGES_DIR)
+    parser.add_argument('--rounds', type=int, default=50)
+    args = parser.parse_args()
+    bench(args.pages, args.rounds)
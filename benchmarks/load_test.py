@@ -0,0 +1,220 @@
+"""Drive the slash command handlers from many guilds and users at once.
+
+Usage: python benchmarks/load_test.py [--guilds N] [--users M] [--commands K]
+                                      [--mix status=8,start=1,stop=1]
+                                      [--latency MS] [--failure-rate R]
+
+Starts the local Aternos stand-in (or uses --base-url), logs the
+controller in, then lets every (guild, user) pair run K commands back to
+back through the real command callbacks in main.py with fake
+interactions. Reports throughput, latency percentiles per command and
+upstream requests per command (amplification). Upstream pacing is
+disabled unless UPSTREAM_* is set in the environment.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+os.environ.setdefault('DISCORD_TOKEN', 'load-test')
+os.environ.setdefault('ATERNOS_USERNAME', 'standin')
+os.environ.setdefault('ATERNOS_PASSWORD', 'standin')
+for name in ('UPSTREAM_RATE', 'UPSTREAM_BURST', 'UPSTREAM_MAX_RATE'):
+    os.environ.setdefault(name, '1000000')
+os.environ.setdefault('ATERNOS_SESSION_FILE', '')
+os.environ.setdefault('LOGIN_VERIFY_DELAY', '0')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+os.environ.setdefault('STATUS_FOLLOW_TIMEOUT', '30')
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+class FakeRole:
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeUser:
+    def __init__(self, user_id, roles):
+        self.id = user_id
+        self.name = f"user{user_id}"
+        self.roles = roles
+
+
+class FakeMessage:
+    def __init__(self, interaction, content):
+        self.interaction = interaction
+        self.content = content
+
+    async def edit(self, content=None, **kwargs):
+        self.content = content
+        self.interaction.messages.append(content)
+        return self
+
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self.interaction = interaction
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def defer(self, **kwargs):
+        self._done = True
+
+    async def send_message(self, content=None, **kwargs):
+        self._done = True
+        self.interaction.messages.append(content)
+
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self.interaction = interaction
+
+    async def send(self, content=None, **kwargs):
+        self.interaction.messages.append(content)
+        return FakeMessage(self.interaction, content)
+
+
+class FakeInteraction:
+    """The parts of discord.Interaction the command handlers use"""
+    _ids = 0
+
+    def __init__(self, guild_id, user_id, admin_role):
+        FakeInteraction._ids += 1
+        self.id = FakeInteraction._ids
+        self.guild_id = guild_id
+        self.user = FakeUser(user_id, [FakeRole(admin_role)])
+        self.messages = []
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+
+    @property
+    def failed(self):
+        return any(m and m.startswith("❌") for m in self.messages)
+
+
+class UpstreamCounter:
+    """Counts transport requests per trace, so they can be charged to commands"""
+
+    def __init__(self, transport):
+        self.inner = transport
+        self.by_trace = Counter()
+        self.total = 0
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+    async def request(self, method, url, **kwargs):
+        from tracing import current_span
+        span = current_span()
+        self.by_trace[span.trace_id if span else None] += 1
+        self.total += 1
+        return await self.inner.request(method, url, **kwargs)
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] if ordered else 0.0
+
+
+async def _start_standin(args):
+    if args.base_url:
+        return None, args.base_url
+    from aternos_standin import AternosStandin
+    standin = AternosStandin(args.servers, args.latency / 1000, args.failure_rate, args.transition)
+    return standin, await standin.start()
+
+
+async def run(args):
+    standin, base_url = await _start_standin(args)
+    # Set before config is imported (by main)
+    os.environ['ATERNOS_BASE_URL'] = base_url
+
+    import main
+    from config import ADMIN_ROLE_NAME
+    from tracing import span
+
+    client = main.client
+    counter = UpstreamCounter(client.aternos.transport)
+    client.aternos.transport = counter
+    await client.aternos.ensure_logged_in()
+    client.aternos_ready.set()
+    await client.aternos.directory.refresh()
+    names = [entry.name for entry in client.aternos.directory.entries]
+    counter.by_trace.clear()
+    setup_requests, counter.total = counter.total, 0
+
+    commands = {'status': main.status, 'start': main.start, 'stop': main.stop}
+    weights = dict(item.split('=') for item in args.mix.split(','))
+    choices = [name for name in weights if name in commands]
+    choice_weights = [float(weights[name]) for name in choices]
+
+    latencies = defaultdict(list)
+    traces = defaultdict(list)  # command -> trace ids
+    failures = Counter()
+
+    async def user_session(guild_id, user_id):
+        for _ in range(args.commands):
+            command = random.choices(choices, choice_weights)[0]
+            interaction = FakeInteraction(guild_id, user_id, ADMIN_ROLE_NAME)
+            server_name = random.choice(names) if args.pick_servers else None
+            started = time.perf_counter()
+            with span(f'load.{command}') as root:
+                await commands[command].callback(interaction, server_name)
+            latencies[command].append(time.perf_counter() - started)
+            traces[command].append(root.trace_id)
+            if interaction.failed:
+                failures[command] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        user_session(guild_id, guild_id * 1000 + user)
+        for guild_id in range(1, args.guilds + 1)
+        for user in range(args.users)
+    ))
+    elapsed = time.perf_counter() - started
+
+    total = sum(len(v) for v in latencies.values())
+    print(f"{total} commands from {args.guilds} guilds x {args.users} users in {elapsed:.2f}s "
+          f"({total / elapsed:.1f} commands/s); {setup_requests} upstream requests for login")
+    print(f"{'command':10} {'count':>6} {'fail':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'max ms':>9} {'upstream/cmd':>13}")
+    for command, values in sorted(latencies.items()):
+        upstream = sum(counter.by_trace[trace] for trace in traces[command])
+        print(f"{command:10} {len(values):6d} {failures[command]:5d} "
+              f"{statistics.median(values) * 1000:9.1f} {_percentile(values, 0.95) * 1000:9.1f} "
+              f"{_percentile(values, 0.99) * 1000:9.1f} {max(values) * 1000:9.1f} "
+              f"{upstream / len(values):13.2f}")
+    background = counter.by_trace[None]
+    print(f"background upstream requests (status watcher, directory): {background}; "
+          f"stand-in served {sum(standin.requests.values()) if standin else 'n/a'}")
+
+    for task in list(client._background_tasks):
+        task.cancel()
+    client.status_watcher.stop()
+    await client.aternos.cleanup()
+    if standin:
+        await standin.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--guilds', type=int, default=5)
+    parser.add_argument('--users', type=int, default=4)
+    parser.add_argument('--commands', type=int, default=5, help='commands per user')
+    parser.add_argument('--mix', default='status=8,start=1,stop=1')
+    parser.add_argument('--pick-servers', action='store_true',
+                        help='pass a random server name instead of the guild default')
+    parser.add_argument('--base-url', help='use a running stand-in instead of starting one')
+    parser.add_argument('--servers', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=50, help='stand-in mean delay in ms')
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--transition', type=float, default=2.0)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,106 @@
+import time
+from logging_config import logger
+from metrics import BREAKER_STATE, BREAKER_TRANSITIONS, url_class
+
+CLOSED = 'closed'        # requests flow, failures are counted
+OPEN = 'open'            # requests fail fast until the cooldown is over
+HALF_OPEN = 'half-open'  # one probe request decides whether to close again
+
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# URL classes (see metrics.url_class) grouped into the operations that trip together
+OPERATION_CLASSES = {
+    'login': 'auth',
+    'home': 'auth',
+    'start': 'action',
+    'stop': 'action',
+    'confirm': 'action',
+}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while the breaker is open"""
+
+    def __init__(self, operation, retry_in):
+        super().__init__(f"Aternos is not responding ({operation} requests paused for {retry_in:.0f}s)")
+        self.operation = operation
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker for one class of upstream operations"""
+
+    def __init__(self, name, failure_threshold: int, cooldown: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        BREAKER_STATE.set(STATE_VALUES[CLOSED], operation=name)
+
+    @property
+    def retry_in(self):
+        """Seconds until an open breaker lets a probe through"""
+        return max(0.0, self.opened_at + self.cooldown - time.monotonic())
+
+    def _transition(self, state):
+        logger.warning(f"Circuit '{self.name}' {self.state} -> {state}")
+        self.state = state
+        BREAKER_STATE.set(STATE_VALUES[state], operation=self.name)
+        BREAKER_TRANSITIONS.inc(operation=self.name, state=state)
+
+    def before_request(self):
+        """Raise CircuitOpenError unless a request may be sent now.
+
+        Returns True when the request is the half-open probe; the caller
+        must hand it back with release_probe() however the request ends.
+        """
+        if self.state == OPEN:
+            if self.retry_in > 0:
+                raise CircuitOpenError(self.name, self.retry_in)
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._probing:
+                raise CircuitOpenError(self.name, self.cooldown)
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self._probing = False
+        self.failures = 0
+        if self.state != CLOSED:
+            self._transition(CLOSED)
+
+    def record_failure(self):
+        self._probing = False
+        self.failures += 1
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+            self.opened_at = time.monotonic()
+            self._transition(OPEN)
+
+    def record_ignored(self):
+        """The request finished without telling us anything about upstream health"""
+        self._probing = False
+
+    def release_probe(self):
+        """Let the next request probe again if this one ended without a verdict"""
+        self._probing = False
+
+
+class CircuitBreakers:
+    """One breaker per operation class: auth, read and action"""
+
+    def __init__(self, settings):
+        # settings: operation -> (failure threshold, cooldown seconds)
+        self.breakers = {name: CircuitBreaker(name, threshold, cooldown)
+                         for name, (threshold, cooldown) in settings.items()}
+
+    def for_url(self, url):
+        return self.breakers[OPERATION_CLASSES.get(url_class(url), 'read')]
+
+    def open_breakers(self):
+        """Breakers that are currently not closed"""
+        return [breaker for breaker in self.breakers.values() if breaker.state != CLOSED]
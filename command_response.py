@@ -0,0 +1,93 @@
+import asyncio
+import discord
+from logging_config import logger
+from metrics import DISCORD_REQUESTS
+from tracing import span
+
+# Discord rejects messages longer than this
+MAX_MESSAGE_LENGTH = 2000
+
+
+class CommandResponse:
+    """One follow-up message per interaction, edited as the command progresses.
+
+    The message is made of named sections (e.g. "server", "progress",
+    "status") kept in the order they were first set, plus an optional
+    embed. The first update is sent right away; later ones are coalesced
+    into one edit per debounce interval. A new message is only sent when
+    the old one can no longer be edited.
+    """
+
+    def __init__(self, interaction, debounce: float, ephemeral: bool = True):
+        self.interaction = interaction
+        self.debounce = debounce
+        self.ephemeral = ephemeral
+        self.message = None
+        self._sections = {}   # section name -> text, in display order
+        self.embed = None
+        self._shown = None    # (content, embed) of the message as Discord has it
+        self._pending = None  # task waiting to write the next edit
+        self._lock = asyncio.Lock()
+
+    @property
+    def content(self):
+        return "\n".join(self._sections.values())[:MAX_MESSAGE_LENGTH]
+
+    def set(self, section, text):
+        """Replace one section of the message (empty text removes it) and schedule a write"""
+        if not text:
+            self._sections.pop(section, None)
+        else:
+            self._sections[section] = text.rstrip("\n")
+        self._schedule()
+
+    def set_embed(self, embed):
+        """Show an embed below the text sections and schedule a write"""
+        self.embed = embed
+        self._schedule()
+
+    def _schedule(self):
+        if self._pending is None:
+            # Nothing is on screen yet: send on the next loop iteration,
+            # which still picks up other sections set in the same step
+            delay = self.debounce if self.message is not None else 0
+            self._pending = asyncio.create_task(self._write_later(delay))
+
+    async def flush(self):
+        """Write the current content now instead of waiting for the debounce"""
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            pending.cancel()
+        await self._write()
+
+    async def _write_later(self, delay):
+        await asyncio.sleep(delay)
+        # Cleared before writing so that flush() never cancels a write in progress
+        self._pending = None
+        try:
+            await self._write()
+        except Exception as e:
+            logger.error(f"Could not update the command response: {e}")
+
+    async def _write(self):
+        async with self._lock:
+            content, embed = self.content or None, self.embed
+            if (content is None and embed is None) or (content, embed) == self._shown:
+                return
+            if self.message is not None:
+                try:
+                    with span('discord.edit'):
+                        await self.message.edit(content=content, embed=embed)
+                    DISCORD_REQUESTS.inc(kind='edit')
+                    self._shown = content, embed
+                    return
+                except discord.NotFound:
+                    logger.warning("Command response message is gone, sending a new one")
+                    self.message = None
+            with span('discord.followup'):
+                kwargs = {'embed': embed} if embed is not None else {}
+                self.message = await self.interaction.followup.send(
+                    content, ephemeral=self.ephemeral, wait=True, **kwargs
+                )
+            DISCORD_REQUESTS.inc(kind='send')
+            self._shown = content, embed
@@ -3,9 +3,10 @@ import os
 
 load_dotenv()
 
-DISCORD_TOKEN = get_key(".env", "DISCORD_TOKEN")
-ATERNOS_USERNAME = get_key(".env", "ATERNOS_USERNAME")
-ATERNOS_PASSWORD = get_key(".env", "ATERNOS_PASSWORD")
+# The process environment is the fallback when there is no .env file
+DISCORD_TOKEN = get_key(".env", "DISCORD_TOKEN") or os.getenv("DISCORD_TOKEN")
+ATERNOS_USERNAME = get_key(".env", "ATERNOS_USERNAME") or os.getenv("ATERNOS_USERNAME")
+ATERNOS_PASSWORD = get_key(".env", "ATERNOS_PASSWORD") or os.getenv("ATERNOS_PASSWORD")
 
 if not DISCORD_TOKEN:
     raise ValueError("DISCORD_TOKEN environment variable is not set")
@@ -13,9 +14,148 @@ if not DISCORD_TOKEN:
 if not ATERNOS_USERNAME or not ATERNOS_PASSWORD:
     raise ValueError("Aternos credentials not properly configured")
 
-# Aternos URLs
-ATERNOS_LOGIN_URL = "https://aternos.org/go/"  # Direct login endpoint
-ATERNOS_SERVER_LIST_URL = "https://aternos.org/server/"
+# Aternos URLs; the base can point at a local stand-in for load tests
+ATERNOS_BASE_URL = os.getenv("ATERNOS_BASE_URL", "https://aternos.org").rstrip("/")
+ATERNOS_LOGIN_URL = f"{ATERNOS_BASE_URL}/go/"  # Direct login endpoint
+ATERNOS_SERVER_LIST_URL = f"{ATERNOS_BASE_URL}/server/"
+
+# HTTP transport: number of threads running blocking cloudscraper requests
+HTTP_MAX_WORKERS = int(os.getenv("ATERNOS_HTTP_WORKERS", "8"))
+
+# Seconds a parsed server page is reused before it is fetched again
+SNAPSHOT_CACHE_TTL = float(os.getenv("ATERNOS_SNAPSHOT_TTL", "10"))
+
+# HTML parser backend: "auto" (lxml when installed), "lxml" or "html.parser"
+HTML_PARSER = os.getenv("ATERNOS_HTML_PARSER", "auto")
+
+# Where the logged-in cookie jar is kept between restarts (empty to disable)
+SESSION_FILE = os.getenv("ATERNOS_SESSION_FILE", ".aternos_session.json")
+
+# Seconds between background refreshes of the server list
+SERVER_DIRECTORY_REFRESH = float(os.getenv("ATERNOS_DIRECTORY_REFRESH", "300"))
+
+# Server action queue: concurrent worker tasks and pause after each action
+QUEUE_WORKERS = int(os.getenv("QUEUE_WORKERS", "4"))
+QUEUE_COOLDOWN = float(os.getenv("QUEUE_COOLDOWN", "0"))
+
+# Optional durable queue: SQLite file recording every action (empty disables).
+# Writes are committed in batches every QUEUE_DB_COMMIT_INTERVAL seconds or
+# QUEUE_DB_MAX_BATCH writes; running actions hold a QUEUE_DB_LEASE second
+# lease, and actions orphaned QUEUE_MAX_ATTEMPTS times are abandoned
+QUEUE_DB = os.getenv("QUEUE_DB", "")
+QUEUE_DB_COMMIT_INTERVAL = float(os.getenv("QUEUE_DB_COMMIT_INTERVAL", "0.05"))
+QUEUE_DB_MAX_BATCH = int(os.getenv("QUEUE_DB_MAX_BATCH", "500"))
+QUEUE_DB_LEASE = float(os.getenv("QUEUE_DB_LEASE", "30"))
+QUEUE_MAX_ATTEMPTS = int(os.getenv("QUEUE_MAX_ATTEMPTS", "3"))
+
+# Upstream pacing: per-host token bucket whose rate (requests/second) adapts
+# between the min and max as Aternos responds or throttles
+UPSTREAM_RATE = float(os.getenv("UPSTREAM_RATE", "2"))
+UPSTREAM_BURST = float(os.getenv("UPSTREAM_BURST", "5"))
+UPSTREAM_MIN_RATE = float(os.getenv("UPSTREAM_MIN_RATE", "0.2"))
+UPSTREAM_MAX_RATE = float(os.getenv("UPSTREAM_MAX_RATE", "5"))
+
+# Retry backoff (seconds): exponential with jitter, slower after Cloudflare challenges
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "1"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "30"))
+CHALLENGE_RETRY_DELAY = float(os.getenv("CHALLENGE_RETRY_DELAY", "10"))
+
+# Circuit breakers per upstream operation class: consecutive failed requests
+# before the circuit opens, and seconds it stays open before a probe
+BREAKER_SETTINGS = {
+    'auth': (int(os.getenv("BREAKER_AUTH_THRESHOLD", "3")), float(os.getenv("BREAKER_AUTH_COOLDOWN", "120"))),
+    'read': (int(os.getenv("BREAKER_READ_THRESHOLD", "5")), float(os.getenv("BREAKER_READ_COOLDOWN", "30"))),
+    'action': (int(os.getenv("BREAKER_ACTION_THRESHOLD", "3")), float(os.getenv("BREAKER_ACTION_COOLDOWN", "60"))),
+}
+
+# Delays between checks for the confirmation prompt after start/stop
+CONFIRM_POLL_DELAYS = tuple(float(d) for d in os.getenv("CONFIRM_POLL_DELAYS", "0.5,1,2").split(","))
+
+# Seconds to wait after submitting the login form before verifying it
+LOGIN_VERIFY_DELAY = float(os.getenv("LOGIN_VERIFY_DELAY", "2"))
+
+# Record every upstream request/response (credentials scrubbed) to this
+# directory, or replay a recorded directory instead of contacting Aternos
+HTTP_RECORD_DIR = os.getenv("HTTP_RECORD_DIR", "")
+HTTP_REPLAY_DIR = os.getenv("HTTP_REPLAY_DIR", "")
+
+# Status watcher: poll interval (seconds) during transitions and when steady,
+# steady polls without subscribers before a server is no longer watched, and
+# how long /start and /stop keep updating their status message
+STATUS_FAST_INTERVAL = float(os.getenv("STATUS_FAST_INTERVAL", "5"))
+STATUS_SLOW_INTERVAL = float(os.getenv("STATUS_SLOW_INTERVAL", "60"))
+STATUS_IDLE_POLLS = int(os.getenv("STATUS_IDLE_POLLS", "3"))
+STATUS_FOLLOW_TIMEOUT = float(os.getenv("STATUS_FOLLOW_TIMEOUT", "600"))
+
+# /status answers at once from a snapshot younger than STATUS_FRESH_AGE
+# seconds; up to STATUS_MAX_STALE_AGE it shows the snapshot with its age and
+# edits the reply once a fresh page arrives, older ones are fetched first.
+# STATUS_GUILD_FRESHNESS overrides both per guild: "guild_id=fresh/max_stale,..."
+STATUS_FRESH_AGE = float(os.getenv("STATUS_FRESH_AGE", "15"))
+STATUS_MAX_STALE_AGE = float(os.getenv("STATUS_MAX_STALE_AGE", "600"))
+
+
+def _parse_guild_freshness(spec):
+    freshness = {}
+    for item in spec.split(","):
+        guild_id, _, ages = item.partition("=")
+        if guild_id.strip() and ages.strip():
+            fresh, _, max_stale = ages.partition("/")
+            freshness[int(guild_id)] = (float(fresh), float(max_stale or STATUS_MAX_STALE_AGE))
+    return freshness
+
+
+STATUS_GUILD_FRESHNESS = _parse_guild_freshness(os.getenv("STATUS_GUILD_FRESHNESS", ""))
+
+# "/status all": server pages fetched at the same time for the overview
+STATUS_ALL_CONCURRENCY = int(os.getenv("STATUS_ALL_CONCURRENCY", "4"))
+
+# Optional live status over the panel websocket; HTML polling is the fallback.
+# The URL can point at a local stand-in, the heartbeat is in seconds.
+ATERNOS_WS_ENABLED = os.getenv("ATERNOS_WS_ENABLED", "false").lower() in ("1", "true", "yes")
+ATERNOS_WS_URL = os.getenv("ATERNOS_WS_URL", "wss://aternos.org/hermes/")
+ATERNOS_WS_HEARTBEAT = float(os.getenv("ATERNOS_WS_HEARTBEAT", "49"))
+
+# Prometheus text metrics on http://METRICS_HOST:METRICS_PORT/metrics (0 disables)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# Append trace spans (Chrome trace event format) to this file (empty to disable)
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+
+# Where the Aternos controller runs: "local" (in the bot process), "spawn"
+# (CONTROLLER_WORKERS child processes started and supervised by the bot) or
+# "connect" (workers started separately with `python controller_worker.py
+# --socket <CONTROLLER_SOCKET>.<n>`). Worker n listens on CONTROLLER_SOCKET.n
+#
+# Each worker logs in on its own and has its own rate limiter and circuit
+# breakers. Spawned workers get UPSTREAM_* divided by CONTROLLER_WORKERS so
+# the total request rate stays the same; divide them yourself in "connect"
+# mode. Spawned workers trace to TRACE_FILE.worker<n>; give workers started
+# in "connect" mode their own TRACE_FILE. Their metrics are fetched over IPC
+# and shown with a worker="<n>" label. Breakers trip on the failures one worker sees, so with N workers an
+# outage takes up to N times the threshold in failed requests to stop all
+# traffic; /status reports a breaker as open when it is open in any worker.
+CONTROLLER_MODE = os.getenv("CONTROLLER_MODE", "local").lower()
+CONTROLLER_WORKERS = int(os.getenv("CONTROLLER_WORKERS", "1"))
+CONTROLLER_SOCKET = os.getenv("CONTROLLER_SOCKET", "/tmp/aternos-controller.sock")
+
+# IPC timeouts in seconds: ordinary calls, and logins and start/stop
+# actions; health check interval, and how long a new worker may take to start
+IPC_TIMEOUT = float(os.getenv("IPC_TIMEOUT", "60"))
+IPC_ACTION_TIMEOUT = float(os.getenv("IPC_ACTION_TIMEOUT", "600"))
+WORKER_HEALTH_INTERVAL = float(os.getenv("WORKER_HEALTH_INTERVAL", "15"))
+WORKER_STARTUP_TIMEOUT = float(os.getenv("WORKER_STARTUP_TIMEOUT", "30"))
+
+# Seconds a command waits for the background Aternos login before giving up
+ATERNOS_WARMUP_TIMEOUT = float(os.getenv("ATERNOS_WARMUP_TIMEOUT", "30"))
+
+# Append a JSON line with startup phase timings to this file (empty to disable)
+STARTUP_REPORT_FILE = os.getenv("STARTUP_REPORT_FILE", "")
+
+# Seconds between edits of a command's response message; progress updates
+# arriving in between are combined into one edit
+RESPONSE_EDIT_DEBOUNCE = float(os.getenv("RESPONSE_EDIT_DEBOUNCE", "1"))
 
 # Discord Role Configuration
 ADMIN_ROLE_NAME = "Minecraft Admin"
\ No newline at end of file
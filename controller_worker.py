@@ -0,0 +1,168 @@
+import argparse
+import asyncio
+import os
+import signal
+import time
+from logging_config import logger
+from aternos_controller import AternosController
+from ipc import MAX_MESSAGE_SIZE, dumps, encode_error, loads
+from metrics import metrics
+from tracing import SpanContext, span, tracer
+from config import CONTROLLER_SOCKET, TRACE_FILE
+
+# Controller methods the bot process may call
+METHODS = {
+    'login',
+    'list_servers',
+    'select_server',
+    'server_for',
+    'get_server_page',
+    'get_status_page',
+    'get_all_status_pages',
+    'get_status_pages',
+    'get_server_status',
+    'wait_for_status_change',
+    'start_server',
+    'stop_server',
+}
+
+
+class ControllerWorker:
+    """Serves one AternosController to the bot process over a Unix socket.
+
+    Every request runs in its own task, so a slow scrape never holds up
+    a health check or another request.
+    """
+
+    def __init__(self, controller, path):
+        self.controller = controller
+        self.path = path
+        self.started_at = time.time()
+        self.logged_in = False
+        self.inflight = 0
+        self._server = None
+        self._handlers = {
+            'ping': self.health,
+            'ensure_logged_in': self.ensure_logged_in,
+            'refresh_directory': self.refresh_directory,
+            'metrics': metrics.snapshot,
+        }
+
+    def health(self):
+        return {
+            'pid': os.getpid(),
+            'logged_in': self.logged_in,
+            'inflight': self.inflight,
+            'uptime': time.time() - self.started_at,
+        }
+
+    async def ensure_logged_in(self):
+        result = await self.controller.ensure_logged_in()
+        self.logged_in = True
+        if self.controller.live_status:
+            self.controller.live_status.start()
+        return result
+
+    async def refresh_directory(self):
+        """Reload this worker's directory, which select_server() uses, and return it"""
+        return await self.controller.directory.refresh()
+
+    async def _dispatch(self, method, args, kwargs):
+        handler = self._handlers.get(method)
+        if handler is None:
+            if method not in METHODS:
+                raise Exception(f"Unknown controller method '{method}'")
+            handler = getattr(self.controller, method)
+        result = handler(*args, **kwargs)
+        if asyncio.iscoroutine(result):
+            result = await result
+        return result
+
+    async def _respond(self, line, writer, write_lock):
+        request, request_id = {}, None
+        self.inflight += 1
+        try:
+            request = loads(line)
+            request_id = request['id']
+            parent = SpanContext(*request['trace']) if request.get('trace') else None
+            with span(f"worker.{request['method']}", parent=parent):
+                result = await self._dispatch(request['method'], request.get('args', ()), request.get('kwargs', {}))
+            response = {'id': request_id, 'result': result}
+        except Exception as e:
+            response = {'id': request_id, 'error': encode_error(e)}
+        finally:
+            self.inflight -= 1
+        response['breakers'] = [(b.name, b.state) for b in self.controller.breakers.open_breakers()]
+        try:
+            payload = dumps(response)
+        except Exception as e:
+            logger.error(f"Could not encode response to '{request.get('method')}': {e}")
+            payload = dumps({'id': request_id, 'error': encode_error(e)})
+        async with write_lock:
+            writer.write(payload)
+            await writer.drain()
+
+    async def _serve_connection(self, reader, writer):
+        write_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                task = asyncio.create_task(self._respond(line, writer, write_lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except Exception as e:
+            logger.warning(f"Bot connection closed: {e}")
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def start(self):
+        if os.path.exists(self.path):
+            # Left behind by a worker that did not shut down cleanly
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._serve_connection, self.path, limit=MAX_MESSAGE_SIZE)
+        os.chmod(self.path, 0o600)
+        logger.info(f"Aternos worker {os.getpid()} listening on {self.path}")
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        await self.controller.cleanup()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+async def _exit_with_parent(parent_pid, stopping):
+    """Stop once the process that spawned us is gone"""
+    while os.getppid() == parent_pid:
+        await asyncio.sleep(5)
+    logger.warning("Bot process exited, stopping the Aternos worker")
+    stopping.set()
+
+
+async def run_worker(path, parent_pid=None):
+    tracer.configure(TRACE_FILE)
+    worker = ControllerWorker(AternosController(), path)
+    await worker.start()
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopping.set)
+    watcher = asyncio.create_task(_exit_with_parent(parent_pid, stopping)) if parent_pid else None
+    try:
+        await stopping.wait()
+    finally:
+        if watcher:
+            watcher.cancel()
+        await worker.stop()
+        await asyncio.to_thread(tracer.close)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the Aternos controller in its own process")
+    parser.add_argument('--socket', default=f"{CONTROLLER_SOCKET}.0")
+    parser.add_argument('--parent-pid', type=int, help='exit when this process is no longer our parent')
+    args = parser.parse_args()
+    asyncio.run(run_worker(args.socket, args.parent_pid))
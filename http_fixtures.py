@@ -0,0 +1,182 @@
+import base64
+import json
+import re
+from collections import defaultdict
+from pathlib import Path
+from logging_config import logger
+from transport import ExecutorTransport
+
+SCRUBBED = '<scrubbed>'
+# Form fields and headers whose values never go into a fixture
+SECRET_FIELDS = re.compile(r'user|pass|token|secret|session|csrf', re.I)
+SECRET_HEADERS = {'cookie', 'set-cookie', 'authorization'}
+
+
+def _scrub_text(text, secrets):
+    for secret in secrets:
+        text = text.replace(secret, SCRUBBED)
+    return text
+
+
+def _scrub_headers(headers):
+    scrubbed = {}
+    for name, value in headers.items():
+        if name.lower() in SECRET_HEADERS:
+            # Keep the cookie names so the flow stays readable
+            value = '; '.join(f"{part.split('=', 1)[0].strip()}={SCRUBBED}"
+                              for part in value.split(';') if '=' in part)
+        scrubbed[name] = value
+    return scrubbed
+
+
+def _scrub_form(data, secrets):
+    if not isinstance(data, dict):
+        return _scrub_text(str(data), secrets) if data else data
+    return {key: SCRUBBED if SECRET_FIELDS.search(key) else _scrub_text(str(value), secrets)
+            for key, value in data.items()}
+
+
+class RecordingTransport:
+    """Wraps a transport and writes every request/response pair to a fixture directory.
+
+    Fixtures are numbered JSON files in request order. Credentials are
+    replaced with a placeholder in form data, cookies and response bodies.
+    """
+
+    def __init__(self, inner, directory, secrets=()):
+        self.inner = inner
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.secrets = [s for s in secrets if s]
+        self._count = len(list(self.directory.glob('*.json')))
+
+    @property
+    def scraper(self):
+        return self.inner.scraper
+
+    @property
+    def cookies(self):
+        return self.inner.cookies
+
+    async def request(self, method, url, **kwargs):
+        response = await self.inner.request(method, url, **kwargs)
+        try:
+            self._save(method, url, kwargs, response)
+        except Exception as e:
+            logger.warning(f"Could not record fixture for {url}: {e}")
+        return response
+
+    def _save(self, method, url, kwargs, response):
+        body = response.content or b''
+        fixture = {
+            'method': method.upper(),
+            'url': _scrub_text(url, self.secrets),
+            'request': {
+                'params': _scrub_form(kwargs.get('params'), self.secrets),
+                'data': _scrub_form(kwargs.get('data'), self.secrets),
+            },
+            'status': response.status_code,
+            'final_url': _scrub_text(response.url, self.secrets),
+            'headers': _scrub_headers(dict(response.headers)),
+        }
+        try:
+            fixture['body'] = _scrub_text(body.decode('utf-8'), self.secrets)
+        except UnicodeDecodeError:
+            fixture['body_base64'] = base64.b64encode(body).decode('ascii')
+
+        self._count += 1
+        slug = re.sub(r'[^a-zA-Z0-9]+', '-', url.split('://', 1)[-1]).strip('-')[:60]
+        path = self.directory / f"{self._count:04d}-{method.lower()}-{slug}.json"
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(fixture, f, indent=1)
+        logger.debug(f"Recorded {method.upper()} {url} to {path.name}")
+
+    def close(self):
+        self.inner.close()
+
+
+class ReplayResponse:
+    """Just enough of requests.Response for the controller"""
+
+    def __init__(self, fixture):
+        from requests.structures import CaseInsensitiveDict
+        from requests.cookies import RequestsCookieJar
+        self.status_code = fixture['status']
+        self.url = fixture.get('final_url') or fixture['url']
+        self.headers = CaseInsensitiveDict(fixture.get('headers', {}))
+        self.cookies = RequestsCookieJar()
+        if 'body_base64' in fixture:
+            self.content = base64.b64decode(fixture['body_base64'])
+        else:
+            self.content = fixture.get('body', '').encode('utf-8')
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', 'replace')
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            from requests import HTTPError
+            raise HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+class ReplayTransport:
+    """Serves recorded fixtures back instead of talking to Aternos.
+
+    Responses for the same method and URL are returned in recorded order;
+    once they run out the last one keeps being served, so replays are
+    deterministic. Unrecorded requests fail with a 404.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self._scraper = None
+        self._fixtures = defaultdict(list)  # (method, url) -> fixtures in recorded order
+        for path in sorted(self.directory.glob('*.json')):
+            with open(path, encoding='utf-8') as f:
+                fixture = json.load(f)
+            self._fixtures[(fixture['method'], fixture['url'])].append(fixture)
+        self._served = defaultdict(int)
+        if not self._fixtures:
+            raise Exception(f"No fixtures found in {self.directory}")
+
+    @property
+    def scraper(self):
+        """A plain session holding the cookie jar; it never sends anything"""
+        if self._scraper is None:
+            import requests
+            self._scraper = requests.Session()
+        return self._scraper
+
+    @property
+    def cookies(self):
+        return self.scraper.cookies
+
+    def rewind(self):
+        """Serve every recording from the start again"""
+        self._served.clear()
+
+    async def request(self, method, url, **kwargs):
+        key = (method.upper(), url)
+        recorded = self._fixtures.get(key)
+        if not recorded:
+            logger.warning(f"No fixture recorded for {method.upper()} {url}")
+            return ReplayResponse({'status': 404, 'url': url, 'body': ''})
+        index = min(self._served[key], len(recorded) - 1)
+        self._served[key] += 1
+        return ReplayResponse(recorded[index])
+
+    def close(self):
+        pass
+
+
+def make_transport(record_dir=None, replay_dir=None, secrets=()):
+    """The transport selected by configuration: replay, recording or live"""
+    if replay_dir:
+        logger.info(f"Replaying HTTP fixtures from {replay_dir}")
+        return ReplayTransport(replay_dir)
+    transport = ExecutorTransport()
+    if record_dir:
+        logger.info(f"Recording HTTP fixtures to {record_dir}")
+        return RecordingTransport(transport, record_dir, secrets)
+    return transport
@@ -0,0 +1,134 @@
+import asyncio
+import dataclasses
+import itertools
+import json
+from logging_config import logger
+from circuit_breaker import CircuitOpenError
+from server_directory import ServerEntry
+from server_page import ServerPage
+from tracing import current_span
+
+# Messages are single JSON lines: requests {"id", "method", "args", "kwargs"}
+# plus the caller's [trace id, span id] when it is in a span, responses
+# {"id", "result"} or {"id", "error"}, plus the worker's open circuit
+# breakers. Values that are not plain JSON carry a "__type__" tag.
+MAX_MESSAGE_SIZE = 16 * 1024 * 1024
+
+_TYPES = {'ServerPage': ServerPage, 'ServerEntry': ServerEntry}
+
+
+def encode_error(error):
+    encoded = {'__type__': 'error', 'kind': type(error).__name__, 'message': str(error)}
+    if isinstance(error, CircuitOpenError):
+        encoded.update(operation=error.operation, retry_in=error.retry_in)
+    return encoded
+
+
+def _decode_error(encoded):
+    if encoded.get('kind') == 'CircuitOpenError':
+        return CircuitOpenError(encoded['operation'], encoded['retry_in'])
+    return Exception(encoded['message'])
+
+
+def _default(value):
+    if isinstance(value, (ServerPage, ServerEntry)):
+        return {'__type__': type(value).__name__, **dataclasses.asdict(value)}
+    if isinstance(value, BaseException):
+        return encode_error(value)
+    raise TypeError(f"Cannot send {type(value).__name__} to another process")
+
+
+def _object_hook(obj):
+    kind = obj.pop('__type__', None)
+    if kind is None:
+        return obj
+    if kind == 'error':
+        return _decode_error(obj)
+    return _TYPES[kind](**obj)
+
+
+def dumps(message):
+    return json.dumps(message, default=_default).encode('utf-8') + b'\n'
+
+
+def loads(line):
+    return json.loads(line, object_hook=_object_hook)
+
+
+class IpcClient:
+    """Sends requests to a worker over one Unix socket connection.
+
+    Any number of calls can be in flight at once; responses are matched
+    to them by id. The connection is opened on first use and reopened
+    after it drops. Calls still waiting when it drops fail.
+    """
+
+    def __init__(self, path, timeout: float):
+        self.path = path
+        self.timeout = timeout
+        self.open_breakers = []  # (name, state) pairs from the latest response
+        self._writer = None
+        self._reader_task = None
+        self._pending = {}       # request id -> future
+        self._ids = itertools.count(1)
+        self._connect_lock = asyncio.Lock()
+
+    @property
+    def connected(self):
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def _connect(self):
+        async with self._connect_lock:
+            if self.connected:
+                return
+            reader, self._writer = await asyncio.open_unix_connection(self.path, limit=MAX_MESSAGE_SIZE)
+            self._reader_task = asyncio.create_task(self._read_responses(reader, self._writer))
+
+    async def _read_responses(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                message = loads(line)
+                self.open_breakers = message.get('breakers', [])
+                future = self._pending.pop(message['id'], None)
+                if future is None or future.done():
+                    continue
+                if 'error' in message:
+                    future.set_exception(message['error'])
+                else:
+                    future.set_result(message.get('result'))
+        except Exception as e:
+            logger.warning(f"Lost connection to Aternos worker {self.path}: {e}")
+        finally:
+            writer.close()
+            if self._writer is writer:
+                self._writer = None
+            pending, self._pending = self._pending, {}
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(Exception("Connection to the Aternos worker was lost"))
+
+    async def call(self, method, *args, timeout: float = None, **kwargs):
+        """Run `method` in the worker and return its result, raising its error"""
+        timeout = timeout or self.timeout
+        await self._connect()
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        request = {'id': request_id, 'method': method, 'args': args, 'kwargs': kwargs}
+        caller = current_span()
+        if caller is not None:
+            # The worker's spans join the caller's trace
+            request['trace'] = [caller.trace_id, caller.span_id]
+        try:
+            self._writer.write(dumps(request))
+            await self._writer.drain()
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise Exception(f"Aternos worker did not answer '{method}' within {timeout:.0f}s")
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
@@ -1,18 +1,109 @@
+import atexit
+import gzip
 import logging
+import logging.handlers
+import os
+import queue
+import random
+import shutil
 import sys
+import time
+from dotenv import load_dotenv
+
+# Read here rather than from config so logging works before (and without)
+# the credentials check in config.py
+load_dotenv()
+
+LOG_FILE = os.getenv("LOG_FILE", "minecraft_bot.log")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG")
+# Per-logger overrides, e.g. "discord=INFO,urllib3=WARNING,minecraft_bot=DEBUG"
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+# Rotate when the file reaches LOG_MAX_BYTES, or on LOG_ROTATE_WHEN ("midnight",
+# "h", ...) if set; rotated files are gzipped and LOG_BACKUPS of them are kept
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_ROTATE_WHEN = os.getenv("LOG_ROTATE_WHEN", "")
+LOG_BACKUPS = int(os.getenv("LOG_BACKUPS", "5"))
+# Share of requests whose headers and body are dumped at DEBUG, and a cap per minute
+LOG_REQUEST_SAMPLE = float(os.getenv("LOG_REQUEST_SAMPLE", "0.1"))
+LOG_REQUEST_MAX_PER_MINUTE = int(os.getenv("LOG_REQUEST_MAX_PER_MINUTE", "10"))
+
+# trace_id is filled in by tracing.TraceIdFilter ('-' outside of a trace)
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(trace_id)s] %(message)s'
+
+
+def _gzip_namer(name):
+    return name + ".gz"
+
+
+def _gzip_rotator(source, dest):
+    with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+def _file_handler():
+    if LOG_ROTATE_WHEN:
+        handler = logging.handlers.TimedRotatingFileHandler(
+            LOG_FILE, when=LOG_ROTATE_WHEN, backupCount=LOG_BACKUPS, encoding='utf-8'
+        )
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding='utf-8'
+        )
+    handler.namer = _gzip_namer
+    handler.rotator = _gzip_rotator
+    return handler
+
+
+def _apply_levels(spec):
+    for item in spec.split(','):
+        name, _, level = item.partition('=')
+        if name.strip() and level.strip():
+            logging.getLogger(name.strip()).setLevel(level.strip().upper())
+
+
+class RequestDumpSampler:
+    """Decides which requests get their headers and body dumped to the debug log"""
+
+    def __init__(self, rate: float, max_per_minute: int):
+        self.rate = rate
+        self.max_per_minute = max_per_minute
+        self._window_start = time.monotonic()
+        self._in_window = 0
+
+    def sample(self):
+        if random.random() >= self.rate:
+            return False
+        now = time.monotonic()
+        if now - self._window_start >= 60:
+            self._window_start = now
+            self._in_window = 0
+        if self._in_window >= self.max_per_minute:
+            return False
+        self._in_window += 1
+        return True
+
 
 def setup_logging():
-    logging.basicConfig(
-        level=logging.DEBUG,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.StreamHandler(sys.stdout),
-            logging.FileHandler('minecraft_bot.log')
-        ]
-    )
-    
+    """Route all records through a queue; a background thread does the writing"""
+    formatter = logging.Formatter(LOG_FORMAT, defaults={'trace_id': '-'})
+    handlers = [logging.StreamHandler(sys.stdout), _file_handler()]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    root = logging.getLogger()
+    root.handlers[:] = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(LOG_LEVEL.upper())
+    _apply_levels(LOG_LEVELS)
+
     # Create logger
     logger = logging.getLogger('minecraft_bot')
     return logger
 
 logger = setup_logging()
+request_dumps = RequestDumpSampler(LOG_REQUEST_SAMPLE, LOG_REQUEST_MAX_PER_MINUTE)
@@ -1,11 +1,38 @@
-import discord
-from discord import app_commands
+from startup_timer import startup_timer
+
+with startup_timer.phase("import discord"):
+    import discord
+    from discord import app_commands
 import asyncio
-from config import DISCORD_TOKEN, ADMIN_ROLE_NAME
+import contextvars
+import functools
+import time
+from config import (
+    DISCORD_TOKEN,
+    ADMIN_ROLE_NAME,
+    ATERNOS_WARMUP_TIMEOUT,
+    STARTUP_REPORT_FILE,
+    STATUS_FOLLOW_TIMEOUT,
+    METRICS_HOST,
+    METRICS_PORT,
+    STATUS_FRESH_AGE,
+    STATUS_MAX_STALE_AGE,
+    STATUS_GUILD_FRESHNESS,
+    RESPONSE_EDIT_DEBOUNCE,
+    STATUS_ALL_CONCURRENCY,
+    TRACE_FILE
+)
 from logging_config import logger
-from aternos_controller import AternosController
-from queue_manager import queue_manager
-import bs4
+with startup_timer.phase("import controller"):
+    from remote_controller import make_controller
+    from queue_manager import queue_manager
+    from status_watcher import StatusWatcher
+    from command_response import CommandResponse
+    from metrics import COMMAND_LATENCY, metrics, start_metrics_server
+    from tracing import span, tracer
+
+# Phases that must finish before the startup report is written
+STARTUP_PHASES = ("aternos login", "command sync")
 
 class MinecraftBot(discord.Client):
     def __init__(self):
@@ -13,17 +40,74 @@ class MinecraftBot(discord.Client):
         intents = discord.Intents.default()
         super().__init__(intents=intents)
         self.tree = app_commands.CommandTree(self)
-        self.aternos = AternosController()
+        # Cheap: no HTTP session or worker process exists before warm-up
+        self.aternos = make_controller()
+        queue_manager.bind(self.aternos)
+        self.status_watcher = StatusWatcher(self.aternos)
+        self.aternos_ready = asyncio.Event()
+        self.aternos_error = None
+        self._warmup_task = None
+        self._background_tasks = set()
+        self.metrics_server = None
 
     async def setup_hook(self):
-        """Initialize AternosController when bot starts"""
+        """Warm up the Aternos controller in the background so the gateway connects right away"""
+        tracer.configure(TRACE_FILE)
+        self._warmup_task = asyncio.create_task(self._warm_up_aternos())
+        if METRICS_PORT:
+            self.metrics_server = await start_metrics_server(METRICS_HOST, METRICS_PORT)
+
+    async def close(self):
+        """Stop status polling, commit the durable queue, stop the controller and flush traces before disconnecting"""
+        self.status_watcher.stop()
+        queue_manager.close()
+        await self.aternos.cleanup()
+        await asyncio.to_thread(tracer.close)
+        await super().close()
+
+    def run_in_background(self, coro):
+        """Run a coroutine after the command returns, keeping a reference to it"""
+        # A fresh context: its spans start their own trace instead of
+        # outliving the command's
+        task = asyncio.create_task(coro, context=contextvars.Context())
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+
+    async def _warm_up_aternos(self):
+        """Log in to Aternos, retrying with backoff instead of taking the bot down"""
+        delay = 5
+        while True:
+            try:
+                with startup_timer.phase("session creation"):
+                    self.aternos.scraper
+                with startup_timer.phase("aternos login"):
+                    await self.aternos.ensure_logged_in()
+                self.aternos_error = None
+                # Actions left over from before a restart go ahead of new ones
+                queue_manager.recover()
+                self.aternos_ready.set()
+                self.aternos.directory.start()
+                if self.aternos.live_status:
+                    self.aternos.live_status.start()
+                logger.info("Successfully initialized Aternos controller")
+                startup_timer.report_when_complete(STARTUP_PHASES, STARTUP_REPORT_FILE)
+                return
+            except Exception as e:
+                self.aternos_error = e
+                logger.error(f"Failed to initialize Aternos controller, retrying in {delay}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 300)
+
+    async def wait_for_aternos(self, timeout: float = ATERNOS_WARMUP_TIMEOUT):
+        """Wait until the controller is logged in, or fail once `timeout` expires"""
+        if self.aternos_ready.is_set():
+            return
         try:
-            await self.aternos.initialize()
-            await self.aternos.login()
-            logger.info("Successfully initialized Aternos controller")
-        except Exception as e:
-            logger.error(f"Failed to initialize Aternos controller: {e}")
-            raise
+            await asyncio.wait_for(self.aternos_ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            reason = f" (last error: {self.aternos_error})" if self.aternos_error else ""
+            raise Exception(f"Aternos connection is not ready yet, please try again shortly{reason}")
 
 def check_admin_role(interaction: discord.Interaction):
     """Check if user has admin role"""
@@ -32,10 +116,154 @@ def check_admin_role(interaction: discord.Interaction):
         logger.warning(f"User {interaction.user.name} attempted to use admin command without {ADMIN_ROLE_NAME} role")
     return has_role
 
+def format_status_message(page):
+    """Render a ServerPage as the /status reply"""
+    status_message = f"🔎 Server Status: **{page.status}**\n"
+    
+    if page.address:
+        status_message += f"🌐 Server Address: `{page.address}`\n"
+    
+    if page.players:
+        status_message += f"👥 {page.players}\n"
+    
+    # Check if we need to add additional information about queue
+    if page.status.lower() == "in queue" and page.queue_position:
+        status_message += f"⏳ {page.queue_position}\n"
+    
+    return status_message
+
+def format_status_embed(results):
+    """Render (entry, page, error) results of every server as one embed"""
+    embed = discord.Embed(title="🔎 Server Status", colour=discord.Colour.blurple())
+    # Discord allows 25 fields per embed
+    for entry, page, error in results[:25]:
+        if page is None:
+            value = f"❌ {error}"
+        else:
+            lines = [f"**{page.status}**"]
+            if page.address:
+                lines.append(f"🌐 `{page.address}`")
+            if page.players:
+                lines.append(f"👥 {page.players}")
+            if page.status.lower() == "in queue" and page.queue_position:
+                lines.append(f"⏳ {page.queue_position}")
+            value = "\n".join(lines)
+        embed.add_field(name=entry.name[:256], value=value[:1024])
+    footer = []
+    if len(results) > 25:
+        footer.append(f"{len(results) - 25} more servers not shown")
+    if client.aternos.breakers.open_breakers():
+        footer.append("Aternos is not responding; some statuses may be outdated")
+    if footer:
+        embed.set_footer(text=" · ".join(footer))
+    return embed
+
+def upstream_notice(page):
+    """Warn when Aternos is not responding and the status may be outdated"""
+    open_breakers = client.aternos.breakers.open_breakers()
+    if not open_breakers:
+        return ""
+    states = ", ".join(f"{breaker.name} {breaker.state}" for breaker in open_breakers)
+    return f"⚠️ Aternos is not responding ({states}); status is from {page.age:.0f}s ago\n"
+
+def timed_command(name):
+    """Trace a slash command callback and record its latency under `name`"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(interaction, *args, **kwargs):
+            with span(f'command.{name}', guild=interaction.guild_id, user=interaction.user.id), \
+                    COMMAND_LATENCY.time(command=name):
+                return await func(interaction, *args, **kwargs)
+        return wrapper
+    return decorator
+
 client = MinecraftBot()
 
+async def resolve_server(interaction: discord.Interaction, response: CommandResponse, server_name: str = None,
+                         fallback: bool = True):
+    """Pick the server for this invocation; selections are remembered per guild.
+
+    When `server_name` matches nothing, read-only commands fall back to the
+    default server. With fallback=False (start/stop) the reply lists the
+    closest names instead and None is returned.
+    """
+    if not server_name:
+        return await client.aternos.server_for(interaction.guild_id)
+    try:
+        entry = await client.aternos.select_server(server_name, interaction.guild_id)
+        response.set("server", f"✅ Selected server: {entry.name}")
+        return entry.url
+    except Exception as select_error:
+        logger.error(f"Error selecting server: {select_error}")
+        if not fallback:
+            candidates = [entry.name for entry in client.aternos.directory.complete(server_name, limit=5)]
+            hint = f" Did you mean: {', '.join(candidates)}?" if candidates else ""
+            response.set("server", f"❌ Could not find server '{server_name}'.{hint}")
+            return None
+        response.set("server", f"⚠️ Could not find server '{server_name}'. Using default server instead.")
+        # Try to select the first available server
+        entry = await client.aternos.select_server(guild_id=interaction.guild_id)
+        return entry.url
+
+async def follow_status(response: CommandResponse, server_url, done_states, timeout: float = STATUS_FOLLOW_TIMEOUT,
+                        since: float = None):
+    """Update the command's response on every transition until a done state or the timeout.
+
+    Pages fetched before `since` (when the action being followed finished)
+    are never shown.
+    """
+    with span('command.follow_status', server=server_url, interaction=response.interaction.id):
+        await _follow_status(response, server_url, done_states, timeout, since)
+
+async def _follow_status(response, server_url, done_states, timeout, since):
+    response.set("status", "📊 Watching server status...")
+    finished = asyncio.Event()
+
+    async def on_change(old_page, new_page):
+        content = f"📊 Current server status: **{new_page.status}**"
+        if new_page.status.lower() == "in queue" and new_page.queue_position:
+            content += f"\n⏳ {new_page.queue_position}"
+        response.set("status", content)
+        if new_page.status in done_states:
+            finished.set()
+
+    unsubscribe = client.status_watcher.subscribe(server_url, on_change, since=since)
+    try:
+        await asyncio.wait_for(finished.wait(), timeout)
+    except asyncio.TimeoutError:
+        logger.info(f"Stopped following {server_url} after {timeout:.0f}s")
+    finally:
+        unsubscribe()
+        await response.flush()
+
+def status_freshness(guild_id):
+    """(fresh, max stale) snapshot ages in seconds that /status accepts for a guild"""
+    return STATUS_GUILD_FRESHNESS.get(guild_id, (STATUS_FRESH_AGE, STATUS_MAX_STALE_AGE))
+
+async def revalidate_status(response: CommandResponse, server_url):
+    """Fetch a fresh status page for a reply that was answered from a snapshot"""
+    with span('command.revalidate_status', server=server_url):
+        try:
+            page = await client.aternos.get_status_page(server_url, max_age=0)
+            response.set("status", format_status_message(page))
+            response.set("progress", upstream_notice(page))
+        except Exception as e:
+            logger.error(f"Error refreshing server status: {e}")
+            response.set("progress", f"⚠️ Could not refresh the status: {e}")
+        finally:
+            await response.flush()
+
+async def server_name_autocomplete(interaction: discord.Interaction, current: str):
+    """Suggest server names from the in-memory directory without any upstream request"""
+    return [
+        app_commands.Choice(name=entry.name[:100], value=entry.name[:100])
+        for entry in client.aternos.directory.complete(current)
+    ]
+
 @client.tree.command(name="start", description="Start the Minecraft server")
 @app_commands.describe(server_name="The name of the server to start (optional)")
+@app_commands.autocomplete(server_name=server_name_autocomplete)
+@timed_command("start")
 async def start(interaction: discord.Interaction, server_name: str = None):
     if not check_admin_role(interaction):
         await interaction.response.send_message(
@@ -46,65 +274,50 @@ async def start(interaction: discord.Interaction, server_name: str = None):
         return
 
     await interaction.response.defer()
+    response = CommandResponse(interaction, RESPONSE_EDIT_DEBOUNCE)
 
     try:
-        # Check if Aternos controller is initialized
-        if not client.aternos._make_request:
-            logger.info("Aternos controller not initialized, reinitializing...")
-            await client.aternos.initialize()
-            await client.aternos.login()
+        # Commands that arrive during warm-up wait for it instead of racing it
+        await client.wait_for_aternos()
         
         # Warn user about possible wait time
-        await interaction.followup.send("⏳ Processing your request... This may take a minute or two.", ephemeral=True)
+        response.set("progress", "⏳ Processing your request... This may take a minute or two.")
         
-        # Select server if name provided
-        if server_name:
-            await queue_manager.add_action("select", interaction.guild_id, interaction.user.id)
-            try:
-                await client.aternos.select_server(server_name)
-                await interaction.followup.send(f"✅ Selected server: {server_name}", ephemeral=True)
-            except Exception as select_error:
-                logger.error(f"Error selecting server: {select_error}")
-                await interaction.followup.send(f"⚠️ Could not find server '{server_name}'. Using default server instead.", ephemeral=True)
-                # Try to select the first available server
-                await client.aternos.select_server()
+        # Select server if name provided, otherwise use the guild's selection
+        server_url = await resolve_server(interaction, response, server_name, fallback=False)
+        if server_url is None:
+            response.set("progress", "")
+            return
 
         # Get current status before trying to start
-        current_status = await client.aternos.get_server_status()
+        page = await client.aternos.get_server_page(server_url)
         
         # Only start if not already running
-        if current_status.lower() in ["online", "starting", "in queue"]:
-            await interaction.followup.send(f"ℹ️ Server is already {current_status}. No need to start it again.", ephemeral=True)
+        if page.is_running:
+            response.set("progress", f"ℹ️ Server is already {page.status}. No need to start it again.")
             return
             
-        await queue_manager.add_action("start", interaction.guild_id, interaction.user.id)
-        status = await client.aternos.start_server()
+        # The queue worker runs the action; duplicate requests share its result
+        status = await queue_manager.add_action("start", interaction.guild_id, interaction.user.id, server_url)
         
         if status:
-            await interaction.followup.send("✅ Server start initiated! Please wait a few minutes...", ephemeral=True)
+            response.set("progress", "✅ Server start initiated! Please wait a few minutes...")
             
-            # Wait briefly and get updated status
-            await asyncio.sleep(5)
-            new_status = await client.aternos.get_server_status()
-            await interaction.followup.send(f"📊 Current server status: **{new_status}**", ephemeral=True)
+            # Keep one message up to date until the server settles; this
+            # outlives the command so it is not counted in its latency
+            client.run_in_background(follow_status(response, server_url, ["Online"], since=time.time()))
         else:
-            await interaction.followup.send("⚠️ Server might be already running or in queue. Check status for more info.", ephemeral=True)
+            response.set("progress", "⚠️ Server might be already running or in queue. Check status for more info.")
     except Exception as e:
         logger.error(f"Error in start command: {e}")
-        await interaction.followup.send(f"❌ An error occurred while starting the server: {str(e)}", ephemeral=True)
-        
-        # Try to recover from login errors
-        if "login" in str(e).lower() or "verification" in str(e).lower():
-            try:
-                await interaction.followup.send("🔄 Attempting to re-login...", ephemeral=True)
-                await client.aternos.login()
-                await interaction.followup.send("✅ Re-login successful. Please try your command again.", ephemeral=True)
-            except Exception as login_error:
-                logger.error(f"Re-login failed: {login_error}")
-                await interaction.followup.send("❌ Re-login failed. Please try again later.", ephemeral=True)
+        response.set("progress", f"❌ An error occurred while starting the server: {str(e)}")
+    finally:
+        await response.flush()
 
 @client.tree.command(name="stop", description="Stop the Minecraft server")
 @app_commands.describe(server_name="The name of the server to stop (optional)")
+@app_commands.autocomplete(server_name=server_name_autocomplete)
+@timed_command("stop")
 async def stop(interaction: discord.Interaction, server_name: str = None):
     if not check_admin_role(interaction):
         await interaction.response.send_message(
@@ -115,137 +328,131 @@ async def stop(interaction: discord.Interaction, server_name: str = None):
         return
 
     await interaction.response.defer()
+    response = CommandResponse(interaction, RESPONSE_EDIT_DEBOUNCE)
 
     try:
-        # Check if Aternos controller is initialized
-        if not client.aternos._make_request:
-            logger.info("Aternos controller not initialized, reinitializing...")
-            await client.aternos.initialize()
-            await client.aternos.login()
+        # Commands that arrive during warm-up wait for it instead of racing it
+        await client.wait_for_aternos()
         
         # Warn user about possible wait time
-        await interaction.followup.send("⏳ Processing your request... This may take a minute or two.", ephemeral=True)
+        response.set("progress", "⏳ Processing your request... This may take a minute or two.")
         
-        # Select server if name provided
-        if server_name:
-            await queue_manager.add_action("select", interaction.guild_id, interaction.user.id)
-            try:
-                await client.aternos.select_server(server_name)
-                await interaction.followup.send(f"✅ Selected server: {server_name}", ephemeral=True)
-            except Exception as select_error:
-                logger.error(f"Error selecting server: {select_error}")
-                await interaction.followup.send(f"⚠️ Could not find server '{server_name}'. Using default server instead.", ephemeral=True)
-                # Try to select the first available server
-                await client.aternos.select_server()
+        # Select server if name provided, otherwise use the guild's selection
+        server_url = await resolve_server(interaction, response, server_name, fallback=False)
+        if server_url is None:
+            response.set("progress", "")
+            return
 
         # Get current status before trying to stop
-        current_status = await client.aternos.get_server_status()
+        page = await client.aternos.get_server_page(server_url)
         
         # Only stop if actually running
-        if current_status.lower() in ["offline", "stopping"]:
-            await interaction.followup.send(f"ℹ️ Server is already {current_status}. No need to stop it.", ephemeral=True)
+        if page.is_stopped:
+            response.set("progress", f"ℹ️ Server is already {page.status}. No need to stop it.")
             return
             
-        await queue_manager.add_action("stop", interaction.guild_id, interaction.user.id)
-        status = await client.aternos.stop_server()
+        # The queue worker runs the action; duplicate requests share its result
+        status = await queue_manager.add_action("stop", interaction.guild_id, interaction.user.id, server_url)
         
         if status:
-            await interaction.followup.send("✅ Server stop initiated!", ephemeral=True)
+            response.set("progress", "✅ Server stop initiated!")
             
-            # Wait briefly and get updated status
-            await asyncio.sleep(5)
-            new_status = await client.aternos.get_server_status()
-            await interaction.followup.send(f"📊 Current server status: **{new_status}**", ephemeral=True)
+            # Keep one message up to date until the server settles; this
+            # outlives the command so it is not counted in its latency
+            client.run_in_background(follow_status(response, server_url, ["Offline"], since=time.time()))
         else:
-            await interaction.followup.send("⚠️ Server might be already stopped. Check status for more info.", ephemeral=True)
+            response.set("progress", "⚠️ Server might be already stopped. Check status for more info.")
     except Exception as e:
         logger.error(f"Error in stop command: {e}")
-        await interaction.followup.send(f"❌ An error occurred while stopping the server: {str(e)}", ephemeral=True)
-        
-        # Try to recover from login errors
-        if "login" in str(e).lower() or "verification" in str(e).lower():
-            try:
-                await interaction.followup.send("🔄 Attempting to re-login...", ephemeral=True)
-                await client.aternos.login()
-                await interaction.followup.send("✅ Re-login successful. Please try your command again.", ephemeral=True)
-            except Exception as login_error:
-                logger.error(f"Re-login failed: {login_error}")
-                await interaction.followup.send("❌ Re-login failed. Please try again later.", ephemeral=True)
+        response.set("progress", f"❌ An error occurred while stopping the server: {str(e)}")
+    finally:
+        await response.flush()
 
 @client.tree.command(name="status", description="Get information about the Minecraft server")
-@app_commands.describe(server_name="The name of the server to check (optional)")
+@app_commands.describe(server_name="The name of the server to check, or \"all\" (optional)")
+@app_commands.autocomplete(server_name=server_name_autocomplete)
+@timed_command("status")
 async def status(interaction: discord.Interaction, server_name: str = None):
     await interaction.response.defer()
+    response = CommandResponse(interaction, RESPONSE_EDIT_DEBOUNCE)
 
     try:
-        # Check if Aternos controller is initialized
-        if not client.aternos._make_request:
-            logger.info("Aternos controller not initialized, reinitializing...")
-            await client.aternos.initialize()
-            await client.aternos.login()
-        
-        # Select server if name provided
-        if server_name:
-            try:
-                await client.aternos.select_server(server_name)
-                await interaction.followup.send(f"✅ Selected server: {server_name}", ephemeral=True)
-            except Exception as select_error:
-                logger.error(f"Error selecting server: {select_error}")
-                await interaction.followup.send(f"⚠️ Could not find server '{server_name}'. Using default server instead.", ephemeral=True)
-                # Try to select the first available server
-                await client.aternos.select_server()
-
-        # Get detailed server information
-        await interaction.followup.send("⏳ Fetching server status...", ephemeral=True)
-        
-        status = await client.aternos.get_server_status()
-        
-        # Try to get server address (from server page)
-        server_page = await client.aternos._make_request('get', client.aternos.selected_server)
-        soup = bs4(server_page.text, 'html.parser')
-        
-        # Look for server address
-        address = None
-        for elem in soup.find_all(['div', 'span']):
-            text = elem.get_text(strip=True)
-            if '.aternos.me' in text:
-                address = text
-                break
-        
-        # Format the status message
-        status_message = f"🔎 Server Status: **{status}**\n"
-        
-        if address:
-            status_message += f"🌐 Server Address: `{address}`\n"
+        # Commands that arrive during warm-up wait for it instead of racing it
+        await client.wait_for_aternos()
         
-        # Look for online players
-        players_info = soup.find(string=lambda s: s and "Players" in s and "/" in s)
-        if players_info:
-            players_text = players_info.parent.get_text(strip=True)
-            status_message += f"👥 {players_text}\n"
-        
-        # Check if we need to add additional information about queue
-        if status.lower() == "in queue":
-            queue_info = soup.find(string=lambda s: s and "queue" in s.lower() and "#" in s)
-            if queue_info:
-                status_message += f"⏳ {queue_info.strip()}\n"
-        
-        await interaction.followup.send(status_message, ephemeral=True)
+        if server_name and server_name.strip().lower() == "all":
+            # One server list fetch, then the running servers' pages in parallel
+            results = await client.aternos.get_all_status_pages(STATUS_ALL_CONCURRENCY)
+            response.set_embed(format_status_embed(results))
+            return
+
+        # Select server if name provided, otherwise use the guild's selection
+        server_url = await resolve_server(interaction, response, server_name)
+
+        fresh_age, max_stale_age = status_freshness(interaction.guild_id)
+        cached = client.aternos.peek_status_page(server_url)
+        if cached is not None and cached.age <= fresh_age:
+            response.set("status", format_status_message(cached))
+        elif cached is not None and cached.age <= max_stale_age:
+            # Answer from the last snapshot now and correct the reply once
+            # a fresh page arrives
+            response.set("status", format_status_message(cached))
+            response.set("progress", f"🕒 As of {cached.age:.0f}s ago, refreshing...")
+            client.run_in_background(revalidate_status(response, server_url))
+        else:
+            page = await client.aternos.get_status_page(server_url)
+            response.set("status", format_status_message(page))
+            response.set("progress", upstream_notice(page))
     except Exception as e:
         logger.error(f"Error in status command: {e}")
-        await interaction.followup.send(f"❌ An error occurred while fetching server status: {str(e)}", ephemeral=True)
-        
-        # Try to recover from login errors
-        if "login" in str(e).lower() or "verification" in str(e).lower():
-            try:
-                await interaction.followup.send("🔄 Attempting to re-login...", ephemeral=True)
-                await client.aternos.login()
-                await interaction.followup.send("✅ Re-login successful. Please try your command again.", ephemeral=True)
-            except Exception as login_error:
-                logger.error(f"Re-login failed: {login_error}")
-                await interaction.followup.send("❌ Re-login failed. Please try again later.", ephemeral=True)
+        response.set("progress", f"❌ An error occurred while fetching server status: {str(e)}")
+    finally:
+        await response.flush()
+
+@client.tree.command(name="metrics", description="Show bot performance metrics (admin only)")
+async def metrics_command(interaction: discord.Interaction):
+    if not check_admin_role(interaction):
+        await interaction.response.send_message(
+            f"❌ You need the '{ADMIN_ROLE_NAME}' role to use this command!",
+            ephemeral=True
+        )
+        return
+
+    await metrics.collect()
+    lines = metrics.summary() or ["No metrics recorded yet."]
+    text = "\n".join(lines)
+    if len(text) > 1900:
+        # Discord messages are limited to 2000 characters
+        text = text[:1900].rsplit("\n", 1)[0] + "\n…"
+    await interaction.response.send_message(f"📈 **Bot metrics**\n```\n{text}\n```", ephemeral=True)
+
+@client.tree.command(name="history", description="Show recent server actions in this server (admin only)")
+@app_commands.describe(user="Only show actions requested by this user (optional)")
+async def history(interaction: discord.Interaction, user: discord.User = None):
+    if not check_admin_role(interaction):
+        await interaction.response.send_message(
+            f"❌ You need the '{ADMIN_ROLE_NAME}' role to use this command!",
+            ephemeral=True
+        )
+        return
+
+    if not queue_manager.store:
+        await interaction.response.send_message("ℹ️ Action history is not enabled (set QUEUE_DB).", ephemeral=True)
+        return
+
+    lines = []
+    for row in queue_manager.history(interaction.guild_id, user.id if user else None, limit=15):
+        line = f"<t:{row['requested_at']:.0f}:R> `{row['action']}` by <@{row['user_id']}>: {row['state']}"
+        if row['finished_at'] and row['started_at']:
+            line += f" in {row['finished_at'] - row['started_at']:.0f}s"
+        if row['error']:
+            line += f" ({row['error'][:80]})"
+        lines.append(line)
+    text = "\n".join(lines) or "No actions recorded yet."
+    await interaction.response.send_message(f"📜 **Recent actions**\n{text}"[:2000], ephemeral=True)
 
 @client.tree.command(name="help", description="Get help with bot commands")
+@timed_command("help")
 async def help(interaction: discord.Interaction):
     help_text = f"""
 🤖 **Minecraft Server Bot Commands**
@@ -253,9 +460,12 @@ async def help(interaction: discord.Interaction):
 *Admin Commands* (requires '{ADMIN_ROLE_NAME}' role):
 • `/start [server_name]` - Start the Minecraft server
 • `/stop [server_name]` - Stop the Minecraft server
+• `/metrics` - Show bot performance metrics
+• `/history [user]` - Show recent start/stop actions
 
 *General Commands*:
 • `/status [server_name]` - Check current server status
+• `/status all` - Overview of every server
 • `/help` - Show this help message
 
 Note: Server operations may take a few moments to complete.
@@ -269,11 +479,14 @@ async def on_ready():
     logger.info(f"Logged in as {client.user}")
     try:
         logger.info("Starting to sync commands...")
-        await client.tree.sync()
+        with startup_timer.phase("command sync"):
+            await client.tree.sync()
         logger.info("Successfully synced application commands")
         logger.info(f"Required admin role name: {ADMIN_ROLE_NAME}")
+        startup_timer.report_when_complete(STARTUP_PHASES, STARTUP_REPORT_FILE)
     except Exception as e:
         logger.error(f"Failed to sync commands: {e}")
 
 if __name__ == "__main__":
-    client.run(DISCORD_TOKEN)
\ No newline at end of file
+    # Logging is already set up by logging_config
+    client.run(DISCORD_TOKEN, log_handler=None)
\ No newline at end of file
@@ -0,0 +1,275 @@
+import asyncio
+import bisect
+import re
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from logging_config import logger
+
+# Latency buckets in seconds, from a cached parse to a slow Aternos action
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{value}"' for name, value in extra]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+    kind = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values = {}  # label values tuple -> count
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self, values=None, extra=()):
+        for key, value in sorted((self.values if values is None else values).items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key, extra)} {value}"
+
+    def summary(self, values=None, extra=()):
+        for key, value in sorted((self.values if values is None else values).items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key, extra)}: {value:g}"
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        self.values[key] = value
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.values = {}  # label values tuple -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        series = self.values.get(key)
+        if series is None:
+            series = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of the enclosed block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def quantile(self, key, q, values=None):
+        """Upper bound of the bucket holding the q-quantile of one series"""
+        counts = (self.values if values is None else values)[key][:-1]
+        target = q * sum(counts)
+        running = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            running += count
+            if running >= target:
+                return bound
+        return float('inf')
+
+    def render(self, values=None, extra=()):
+        for key, series in sorted((self.values if values is None else values).items()):
+            running = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series[:-1]):
+                running += count
+                labels = _format_labels(self.labelnames, key, [*extra, ('le', bound)])
+                yield f"{self.name}_bucket{labels} {running}"
+            labels = _format_labels(self.labelnames, key, extra)
+            yield f"{self.name}_sum{labels} {series[-1]}"
+            yield f"{self.name}_count{labels} {running}"
+
+    def summary(self, values=None, extra=()):
+        values = self.values if values is None else values
+        for key, series in sorted(values.items()):
+            count = sum(series[:-1])
+            if count:
+                yield (f"{self.name}{_format_labels(self.labelnames, key, extra)}: n={count} "
+                       f"avg={series[-1] / count * 1000:.0f}ms "
+                       f"p95<={self.quantile(key, 0.95, values) * 1000:.0f}ms")
+
+
+class MetricsRegistry:
+    """Named counters and histograms, rendered as Prometheus text.
+
+    Series recorded in other processes (the controller workers) can be
+    added with update_source(); they are rendered next to the local ones
+    with a `worker` label. Collectors registered with add_collector() are
+    awaited by collect() to refresh them before each scrape.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._sources = {}     # source name -> snapshot() taken in that process
+        self._collectors = []  # async callables refreshing the sources
+
+    def _register(self, metric):
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()):
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def snapshot(self):
+        """Every series as plain JSON data: name -> [[label values, value], ...]"""
+        return {name: [[list(key), value] for key, value in metric.values.items()]
+                for name, metric in self._metrics.items() if metric.values}
+
+    def update_source(self, source, snapshot):
+        """Replace the series last received from another process"""
+        self._sources[source] = {name: {tuple(key): value for key, value in series}
+                                 for name, series in snapshot.items()}
+
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+
+    def remove_collector(self, collector):
+        if collector in self._collectors:
+            self._collectors.remove(collector)
+
+    async def collect(self):
+        """Refresh the series of other processes before rendering"""
+        for collector in self._collectors:
+            try:
+                await collector()
+            except Exception as e:
+                logger.warning(f"Could not collect metrics: {e}")
+
+    def _series(self, metric, method):
+        yield from getattr(metric, method)()
+        for source, snapshot in sorted(self._sources.items()):
+            if metric.name in snapshot:
+                yield from getattr(metric, method)(snapshot[metric.name], [('worker', source)])
+
+    def render(self):
+        """Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(self._series(metric, 'render'))
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """Short human-readable lines, one per series"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(self._series(metric, 'summary'))
+        return lines
+
+
+metrics = MetricsRegistry()
+
+HTTP_REQUESTS = metrics.counter(
+    'aternos_http_requests_total', 'Upstream HTTP requests', ('url_class', 'status'))
+HTTP_LATENCY = metrics.histogram(
+    'aternos_http_request_seconds', 'Upstream HTTP request latency', ('url_class',))
+HTTP_RETRIES = metrics.counter(
+    'aternos_http_retries_total', 'Upstream requests retried after an error', ('url_class', 'kind'))
+PARSE_SECONDS = metrics.histogram(
+    'aternos_parse_seconds', 'HTML parse time', ('page',))
+PAGE_FETCHES = metrics.counter(
+    'aternos_page_fetches_total', 'Server page fetches: not_modified (304), unchanged (same fingerprint) or parsed',
+    ('outcome',))
+PAGE_BYTES = metrics.counter(
+    'aternos_page_bytes_total', 'Bytes received for server pages')
+SELECTOR_FALLBACKS = metrics.counter(
+    'aternos_selector_fallbacks_total', 'Fields found by a fallback selector, not the first one', ('field',))
+QUEUE_WAIT = metrics.histogram(
+    'bot_queue_wait_seconds', 'Time server actions spend queued', ('action',))
+QUEUE_SERVICE = metrics.histogram(
+    'bot_queue_service_seconds', 'Time spent executing server actions', ('action',))
+QUEUE_DEPTH = metrics.gauge(
+    'bot_queue_depth', 'Server actions waiting in the queue')
+QUEUE_IN_PROGRESS = metrics.gauge(
+    'bot_queue_in_progress', 'Server actions being executed')
+QUEUE_ACTIONS = metrics.counter(
+    'bot_queue_actions_total', 'Server action requests: enqueued, coalesced, completed or failed', ('action', 'outcome'))
+COMMAND_LATENCY = metrics.histogram(
+    'bot_command_seconds', 'Slash command latency, from invocation to completion', ('command',))
+BREAKER_STATE = metrics.gauge(
+    'aternos_circuit_state', 'Circuit breaker state: 0 closed, 1 half-open, 2 open', ('operation',))
+BREAKER_TRANSITIONS = metrics.counter(
+    'aternos_circuit_transitions_total', 'Circuit breaker state changes', ('operation', 'state'))
+DISCORD_REQUESTS = metrics.counter(
+    'bot_discord_requests_total', 'Discord API calls made for command responses', ('kind',))
+CACHE_REQUESTS = metrics.counter(
+    'aternos_snapshot_cache_requests_total', 'Snapshot cache lookups: hit, miss or coalesced', ('outcome',))
+
+_SERVER_ID = re.compile(r'^/server/[^/]+/?$')
+# Localised homepage, e.g. /:en/
+_LANGUAGE_HOME = re.compile(r'^/:[a-z]{2}(-[a-z]{2})?/?$', re.IGNORECASE)
+
+
+def url_class(url):
+    """Collapse a URL into a low-cardinality label"""
+    path = urlsplit(url).path
+    if path.startswith('/go'):
+        return 'login'
+    if path in ('', '/') or _LANGUAGE_HOME.match(path):
+        return 'home'
+    if path.rstrip('/') == '/server':
+        return 'server_list'
+    if _SERVER_ID.match(path):
+        return 'server_page'
+    for action in ('confirm', 'start', 'stop'):
+        if action in path:
+            return action
+    return 'other'
+
+
+async def _handle_scrape(reader, writer):
+    try:
+        request_line = await reader.readline()
+        # Drain the request headers
+        while (await reader.readline()).strip():
+            pass
+        parts = request_line.decode('latin-1').split()
+        if len(parts) >= 2 and parts[1].split('?')[0] == '/metrics':
+            await metrics.collect()
+            body = metrics.render().encode()
+            head = "HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n"
+        else:
+            body = b"Not found\n"
+            head = "HTTP/1.1 404 Not Found\r\nContent-Type: text/plain\r\n"
+        writer.write(f"{head}Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+        await writer.drain()
+    except Exception as e:
+        logger.debug(f"Metrics request failed: {e}")
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(host: str, port: int):
+    """Serve /metrics as Prometheus text on host:port"""
+    server = await asyncio.start_server(_handle_scrape, host, port)
+    logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
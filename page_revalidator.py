@@ -0,0 +1,103 @@
+import hashlib
+import re
+import time
+from dataclasses import dataclass, replace
+from logging_config import logger
+from metrics import PAGE_BYTES, PAGE_FETCHES, PARSE_SECONDS
+from tracing import span
+
+# Values on the server page that change on every request without changing
+# what it says: nonce/token/csrf attributes, the value of inputs named like
+# them, and token assignments in inline scripts. Everything else, scripts,
+# hidden inputs and countdowns included, can carry server state and counts.
+VOLATILE_PATTERNS = [
+    (re.compile(rb'\b(?:nonce|[\w-]*token|[\w-]*csrf[\w-]*)="[^"]*"', re.I), b''),
+    (re.compile(rb'(<input\b[^>]*\bname="[^"]*(?:nonce|token|csrf)[^"]*"[^>]*?)\s*\bvalue="[^"]*"', re.I), rb'\1'),
+    (re.compile(rb'(<input\b[^>]*?)\s*\bvalue="[^"]*"([^>]*\bname="[^"]*(?:nonce|token|csrf)[^"]*")', re.I), rb'\1\2'),
+    (re.compile(rb'\b\w*(?:nonce|token|csrf)\w*["\']?\s*[:=]\s*["\'][^"\']*["\']', re.I), b''),
+]
+WHITESPACE = re.compile(rb'\s+')
+
+
+def fingerprint(body: bytes):
+    """Hash of the page body with the volatile parts removed"""
+    for pattern, replacement in VOLATILE_PATTERNS:
+        body = pattern.sub(replacement, body)
+    return hashlib.blake2b(WHITESPACE.sub(b' ', body), digest_size=16).hexdigest()
+
+
+@dataclass(frozen=True)
+class Validators:
+    """What we remember about the last full response for a URL"""
+    etag: str
+    last_modified: str
+    fingerprint: str
+    page: object
+
+
+class PageRevalidator:
+    """Skips downloads and parses of pages that did not change.
+
+    Requests carry If-None-Match/If-Modified-Since when upstream sent an
+    ETag or Last-Modified; a 304 or a body whose normalized fingerprint
+    matches the last one reuses the previously parsed page. The outcome
+    and bytes received of every request and the parse CPU time are
+    recorded as metrics.
+    """
+
+    def __init__(self):
+        self._validators = {}  # URL -> Validators
+
+    def conditional_headers(self, url):
+        """Headers that let upstream answer 304 for an unchanged page"""
+        validators = self._validators.get(url)
+        headers = {}
+        if validators and validators.page is not None:
+            if validators.etag:
+                headers['If-None-Match'] = validators.etag
+            if validators.last_modified:
+                headers['If-Modified-Since'] = validators.last_modified
+        return headers
+
+    def forget(self, url=None):
+        """Drop what we know about a URL (or all of them) so the next fetch parses"""
+        if url is None:
+            self._validators.clear()
+        else:
+            self._validators.pop(url, None)
+
+    def page_from(self, url, response, parse):
+        """Return the page for a response, calling `parse(text)` only when it changed"""
+        size = int(response.headers.get('Content-Length') or len(response.content or b''))
+        previous = self._validators.get(url)
+
+        if response.status_code == 304 and previous is not None:
+            return self._reuse(url, previous, 'not_modified', size)
+
+        digest = fingerprint(response.content)
+        if previous is not None and previous.fingerprint == digest:
+            page = self._reuse(url, previous, 'unchanged', size)
+        else:
+            with span('parse.server_page', bytes=size):
+                started = time.thread_time()
+                page = parse(response.text)
+                cpu = time.thread_time() - started
+            PARSE_SECONDS.observe(cpu, page='server_page')
+            self._record(url, 'parsed', size, cpu)
+
+        self._validators[url] = Validators(
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified'),
+            fingerprint=digest,
+            page=page,
+        )
+        return page
+
+    def _reuse(self, url, previous, outcome, size):
+        self._record(url, outcome, size, 0.0)
+        return replace(previous.page, fetched_at=time.time())
+
+    def _record(self, url, outcome, size, cpu):
+        PAGE_FETCHES.inc(outcome=outcome)
+        PAGE_BYTES.inc(size)
+        logger.debug(f"Fetched {url}: {outcome}, {size} bytes, parse {cpu * 1000:.1f} ms CPU")
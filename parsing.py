@@ -0,0 +1,259 @@
+import re
+from bs4 import BeautifulSoup, NavigableString, CData
+from logging_config import logger
+
+try:
+    import lxml.html
+except ImportError:  # lxml is optional, html.parser is always available
+    lxml = None
+
+# Elements whose text content is never visible page text
+SKIP_TEXT = ('script', 'style', 'template')
+
+
+class SoupBackend:
+    """BeautifulSoup with the pure-Python html.parser; always available"""
+    name = 'html.parser'
+
+    def parse(self, html):
+        return BeautifulSoup(html, 'html.parser')
+
+    def walk(self, root):
+        """Yield (element, None) for tags and (parent, text) for text, in document order"""
+        for node in root.descendants:
+            if node.name is not None:
+                yield node, None
+            # Comments, scripts and styles are not visible page text
+            elif type(node) in (NavigableString, CData) and node.parent.parent is not None:
+                yield node.parent, str(node)
+
+    def describe(self, el):
+        return el.name, el.get('class') or (), el.get
+
+    def parent(self, el):
+        parent = el.parent
+        # The BeautifulSoup object itself is not an element
+        return parent if parent is not None and parent.parent is not None else None
+
+    def text(self, el):
+        return el.get_text(strip=True)
+
+
+class LxmlBackend:
+    """lxml's C parser, traversed directly without building a bs4 tree"""
+    name = 'lxml'
+
+    def parse(self, html):
+        try:
+            return lxml.html.document_fromstring(html)
+        except ValueError:
+            # Unicode strings with an XML encoding declaration are rejected
+            return lxml.html.document_fromstring(html.encode('utf-8'))
+
+    def walk(self, root):
+        """Yield (element, None) for tags and (parent, text) for text, in document order"""
+        stack = [root]
+        while stack:
+            el = stack.pop()
+            if el.__class__ is tuple:
+                yield el
+                continue
+            tag = el.tag
+            if not isinstance(tag, str):
+                # Comments and processing instructions; their tails were
+                # already scheduled by the parent
+                continue
+            yield el, None
+            if el.text and tag not in SKIP_TEXT:
+                yield el, el.text
+            for child in reversed(el):
+                if child.tail:
+                    stack.append((el, child.tail))
+                stack.append(child)
+
+    def describe(self, el):
+        return el.tag, el.get('class', '').split(), el.get
+
+    def parent(self, el):
+        return el.getparent()
+
+    def text(self, el):
+        parts = []
+        for node in el.iter():
+            if isinstance(node.tag, str) and node.tag not in SKIP_TEXT and node.text:
+                parts.append(node.text.strip())
+            if node is not el and node.tail:
+                parts.append(node.tail.strip())
+        return ''.join(parts)
+
+
+BACKENDS = {'html.parser': SoupBackend}
+if lxml is not None:
+    BACKENDS['lxml'] = LxmlBackend
+
+
+def get_backend(name: str = 'auto'):
+    """Return a parser backend by name; 'auto' prefers lxml when installed"""
+    if name == 'auto':
+        name = 'lxml' if 'lxml' in BACKENDS else 'html.parser'
+    if name not in BACKENDS:
+        logger.warning(f"HTML parser backend '{name}' unavailable, falling back to html.parser")
+        name = 'html.parser'
+    return BACKENDS[name]()
+
+
+def make_soup(html, backend=None):
+    """BeautifulSoup for the pages that still need its search API, on the fastest builder"""
+    features = 'lxml' if backend is not None and backend.name == 'lxml' else 'html.parser'
+    return BeautifulSoup(html, features)
+
+
+_SELECTOR_TOKEN = re.compile(r'''
+    (?P<tag>[a-zA-Z][\w-]*|\*)
+  | \.(?P<cls>[\w-]+)
+  | \[(?P<attr>[\w-]+)(?:(?P<op>[*^$]?=)"(?P<value>[^"]*)"(?P<flag>\s+i)?)?\]
+  | :(?P<pseudo>contains|icontains)\("(?P<text>[^"]*)"\)
+''', re.X)
+
+
+def _attr_check(name, op, value, ignore_case):
+    if ignore_case and value:
+        value = value.lower()
+
+    def check(classes, get):
+        actual = ' '.join(classes) if name == 'class' else get(name)
+        if actual is None:
+            return False
+        if op is None:
+            return True
+        if ignore_case:
+            actual = actual.lower()
+        if op == '=':
+            return actual == value
+        if op == '*=':
+            return value in actual
+        if op == '^=':
+            return actual.startswith(value)
+        return actual.endswith(value)
+    return check
+
+
+def _compile_compound(selector):
+    """Compile one compound selector into (tag, classes, attr checks, text needles)"""
+    tag, classes, attr_checks, needles = None, [], [], []
+    pos = 0
+    while pos < len(selector):
+        match = _SELECTOR_TOKEN.match(selector, pos)
+        if not match or (match.group('tag') and pos > 0):
+            raise ValueError(f"Unsupported selector: {selector!r}")
+        pos = match.end()
+        if match.group('tag'):
+            tag = None if match.group('tag') == '*' else match.group('tag')
+        elif match.group('cls'):
+            classes.append(match.group('cls'))
+        elif match.group('attr'):
+            attr_checks.append(_attr_check(
+                match.group('attr'), match.group('op'),
+                match.group('value'), bool(match.group('flag'))
+            ))
+        elif match.group('pseudo') == 'contains':
+            needles.append((match.group('text'), False))
+        else:
+            needles.append((match.group('text').lower(), True))
+    return tag, frozenset(classes), tuple(attr_checks), tuple(needles)
+
+
+def _element_matches(tag, classes, attr_checks, el_tag, el_classes, get):
+    return ((tag is None or tag == el_tag)
+            and (not classes or classes.issubset(el_classes))
+            and all(check(el_classes, get) for check in attr_checks))
+
+
+def _text_matches(needles, text):
+    lowered = None
+    for needle, ignore_case in needles:
+        if ignore_case:
+            if lowered is None:
+                lowered = text.lower()
+            if needle not in lowered:
+                return False
+        elif needle not in text:
+            return False
+    return True
+
+
+class SelectorPlan:
+    """An ordered selector cascade compiled once and run in a shared traversal.
+
+    Supports tag, .class, [attr], [attr=|*=|^=|$="v" i] and jQuery-style
+    :contains("x") / :icontains("x"). A selector with :contains matches a
+    text node and resolves to its nearest ancestor satisfying the rest of
+    the selector. Comma-separated alternatives share one priority. The
+    lowest priority that matches anywhere in the page wins.
+    """
+
+    def __init__(self, selectors):
+        self.selectors = list(selectors)
+        self.tag_rules, self.text_rules = [], []
+        for priority, selector in enumerate(self.selectors):
+            for compound in selector.split(','):
+                tag, classes, attr_checks, needles = _compile_compound(compound.strip())
+                rule = (priority, selector, tag, classes, attr_checks, needles)
+                (self.text_rules if needles else self.tag_rules).append(rule)
+
+
+class PlanMatch:
+    """The winning element of a SelectorPlan, plus the text node for :contains rules"""
+    __slots__ = ('element', 'selector', 'priority', 'text')
+
+    def __init__(self, element, selector, priority, text=None):
+        self.element = element
+        self.selector = selector
+        self.priority = priority
+        self.text = text
+
+
+def run_plans(backend, root, plans):
+    """Evaluate several SelectorPlans in one traversal; returns a PlanMatch or None per plan"""
+    best = [len(plan.selectors) for plan in plans]
+    found = [None] * len(plans)
+    tag_plans = [(i, plan.tag_rules) for i, plan in enumerate(plans) if plan.tag_rules]
+    text_plans = [(i, plan.text_rules) for i, plan in enumerate(plans) if plan.text_rules]
+
+    for el, text in backend.walk(root):
+        if text is None:
+            el_tag, el_classes, get = backend.describe(el)
+            for i, rules in tag_plans:
+                for priority, selector, tag, classes, attr_checks, _ in rules:
+                    if priority >= best[i]:
+                        break
+                    # Inline the common tag/class tests; attribute checks are rare
+                    if tag is not None and tag != el_tag:
+                        continue
+                    if classes and not classes.issubset(el_classes):
+                        continue
+                    if attr_checks and not all(check(el_classes, get) for check in attr_checks):
+                        continue
+                    best[i] = priority
+                    found[i] = PlanMatch(el, selector, priority)
+                    break
+            continue
+
+        if text.isspace():
+            continue
+        for i, rules in text_plans:
+            for priority, selector, tag, classes, attr_checks, needles in rules:
+                if priority >= best[i]:
+                    break
+                if not _text_matches(needles, text):
+                    continue
+                target = el
+                while target is not None and not _element_matches(
+                        tag, classes, attr_checks, *backend.describe(target)):
+                    target = backend.parent(target)
+                if target is not None:
+                    best[i] = priority
+                    found[i] = PlanMatch(target, selector, priority, text)
+                    break
+
+    return found
@@ -1,65 +1,233 @@
 from collections import deque
 from datetime import datetime
 import asyncio
+import contextvars
+import time
 from logging_config import logger
+from metrics import QUEUE_ACTIONS, QUEUE_DEPTH, QUEUE_IN_PROGRESS, QUEUE_SERVICE, QUEUE_WAIT
+from tracing import current_span, record_span, span
+from config import (
+    QUEUE_WORKERS,
+    QUEUE_COOLDOWN,
+    QUEUE_DB,
+    QUEUE_DB_COMMIT_INTERVAL,
+    QUEUE_DB_MAX_BATCH,
+    QUEUE_DB_LEASE,
+    QUEUE_MAX_ATTEMPTS
+)
 
 class ServerActionQueue:
-    def __init__(self):
+    """Dispatches server actions to the controller from long-lived worker tasks.
+
+    add_action() returns a future right away. Identical pending actions
+    (same action on the same server) are coalesced into one execution
+    whose result every caller receives. With an ActionStore attached,
+    every action is also recorded on disk so recover() can pick up the
+    ones a previous run left unfinished.
+    """
+
+    def __init__(self, workers: int = QUEUE_WORKERS, cooldown: float = QUEUE_COOLDOWN, store=None):
+        self.store = store
+        self._recovery = None  # timer re-checking leases held by other processes
         self.queue = deque()
-        self.processing = False
-        self._lock = asyncio.Lock()
-        
-    async def add_action(self, action, guild_id, user_id):
-        """Add a server action to the queue"""
-        async with self._lock:
-            action_item = {
-                'action': action,
+        self._pending = {}   # (action, server_url) -> queued action item
+        self._handlers = {}  # action name -> async callable(action_item)
+        self._wakeup = None
+        self._workers = []
+        self._worker_count = workers
+        self.cooldown = cooldown
+        self.in_progress = 0
+
+    def register(self, action, handler):
+        """Route an action name to an async handler receiving the action item"""
+        self._handlers[action] = handler
+
+    def bind(self, controller):
+        """Register the controller calls that execute start/stop actions"""
+        self.register('start', lambda item: controller.start_server(server_url=item['server_url']))
+        self.register('stop', lambda item: controller.stop_server(server_url=item['server_url']))
+
+    def add_action(self, action, guild_id, user_id, server_url=None):
+        """Queue a server action and return a future for its result"""
+        if action not in self._handlers:
+            raise Exception(f"No handler registered for action '{action}'")
+
+        key = (action, server_url)
+        pending = self._pending.get(key)
+        if pending:
+            pending['requested_by'].append((guild_id, user_id))
+            if self.store:
+                self.store.add_requester(pending['id'], guild_id, user_id)
+            QUEUE_ACTIONS.inc(action=action, outcome='coalesced')
+            logger.info(f"Coalesced '{action}' from user {user_id} with a pending request")
+            return pending['future']
+
+        action_item = {
+            'action': action,
+            'guild_id': guild_id,
+            'user_id': user_id,
+            'server_url': server_url,
+            'requested_by': [(guild_id, user_id)],
+            'timestamp': datetime.now(),
+            'enqueued_at': time.monotonic(),
+            # Worker tasks run outside the caller's context; spans are
+            # parented explicitly to the command that queued the action
+            'span': current_span(),
+            'future': asyncio.get_running_loop().create_future()
+        }
+        if self.store:
+            action_item['id'] = self.store.enqueue(action, server_url, guild_id, user_id)
+        self._push(action_item)
+        logger.info(f"Added action to queue: '{action}' from user {user_id} in guild {guild_id}")
+        return action_item['future']
+
+    def _push(self, action_item):
+        self.queue.append(action_item)
+        self._pending[(action_item['action'], action_item['server_url'])] = action_item
+        QUEUE_ACTIONS.inc(action=action_item['action'], outcome='enqueued')
+        QUEUE_DEPTH.set(len(self.queue))
+        self._ensure_workers()
+        self._wakeup.set()
+
+    def recover(self, orphans_only: bool = False):
+        """Queue the actions a previous run left pending or orphaned in the store.
+
+        The startup call takes every pending action; later re-checks
+        (`orphans_only`) only take actions whose lease just expired.
+        """
+        if not self.store:
+            return 0
+        recovered = 0
+        for row in self.store.recover(QUEUE_MAX_ATTEMPTS, orphans_only):
+            key = (row['action'], row['server_url'])
+            queued = self._pending.get(key)
+            if queued is not None and queued.get('id') == row['id']:
+                # Already queued by this process
+                continue
+            if queued is not None or row['action'] not in self._handlers:
+                self.store.finish(row['id'], False, error="Superseded by a newer request")
+                continue
+            guild_id, user_id = row['requested_by'][0] if row['requested_by'] else (None, None)
+            self._push({
+                'id': row['id'],
+                'action': row['action'],
                 'guild_id': guild_id,
                 'user_id': user_id,
-                'timestamp': datetime.now()
-            }
-            self.queue.append(action_item)
-            logger.info(f"Added action to queue: {action_item}")
-            
-            if not self.processing:
-                await self.process_queue()
-    
-    async def process_queue(self):
-        """Process queued actions"""
-        self.processing = True
-        
-        while self.queue:
-            async with self._lock:
-                action_item = self.queue.popleft()
-                
-            try:
-                logger.info(f"Processing action: {action_item}")
-                # Add more descriptive logging
-                logger.info(f"Action '{action_item['action']}' from user {action_item['user_id']} in guild {action_item['guild_id']}")
-                
-                # Here we would actually process the action with the controller
-                # but it's handled directly in the command functions
-                
-                # Add timestamp for completion
-                action_item['completed_at'] = datetime.now()
-                action_item['success'] = True
-                
-                # Calculate and log processing time
-                start_time = action_item['timestamp']
-                end_time = action_item['completed_at']
-                processing_time = (end_time - start_time).total_seconds()
-                logger.info(f"Action completed in {processing_time:.2f} seconds")
-                
-                # Cooldown between actions to avoid rate limiting
-                await asyncio.sleep(5)
-                
-            except Exception as e:
-                logger.error(f"Error processing action: {e}")
-                action_item['completed_at'] = datetime.now()
-                action_item['success'] = False
-                action_item['error'] = str(e)
-                
-        self.processing = False
-        logger.info("Queue processing completed")
-
-queue_manager = ServerActionQueue()
+                'server_url': row['server_url'],
+                'requested_by': row['requested_by'],
+                'timestamp': datetime.fromtimestamp(row['enqueued_at']),
+                'enqueued_at': time.monotonic() - (time.time() - row['enqueued_at']),
+                'span': None,
+                # The callers are gone; nobody awaits the result
+                'future': asyncio.get_running_loop().create_future()
+            })
+            recovered += 1
+        if recovered:
+            logger.info(f"Re-queued {recovered} actions from the previous run")
+
+        # Leases held by another process are reclaimed once they expire
+        if self._recovery:
+            self._recovery.cancel()
+        expiry = self.store.next_lease_expiry()
+        if expiry is not None:
+            delay = max(0.0, expiry - time.time()) + 1
+            self._recovery = asyncio.get_running_loop().call_later(delay, self.recover, True)
+        return recovered
+
+    def _ensure_workers(self):
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        self._workers = [task for task in self._workers if not task.done()]
+        while len(self._workers) < self._worker_count:
+            # Workers serve every caller; they start from an empty context
+            self._workers.append(asyncio.create_task(self._worker(), context=contextvars.Context()))
+
+    async def _worker(self):
+        """Take actions off the queue and execute them, forever"""
+        while True:
+            while not self.queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+
+            action_item = self.queue.popleft()
+            QUEUE_DEPTH.set(len(self.queue))
+            self._pending.pop((action_item['action'], action_item['server_url']), None)
+            if self.store:
+                self.store.lease(action_item['id'])
+            with span('queue.execute', parent=action_item['span'], action=action_item['action']):
+                await self._execute(action_item)
+
+            # Cooldown between actions to avoid rate limiting
+            if self.cooldown:
+                await asyncio.sleep(self.cooldown)
+
+    async def _execute(self, action_item):
+        future = action_item['future']
+        started = time.monotonic()
+        wait_time = started - action_item['enqueued_at']
+        QUEUE_WAIT.observe(wait_time, action=action_item['action'])
+        record_span('queue.wait', action_item['enqueued_at'], started, parent=action_item['span'],
+                    action=action_item['action'])
+        self.in_progress += 1
+        QUEUE_IN_PROGRESS.set(self.in_progress)
+        renewal = asyncio.create_task(self._renew_lease(action_item)) if self.store else None
+        logger.info(
+            f"Processing action '{action_item['action']}' from user {action_item['user_id']} "
+            f"in guild {action_item['guild_id']} after {wait_time:.2f}s in queue"
+        )
+        try:
+            result = await self._handlers[action_item['action']](action_item)
+            action_item['success'] = True
+            if self.store:
+                self.store.finish(action_item['id'], True, result=result)
+            QUEUE_ACTIONS.inc(action=action_item['action'], outcome='completed')
+            if not future.done():
+                future.set_result(result)
+        except Exception as e:
+            logger.error(f"Error processing action: {e}")
+            action_item['success'] = False
+            action_item['error'] = str(e)
+            if self.store:
+                self.store.finish(action_item['id'], False, error=str(e))
+            QUEUE_ACTIONS.inc(action=action_item['action'], outcome='failed')
+            if not future.done():
+                future.set_exception(e)
+                # Nobody may be awaiting it any more
+                future.exception()
+        finally:
+            if renewal:
+                renewal.cancel()
+            self.in_progress -= 1
+            QUEUE_IN_PROGRESS.set(self.in_progress)
+            service_time = time.monotonic() - started
+            QUEUE_SERVICE.observe(service_time, action=action_item['action'])
+            action_item['completed_at'] = datetime.now()
+            logger.info(f"Action '{action_item['action']}' completed in {service_time:.2f} seconds")
+
+    async def _renew_lease(self, action_item):
+        """Keep the store lease of a running action from expiring"""
+        while True:
+            await asyncio.sleep(self.store.lease_seconds / 3)
+            self.store.renew(action_item['id'])
+
+    def history(self, guild_id=None, user_id=None, limit: int = 20):
+        """Recent actions from the store for a guild and/or user, newest first"""
+        if not self.store:
+            return []
+        return self.store.recent(guild_id, user_id, limit)
+
+    def close(self):
+        """Commit outstanding store writes"""
+        if self._recovery:
+            self._recovery.cancel()
+        if self.store:
+            self.store.close()
+
+def _make_store():
+    if not QUEUE_DB:
+        return None
+    from action_store import ActionStore
+    logger.info(f"Recording queued actions in {QUEUE_DB}")
+    return ActionStore(QUEUE_DB, QUEUE_DB_COMMIT_INTERVAL, QUEUE_DB_MAX_BATCH, QUEUE_DB_LEASE)
+
+queue_manager = ServerActionQueue(store=_make_store())
@@ -0,0 +1,120 @@
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+from logging_config import logger
+
+# Error classes used to pick a retry strategy
+THROTTLED = 'throttled'   # 429/503: upstream asked us to slow down
+CHALLENGE = 'challenge'   # Cloudflare challenge or block
+NETWORK = 'network'       # connection problems and timeouts
+SERVER = 'server'         # other 5xx responses
+CLIENT = 'client'         # other 4xx responses, retrying will not help
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, up to `capacity` banked"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        """Wait until a token is available and take it"""
+        while True:
+            pause = self.paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+                continue
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AdaptiveRateLimiter:
+    """Per-host token buckets whose rate follows upstream health.
+
+    Successful responses raise the rate additively up to `max_rate`;
+    throttling and challenges halve it down to `min_rate`, and a
+    Retry-After pauses the host entirely for that long.
+    """
+
+    def __init__(self, rate: float, burst: float, min_rate: float, max_rate: float,
+                 increase: float = 0.1):
+        self.initial_rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self._buckets = {}
+
+    def bucket(self, url):
+        host = urlsplit(url).netloc
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = TokenBucket(self.initial_rate, self.burst)
+        return bucket
+
+    async def acquire(self, url):
+        await self.bucket(url).acquire()
+
+    def on_success(self, url):
+        bucket = self.bucket(url)
+        bucket.rate = min(self.max_rate, bucket.rate + self.increase)
+
+    def on_throttled(self, url, retry_after: float = None):
+        bucket = self.bucket(url)
+        bucket.rate = max(self.min_rate, bucket.rate / 2)
+        if retry_after:
+            bucket.paused_until = max(bucket.paused_until, time.monotonic() + retry_after)
+        logger.warning(
+            f"Upstream {urlsplit(url).netloc} throttled us, rate now {bucket.rate:.2f}/s"
+            + (f", paused for {retry_after:.0f}s" if retry_after else "")
+        )
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_error(error):
+    """Sort a failed request into one of the retry classes above"""
+    response = getattr(error, 'response', None)
+    status = getattr(response, 'status_code', None)
+    if status in (429, 503):
+        return THROTTLED
+    if type(error).__module__.startswith('cloudscraper'):
+        return CHALLENGE
+    if status == 403 and response is not None and response.headers.get('cf-mitigated'):
+        return CHALLENGE
+    if status is not None:
+        return SERVER if status >= 500 else CLIENT
+    return NETWORK
+
+
+def backoff_delay(attempt: int, base: float, cap: float, retry_after: float = None):
+    """Exponential backoff with full jitter; an explicit Retry-After wins"""
+    if retry_after is not None:
+        return retry_after
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
@@ -0,0 +1,289 @@
+import asyncio
+import os
+import sys
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from logging_config import logger
+from ipc import IpcClient
+from metrics import metrics
+from server_directory import ServerDirectory
+from tracing import span
+from config import (
+    CONTROLLER_MODE,
+    CONTROLLER_WORKERS,
+    CONTROLLER_SOCKET,
+    IPC_TIMEOUT,
+    IPC_ACTION_TIMEOUT,
+    WORKER_HEALTH_INTERVAL,
+    WORKER_STARTUP_TIMEOUT,
+    SERVER_DIRECTORY_REFRESH,
+    UPSTREAM_RATE,
+    UPSTREAM_BURST,
+    UPSTREAM_MIN_RATE,
+    UPSTREAM_MAX_RATE,
+    TRACE_FILE
+)
+
+WORKER_SCRIPT = Path(__file__).resolve().parent / 'controller_worker.py'
+# Failed health checks in a row before a spawned worker is restarted
+MAX_HEALTH_FAILURES = 3
+# Seconds to wait for a worker's metrics before showing its last ones
+METRICS_TIMEOUT = 2
+
+
+@dataclass(frozen=True)
+class RemoteBreaker:
+    """A worker's circuit breaker as last reported over IPC"""
+    name: str
+    state: str
+
+
+class RemoteBreakers:
+    def __init__(self, workers):
+        self.workers = workers
+
+    def open_breakers(self):
+        """Breakers that are not closed in any worker"""
+        seen = {}
+        for worker in self.workers:
+            for name, state in worker.client.open_breakers:
+                seen.setdefault(name, RemoteBreaker(name, state))
+        return list(seen.values())
+
+
+def worker_env(index, workers):
+    """Environment for a spawned worker: its own log and trace files and its share of the upstream rate.
+
+    Every worker paces its requests with its own token bucket, so the
+    configured rate and burst are split between them to keep the total
+    sent to Aternos where it was with one process.
+    """
+    # Each worker logs and traces to its own files; appending to one file
+    # from several processes is not safe
+    log_file = os.getenv("LOG_FILE", "minecraft_bot.log")
+    return dict(
+        os.environ,
+        LOG_FILE=f"{log_file}.worker{index}",
+        TRACE_FILE=f"{TRACE_FILE}.worker{index}" if TRACE_FILE else "",
+        UPSTREAM_RATE=str(UPSTREAM_RATE / workers),
+        UPSTREAM_BURST=str(max(1.0, UPSTREAM_BURST / workers)),
+        UPSTREAM_MIN_RATE=str(UPSTREAM_MIN_RATE / workers),
+        UPSTREAM_MAX_RATE=str(UPSTREAM_MAX_RATE / workers),
+    )
+
+
+class WorkerProcess:
+    """One controller worker: its IPC client and, when spawned here, its process"""
+
+    def __init__(self, index, path, spawn: bool, workers: int = 1):
+        self.index = index
+        self.path = path
+        self.spawn = spawn
+        self.workers = workers
+        self.client = IpcClient(path, IPC_TIMEOUT)
+        self.process = None
+        self.health_failures = 0
+
+    async def start(self):
+        """Spawn the worker if we own it, then wait until it answers a ping"""
+        if self.spawn and (self.process is None or self.process.returncode is not None):
+            self.process = await asyncio.create_subprocess_exec(
+                sys.executable, str(WORKER_SCRIPT), '--socket', self.path, '--parent-pid', str(os.getpid()),
+                env=worker_env(self.index, self.workers)
+            )
+            logger.info(f"Started Aternos worker {self.index} (pid {self.process.pid})")
+
+        deadline = asyncio.get_running_loop().time() + WORKER_STARTUP_TIMEOUT
+        while True:
+            try:
+                return await self.client.call('ping', timeout=5)
+            except Exception as e:
+                if asyncio.get_running_loop().time() > deadline:
+                    raise Exception(f"Aternos worker {self.index} did not start: {e}")
+                await asyncio.sleep(0.2)
+
+    async def check(self):
+        """Ping the worker; returns whether it answered"""
+        try:
+            await self.client.call('ping', timeout=5)
+            self.health_failures = 0
+            return True
+        except Exception as e:
+            self.health_failures += 1
+            logger.warning(f"Aternos worker {self.index} failed a health check ({self.health_failures}): {e}")
+            return False
+
+    @property
+    def needs_restart(self):
+        exited = self.process is not None and self.process.returncode is not None
+        return self.spawn and (exited or self.health_failures >= MAX_HEALTH_FAILURES)
+
+    async def stop(self):
+        await self.client.close()
+        if self.process and self.process.returncode is None:
+            self.process.terminate()
+            try:
+                await asyncio.wait_for(self.process.wait(), 10)
+            except asyncio.TimeoutError:
+                self.process.kill()
+
+
+class RemoteController:
+    """Stands in for AternosController while the real one runs in worker processes.
+
+    Calls about one server always go to the same worker, so its page
+    cache, per-server locks and single-flight loading keep working;
+    everything else (guild selections, the server list) goes to the
+    first worker. What must be answered without a round trip is kept
+    here: the server directory for autocomplete, the last page seen per
+    server and the workers' open circuit breakers.
+    """
+
+    # The HTTP session and the status websocket live in the workers
+    scraper = None
+    live_status = None
+
+    def __init__(self, socket_paths, spawn: bool):
+        self.workers = [WorkerProcess(i, path, spawn, len(socket_paths)) for i, path in enumerate(socket_paths)]
+        self.breakers = RemoteBreakers(self.workers)
+        self.directory = ServerDirectory(self._refresh_directory, SERVER_DIRECTORY_REFRESH)
+        self._pages = {}  # server URL -> last ServerPage received
+        self._health_task = None
+        # Upstream metrics are recorded in the workers; /metrics shows them too
+        metrics.add_collector(self.collect_metrics)
+
+    def _worker_for(self, server_url=None):
+        if not server_url or len(self.workers) == 1:
+            return self.workers[0]
+        return self.workers[zlib.crc32(server_url.encode()) % len(self.workers)]
+
+    def _remember(self, page):
+        if page is not None:
+            self._pages[page.url] = page
+        return page
+
+    async def _refresh_directory(self):
+        return await self.workers[0].client.call('refresh_directory')
+
+    async def ensure_logged_in(self):
+        """Start the workers and log each of them in"""
+        for worker in self.workers:
+            await worker.start()
+            await worker.client.call('ensure_logged_in', timeout=IPC_ACTION_TIMEOUT)
+        if self._health_task is None:
+            self._health_task = asyncio.create_task(self._watch_health())
+        return True
+
+    async def login(self):
+        for worker in self.workers:
+            await worker.client.call('login', timeout=IPC_ACTION_TIMEOUT)
+        return True
+
+    async def list_servers(self):
+        return await self.workers[0].client.call('list_servers')
+
+    async def select_server(self, server_name: str = None, guild_id=None):
+        return await self.workers[0].client.call('select_server', server_name, guild_id)
+
+    async def server_for(self, guild_id=None):
+        return await self.workers[0].client.call('server_for', guild_id)
+
+    async def get_server_page(self, server_url: str = None, max_age: float = None):
+        server_url = server_url or await self.server_for()
+        return self._remember(await self._worker_for(server_url).client.call(
+            'get_server_page', server_url, max_age=max_age))
+
+    async def get_status_page(self, server_url: str = None, max_age: float = None):
+        server_url = server_url or await self.server_for()
+        return self._remember(await self._worker_for(server_url).client.call(
+            'get_status_page', server_url, max_age=max_age))
+
+    def peek_status_page(self, server_url):
+        """Last status snapshot received from a worker, or None"""
+        return self._pages.get(server_url)
+
+    async def get_all_status_pages(self, concurrency: int):
+        """One server list fetch, then each server's status from the worker that owns it"""
+        entries = await self.directory.refresh_or_last()
+        owned = {}  # worker -> its servers' entries
+        for entry in entries:
+            owned.setdefault(self._worker_for(entry.url), []).append(entry)
+        share = max(1, concurrency // len(owned)) if owned else concurrency
+        with span('aternos.status_all', servers=len(entries)):
+            parts = await asyncio.gather(*(
+                worker.client.call('get_status_pages', worker_entries, share, timeout=IPC_ACTION_TIMEOUT)
+                for worker, worker_entries in owned.items()
+            ))
+        statuses = {}
+        for part in parts:
+            for entry, page, error in part:
+                statuses[entry.id] = entry, self._remember(page), error
+        return [statuses[entry.id] for entry in entries]
+
+    async def get_server_status(self, page=None, server_url: str = None):
+        server_url = server_url or (page.url if page else await self.server_for())
+        return await self._worker_for(server_url).client.call('get_server_status', page, server_url)
+
+    async def wait_for_status_change(self, server_url, timeout: float):
+        await self._worker_for(server_url).client.call(
+            'wait_for_status_change', server_url, timeout, timeout=timeout + IPC_TIMEOUT)
+
+    async def start_server(self, page=None, server_url: str = None):
+        server_url = server_url or (page.url if page else await self.server_for())
+        return await self._worker_for(server_url).client.call(
+            'start_server', page, server_url, timeout=IPC_ACTION_TIMEOUT)
+
+    async def stop_server(self, page=None, server_url: str = None):
+        server_url = server_url or (page.url if page else await self.server_for())
+        return await self._worker_for(server_url).client.call(
+            'stop_server', page, server_url, timeout=IPC_ACTION_TIMEOUT)
+
+    async def collect_metrics(self):
+        """Fetch every worker's metrics into the registry, labelled with the worker's index"""
+        async def collect(worker):
+            try:
+                metrics.update_source(str(worker.index), await worker.client.call('metrics', timeout=METRICS_TIMEOUT))
+            except Exception as e:
+                logger.warning(f"Could not collect metrics from Aternos worker {worker.index}: {e}")
+
+        await asyncio.gather(*(collect(worker) for worker in self.workers))
+
+    async def _watch_health(self):
+        """Ping every worker and restart spawned ones that died or stopped answering"""
+        while True:
+            await asyncio.sleep(WORKER_HEALTH_INTERVAL)
+            for worker in self.workers:
+                await worker.check()
+                if not worker.needs_restart:
+                    continue
+                logger.error(f"Restarting Aternos worker {worker.index}")
+                try:
+                    await worker.stop()
+                    await worker.start()
+                    await worker.client.call('ensure_logged_in', timeout=IPC_ACTION_TIMEOUT)
+                    worker.health_failures = 0
+                except Exception as e:
+                    logger.error(f"Could not restart Aternos worker {worker.index}: {e}")
+
+    async def cleanup(self):
+        """Stop the directory refresh and the workers we spawned"""
+        metrics.remove_collector(self.collect_metrics)
+        self.directory.stop()
+        if self._health_task:
+            self._health_task.cancel()
+            self._health_task = None
+        for worker in self.workers:
+            await worker.stop()
+
+
+def make_controller():
+    """The controller selected by CONTROLLER_MODE: in this process, spawned workers or running ones"""
+    if CONTROLLER_MODE == 'local':
+        from aternos_controller import AternosController
+        return AternosController()
+    if CONTROLLER_MODE not in ('spawn', 'connect'):
+        raise ValueError(f"Unknown CONTROLLER_MODE '{CONTROLLER_MODE}'")
+    paths = [f"{CONTROLLER_SOCKET}.{i}" for i in range(CONTROLLER_WORKERS)]
+    logger.info(f"Aternos controller runs in {len(paths)} worker process(es) ({CONTROLLER_MODE})")
+    return RemoteController(paths, spawn=CONTROLLER_MODE == 'spawn')
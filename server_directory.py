@@ -0,0 +1,215 @@
+import asyncio
+import bisect
+import difflib
+import itertools
+import time
+from dataclasses import dataclass
+from logging_config import logger
+from parsing import make_soup
+from server_page import normalize_status
+
+# Selectors for server cards on the server list, in priority order
+SERVER_CARD_SELECTORS = [
+    'div.server',
+    '.servercardlist div',
+    'a[href^="/server/"]',
+    'div[data-id]'  # From the HTML it appears servers have data-id
+]
+
+# Status label on a server card, when the list shows one
+CARD_STATUS_SELECTOR = '.statuslabel-label, .status-label, .status'
+
+
+@dataclass(frozen=True)
+class ServerEntry:
+    """One server from the account's server list"""
+    id: str
+    name: str
+    url: str
+    status: str = None  # as shown on the card, if it shows one
+
+
+def _card_name(card):
+    name_element = card.select_one('.server-name')
+    return (
+        card.get('title', '').strip() or
+        card.get('data-name', '').strip() or
+        (name_element.get_text(strip=True) if name_element else '') or
+        card.get_text(strip=True) or
+        'Unknown Server'
+    )
+
+
+def _card_status(card):
+    status_element = card.select_one(CARD_STATUS_SELECTOR)
+    label = status_element.get_text(strip=True) if status_element else ''
+    return normalize_status(label) if label else None
+
+
+def _card_id(card):
+    server_id = card.get('data-id')
+    if not server_id and card.name == 'a':
+        server_id = card.get('href', '').rstrip('/').split('/')[-1]
+
+    # If no ID found, try to extract from text (e.g., "#NXQg3wb6jW304RtI")
+    text = card.get_text(" ")
+    if not server_id and '#' in text:
+        potential_id = text[text.find('#') + 1:].strip()
+        # Take the first "word" after # as ID
+        server_id = potential_id.split()[0] if potential_id else None
+
+    if not server_id:
+        # If still no ID, look for any child elements that might contain the ID
+        for child in card.find_all():
+            if child.get('data-id'):
+                server_id = child.get('data-id')
+                break
+            elif child.get('href') and '/server/' in child.get('href'):
+                server_id = child.get('href').rstrip('/').split('/')[-1]
+                break
+    return server_id
+
+
+def parse_server_list(html, backend=None, base_url="https://aternos.org/server/"):
+    """Extract every server card from the server list page"""
+    soup = make_soup(html, backend)
+
+    server_cards = []
+    for selector in SERVER_CARD_SELECTORS:
+        server_cards = soup.select(selector)
+        if server_cards:
+            logger.debug(f"Found {len(server_cards)} server cards using selector: {selector}")
+            break
+
+    if not server_cards:
+        # If no servers found with selectors, try looking for server information directly
+        server_cards = soup.find_all(['h2', 'h3', 'div'], string=lambda s: s and "#" in s)
+
+    entries = {}
+    for card in server_cards:
+        server_id = _card_id(card)
+        # Nested matches (e.g. every div of a card) resolve to the same ID
+        if server_id and server_id not in entries:
+            entries[server_id] = ServerEntry(
+                id=server_id,
+                name=_card_name(card),
+                url=f"{base_url}{server_id}",
+                status=_card_status(card)
+            )
+    return list(entries.values())
+
+
+class ServerDirectory:
+    """In-memory index of the account's servers, refreshed in the background.
+
+    Exact and prefix lookups on names and IDs are a dict hit or a bisect
+    over the sorted names; substring matching is only tried when those
+    miss, and fuzzy matching only for autocomplete.
+    """
+
+    def __init__(self, loader, refresh_interval: float):
+        self._loader = loader  # async callable returning a list of ServerEntry
+        self.refresh_interval = refresh_interval
+        self.entries = []
+        self.refreshed_at = None
+        self._by_key = {}       # lowercased name or id -> entry
+        self._sorted_keys = []  # sorted lowercased names and ids, for prefix search
+        self._refresh_lock = asyncio.Lock()
+        self._task = None
+
+    def update(self, entries):
+        """Replace the index with a fresh server list"""
+        by_key = {}
+        for entry in entries:
+            by_key.setdefault(entry.id.lower(), entry)
+            by_key.setdefault(entry.name.lower(), entry)
+        self.entries = list(entries)
+        self._by_key = by_key
+        self._sorted_keys = sorted(by_key)
+        self.refreshed_at = time.time()
+
+    async def refresh(self):
+        """Reload the server list; concurrent callers share one reload"""
+        refreshed_at = self.refreshed_at
+        async with self._refresh_lock:
+            if self.refreshed_at != refreshed_at:
+                # Someone else refreshed while we waited for the lock
+                return self.entries
+            self.update(await self._loader())
+            logger.info(f"Server directory refreshed: {len(self.entries)} servers")
+            return self.entries
+
+    async def refresh_or_last(self):
+        """Reload the server list, falling back to the last one if that fails"""
+        try:
+            return await self.refresh()
+        except Exception as e:
+            if not self.entries:
+                raise
+            logger.warning(f"Server list refresh failed, using the last one: {e}")
+            return self.entries
+
+    def _prefixed(self, prefix):
+        """Yield entries whose name or id starts with prefix, in sorted order"""
+        index = bisect.bisect_left(self._sorted_keys, prefix)
+        while index < len(self._sorted_keys) and self._sorted_keys[index].startswith(prefix):
+            yield self._by_key[self._sorted_keys[index]]
+            index += 1
+
+    def lookup(self, query: str):
+        """Find the entry for a name or id: exact, then a unique prefix or substring match.
+
+        Commands act on the result, so an ambiguous or merely similar
+        name finds nothing; fuzzy matching is left to complete().
+        """
+        if not self.entries:
+            return None
+        if not query:
+            return self.entries[0]
+        key = query.strip().lower()
+        if key in self._by_key:
+            return self._by_key[key]
+        for candidates in (self._prefixed(key), (e for e in self.entries if key in e.name.lower())):
+            matches = set(candidates)
+            if len(matches) == 1:
+                return matches.pop()
+            if matches:
+                logger.info(f"'{query}' matches several servers: {', '.join(sorted(e.name for e in matches))}")
+                return None
+        return None
+
+    def complete(self, current: str, limit: int = 25):
+        """Suggestions for autocomplete; never touches the network"""
+        key = (current or '').strip().lower()
+        if not key:
+            return self.entries[:limit]
+        suggestions = []
+        candidates = itertools.chain(
+            self._prefixed(key),
+            (e for e in self.entries if key in e.name.lower()),
+            (self._by_key[k] for k in difflib.get_close_matches(key, self._sorted_keys, n=limit))
+        )
+        for entry in candidates:
+            if entry not in suggestions:
+                suggestions.append(entry)
+            if len(suggestions) >= limit:
+                break
+        return suggestions
+
+    def start(self):
+        """Start refreshing the directory in the background"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Server directory refresh failed: {e}")
+            await asyncio.sleep(self.refresh_interval)
@@ -0,0 +1,186 @@
+import time
+from urllib.parse import urljoin
+from dataclasses import dataclass, field
+from logging_config import logger
+from metrics import SELECTOR_FALLBACKS
+from parsing import SelectorPlan, get_backend, run_plans
+
+# Status words searched in the page text when no status element matches
+STATUS_WORDS = ["Offline", "Online", "Starting", "Stopping", "In Queue"]
+
+RUNNING_STATES = ["online", "starting", "in queue"]
+STOPPED_STATES = ["offline", "stopping"]
+
+# Panel labels (lowercased fragments) and the status they stand for. The
+# status element also holds extras such as the uptime ("Online1:24:05").
+STATUS_LABELS = [
+    ("queue", "In Queue"),
+    ("offline", "Offline"),
+    ("online", "Online"),
+    ("starting", "Starting"),
+    ("preparing", "Starting"),
+    ("loading", "Starting"),
+    ("stopping", "Stopping"),
+    ("saving", "Stopping"),
+]
+
+
+def normalize_status(label):
+    """Map a raw panel label to one of STATUS_WORDS, keeping unknown labels as-is"""
+    lowered = label.lower()
+    return next((status for fragment, status in STATUS_LABELS if fragment in lowered), label)
+
+
+@dataclass(frozen=True)
+class ServerPage:
+    """Everything the bot needs from one server page, parsed once"""
+    url: str
+    status: str
+    address: str = None
+    players: str = None
+    queue_position: str = None
+    start_url: str = None
+    stop_url: str = None
+    confirm_url: str = None
+    fetched_at: float = field(default_factory=time.time)
+
+    @property
+    def age(self):
+        """Seconds since the page was fetched"""
+        return time.time() - self.fetched_at
+
+    @property
+    def is_running(self):
+        return self.status.lower() in RUNNING_STATES
+
+    @property
+    def is_stopped(self):
+        return self.status.lower() in STOPPED_STATES
+
+
+def _button_selectors(action):
+    label = action.capitalize()
+    return [
+        f'a.btn-{action}',
+        f'a.{action}',
+        f'div.{action}',
+        f'button.{action}',
+        f'a:contains("{label}")',
+        f'button:contains("{label}")',
+        # Any link pointing at or labelled with the action
+        f'a[href*="{action}" i], a:icontains("{action}")',
+        # Any button-like element labelled with the action
+        f'button:icontains("{action}"), input:icontains("{action}"), div:icontains("{action}")',
+    ]
+
+
+# Selector cascades, compiled once at import and evaluated together in a
+# single traversal of the page. Earlier selectors take priority.
+STATUS_PLAN = SelectorPlan([
+    '.status',
+    '.server-status',
+    '.statuslabel-label',
+    'div:contains("Offline")',
+    'div[class*="status"]',
+    '.statusicon',
+    'div.status-label',
+])
+START_PLAN = SelectorPlan(_button_selectors('start'))
+STOP_PLAN = SelectorPlan(_button_selectors('stop'))
+STATUS_WORD_PLANS = [SelectorPlan([f':contains("{word}")']) for word in STATUS_WORDS]
+# Buttons used to infer the status when nothing else matched
+START_MARKER_PLAN = SelectorPlan(['a.btn-start, a.start'])
+STOP_MARKER_PLAN = SelectorPlan(['a.btn-stop, a.stop'])
+ADDRESS_PLAN = SelectorPlan(['div:contains(".aternos.me"), span:contains(".aternos.me")'])
+PLAYERS_PLAN = SelectorPlan([':contains("Players"):contains("/")'])
+QUEUE_PLAN = SelectorPlan([':icontains("queue"):contains("#")'])
+CONFIRM_PLAN = SelectorPlan(['[href]:contains("Confirm")'])
+
+PAGE_PLANS = [
+    STATUS_PLAN, START_PLAN, STOP_PLAN, START_MARKER_PLAN, STOP_MARKER_PLAN,
+    ADDRESS_PLAN, PLAYERS_PLAN, QUEUE_PLAN, CONFIRM_PLAN, *STATUS_WORD_PLANS
+]
+
+
+def _absolute(url, page_url):
+    """Resolve a link against the page it was found on"""
+    return urljoin(page_url, url)
+
+
+def _action_url(backend, button, server_url, action):
+    """Work out the URL a start/stop button points to"""
+    tag, _, get = backend.describe(button)
+    url = None
+    if tag == 'a':
+        url = get('href')
+    elif get('onclick'):
+        # Try to extract URL from onclick attribute
+        onclick = get('onclick')
+        if 'window.location' in onclick and 'http' in onclick:
+            url = onclick.split("'")[1] if "'" in onclick else onclick.split('"')[1]
+
+    if not url:
+        # Try data attributes
+        url = get('data-href') or get('data-url')
+
+    if not url:
+        # Last resort: look for form with action
+        form = backend.parent(button)
+        while form is not None and backend.describe(form)[0] != 'form':
+            form = backend.parent(form)
+        if form is not None and form.get('action'):
+            url = form.get('action')
+
+    if not url:
+        # If still no URL, try AJAX approach
+        logger.info(f"No direct URL found, using default {action} endpoint")
+        url = f"{server_url}/{action}"
+
+    return _absolute(url, server_url)
+
+
+def parse_server_page(html, url, backend=None):
+    """Build a ServerPage from the server page HTML in a single traversal"""
+    backend = backend or get_backend()
+    root = backend.parse(html)
+    (status, start, stop, start_marker, stop_marker,
+     address, players, queue, confirm, *status_words) = run_plans(backend, root, PAGE_PLANS)
+
+    for name, match in (('status', status), ('start', start), ('stop', stop)):
+        if match and match.priority > 0:
+            SELECTOR_FALLBACKS.inc(field=name)
+
+    status_text = None
+    if status:
+        status_text = normalize_status(backend.text(status.element))
+        logger.debug(f"Found status element with selector: {status.selector}")
+    if not status_text:
+        status_text = next((word for word, found in zip(STATUS_WORDS, status_words) if found), None)
+    if not status_text:
+        # Last resort - check for start/stop buttons to infer status
+        if stop_marker and not start_marker:
+            status_text = "Online"
+        elif start_marker and not stop_marker:
+            status_text = "Offline"
+        else:
+            logger.warning("Status element not found")
+            status_text = "Status unavailable"
+
+    start_url = stop_url = None
+    if start:
+        logger.debug(f"Found start button with selector: {start.selector}")
+        start_url = _action_url(backend, start.element, url, 'start')
+    if stop:
+        logger.debug(f"Found stop button with selector: {stop.selector}")
+        stop_url = _action_url(backend, stop.element, url, 'stop')
+
+    return ServerPage(
+        url=url,
+        status=status_text,
+        address=address.text.strip() if address else None,
+        players=backend.text(players.element) if players else None,
+        queue_position=queue.text.strip() if queue else None,
+        start_url=start_url,
+        stop_url=stop_url,
+        confirm_url=_absolute(confirm.element.get('href'), url) if confirm else None,
+    )
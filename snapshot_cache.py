@@ -0,0 +1,79 @@
+import asyncio
+import time
+from logging_config import logger
+from metrics import CACHE_REQUESTS
+
+class SnapshotCache:
+    """Per-key snapshot cache with a TTL and single-flight loading.
+
+    Concurrent callers asking for the same stale key share one in-flight
+    load instead of each issuing their own upstream request.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries = {}      # key -> (stored_at, value)
+        self._inflight = {}     # key -> asyncio.Future
+        self._generations = {}  # key -> bumped on every invalidation
+
+    def peek(self, key):
+        """Return the last stored value for key regardless of its age"""
+        entry = self._entries.get(key)
+        return entry[1] if entry else None
+
+    def invalidate(self, key=None):
+        """Drop one key (or everything) so the next get() loads fresh data"""
+        keys = [key] if key is not None else list(set(self._entries) | set(self._inflight))
+        for k in keys:
+            self._entries.pop(k, None)
+            # Callers already waiting keep their result, but nobody new
+            # joins a load that started before the invalidation
+            self._inflight.pop(k, None)
+            self._generations[k] = self._generations.get(k, 0) + 1
+        logger.debug(f"Invalidated snapshot cache: {key or 'all'}")
+
+    async def get(self, key, loader, max_age: float = None):
+        """Return a cached value younger than max_age, loading it at most once"""
+        ttl = self.ttl if max_age is None else max_age
+        while True:
+            entry = self._entries.get(key)
+            if entry and time.monotonic() - entry[0] <= ttl:
+                CACHE_REQUESTS.inc(outcome='hit')
+                return entry[1]
+
+            future = self._inflight.get(key)
+            if future is None:
+                break
+
+            CACHE_REQUESTS.inc(outcome='coalesced')
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # The caller that owned the load went away; try again
+                # unless it is us being cancelled
+                if future.cancelled() and not asyncio.current_task().cancelling():
+                    continue
+                raise
+
+        CACHE_REQUESTS.inc(outcome='miss')
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        generation = self._generations.get(key, 0)
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting
+            future.exception()
+            raise
+        else:
+            if self._generations.get(key, 0) == generation:
+                self._entries[key] = (time.monotonic(), value)
+            future.set_result(value)
+            return value
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
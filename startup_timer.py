@@ -0,0 +1,52 @@
+import json
+import time
+from contextlib import contextmanager
+from logging_config import logger
+
+class StartupTimer:
+    """Records how long each startup phase takes, relative to process start"""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.phases = {}  # name -> (started at, duration), seconds since origin
+        self.reported = False
+
+    @contextmanager
+    def phase(self, name):
+        """Time the enclosed block as one startup phase"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            finished = time.perf_counter()
+            self.phases[name] = (started - self.origin, finished - started)
+            logger.debug(f"Startup phase '{name}' took {(finished - started) * 1000:.1f} ms")
+
+    def report_when_complete(self, required, report_file=None):
+        """Log the startup report once every phase in `required` has been recorded"""
+        if self.reported or any(name not in self.phases for name in required):
+            return
+        self.reported = True
+
+        total = max(start + duration for start, duration in self.phases.values())
+        summary = ", ".join(
+            f"{name} {duration * 1000:.0f} ms"
+            for name, (_, duration) in sorted(self.phases.items(), key=lambda item: item[1][0])
+        )
+        logger.info(f"Startup timing: {summary} (ready after {total * 1000:.0f} ms)")
+
+        if report_file:
+            # One JSON line per start, so the budget can be compared across releases
+            record = {
+                'timestamp': time.time(),
+                'total_ms': round(total * 1000, 1),
+                'phases': {name: round(duration * 1000, 1)
+                           for name, (_, duration) in self.phases.items()},
+            }
+            try:
+                with open(report_file, 'a') as f:
+                    f.write(json.dumps(record) + "\n")
+            except OSError as e:
+                logger.warning(f"Could not write startup report: {e}")
+
+startup_timer = StartupTimer()
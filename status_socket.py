@@ -0,0 +1,140 @@
+import asyncio
+import json
+import aiohttp
+from logging_config import logger
+from server_page import ServerPage, normalize_status
+from config import ATERNOS_BASE_URL, ATERNOS_SERVER_LIST_URL, ATERNOS_WS_URL, ATERNOS_WS_HEARTBEAT
+
+
+def decode_status_message(data):
+    """Turn the server object of a websocket status frame into a ServerPage"""
+    server_id = data.get('id')
+    if not server_id:
+        return None
+
+    players = None
+    if data.get('players') is not None:
+        players = f"{data['players']}/{data['max']} players" if data.get('max') else f"{data['players']} players"
+
+    queue_position = None
+    queue = data.get('queue')
+    if isinstance(queue, dict) and queue.get('position'):
+        queue_position = f"Position {queue['position']}"
+        if queue.get('count'):
+            queue_position += f"/{queue['count']}"
+
+    label = data.get('label') or data.get('class') or ''
+    return ServerPage(
+        url=f"{ATERNOS_SERVER_LIST_URL}{server_id}",
+        status=normalize_status(label),
+        address=data.get('address') or data.get('displayAddress'),
+        players=players,
+        queue_position=queue_position,
+    )
+
+
+class StatusSocket:
+    """Live server status pushed over the Aternos panel websocket.
+
+    One connection is held per logged-in session. Status frames are
+    decoded into ServerPage snapshots without buttons, so they can answer
+    status reads but never start or stop a server. While the socket is
+    down `page()` returns None and callers fall back to HTML polling.
+    """
+
+    def __init__(self, cookies, url: str = ATERNOS_WS_URL, heartbeat: float = ATERNOS_WS_HEARTBEAT,
+                 on_update=None):
+        self._cookies = cookies  # callable returning the session's cookies as a dict
+        self.url = url
+        self.heartbeat = heartbeat
+        self.on_update = on_update  # callable(old_page, new_page) for every decoded frame
+        self.connected = False
+        self.pages = {}     # server URL -> last pushed ServerPage
+        self._changed = {}  # server URL -> asyncio.Event set on every push
+        self._task = None
+        self.stats = {'connects': 0, 'frames': 0, 'status_frames': 0}
+
+    def page(self, server_url):
+        """The last pushed snapshot for a server, or None while disconnected"""
+        if not self.connected:
+            return None
+        return self.pages.get(server_url)
+
+    async def wait_for_update(self, server_url, timeout: float):
+        """Wait up to `timeout` seconds for the next push about a server"""
+        event = self._changed.setdefault(server_url, asyncio.Event())
+        event.clear()
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def start(self):
+        """Keep the socket connected in the background"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self.connected = False
+
+    def handle_frame(self, raw):
+        """Decode one text frame and record it when it carries a server status"""
+        self.stats['frames'] += 1
+        try:
+            frame = json.loads(raw)
+            if frame.get('type') != 'status':
+                return None
+            message = frame.get('message')
+            data = json.loads(message) if isinstance(message, str) else message
+            page = decode_status_message(data or {})
+        except (ValueError, TypeError, AttributeError, KeyError) as e:
+            logger.debug(f"Ignoring undecodable websocket frame: {e}")
+            return None
+        if page is None:
+            return None
+
+        self.stats['status_frames'] += 1
+        previous = self.pages.get(page.url)
+        self.pages[page.url] = page
+        self._changed.setdefault(page.url, asyncio.Event()).set()
+        if self.on_update:
+            self.on_update(previous, page)
+        return page
+
+    async def _run(self):
+        delay = 1
+        while True:
+            try:
+                await self._connect_once()
+                delay = 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Status websocket failed, polling until it reconnects in {delay}s: {e}")
+            finally:
+                # Pushes from a dead connection may already be outdated
+                self.connected = False
+                self.pages.clear()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60)
+
+    async def _connect_once(self):
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:123.0) Gecko/20100101 Firefox/123.0',
+            'Origin': ATERNOS_BASE_URL,
+        }
+        async with aiohttp.ClientSession(cookies=self._cookies(), headers=headers) as session:
+            async with session.ws_connect(self.url, heartbeat=self.heartbeat) as ws:
+                self.connected = True
+                self.stats['connects'] += 1
+                logger.info(f"Status websocket connected to {self.url}")
+                async for message in ws:
+                    if message.type == aiohttp.WSMsgType.TEXT:
+                        self.handle_frame(message.data)
+                    elif message.type == aiohttp.WSMsgType.ERROR:
+                        raise ws.exception() or Exception("websocket error")
+        logger.info("Status websocket closed")
@@ -0,0 +1,154 @@
+import asyncio
+import contextvars
+import time
+from logging_config import logger
+from config import STATUS_FAST_INTERVAL, STATUS_SLOW_INTERVAL, STATUS_IDLE_POLLS
+
+# States that are expected to change soon and are polled at the fast interval
+TRANSITIONAL_STATES = ["starting", "stopping", "in queue"]
+
+
+class StatusWatcher:
+    """Polls watched servers adaptively and pushes status transitions to subscribers.
+
+    A server is polled every STATUS_FAST_INTERVAL seconds while it is in
+    a transitional state or has subscribers, and every
+    STATUS_SLOW_INTERVAL seconds once it is steady. Polling stops after
+    STATUS_IDLE_POLLS steady or failed polls in a row with no subscribers
+    left, so an unreachable server is not polled forever. Reads go
+    through the controller's snapshot cache, so a watcher never adds
+    fetches on top of concurrent commands, and websocket pushes (when
+    enabled) replace the HTML reads altogether.
+    """
+
+    def __init__(self, controller, fast_interval: float = STATUS_FAST_INTERVAL,
+                 slow_interval: float = STATUS_SLOW_INTERVAL, idle_polls: int = STATUS_IDLE_POLLS):
+        self.controller = controller
+        self.fast_interval = fast_interval
+        self.slow_interval = slow_interval
+        self.idle_polls = idle_polls
+        self._subscribers = {}  # server URL -> list of async callbacks(old_page, new_page)
+        self._tasks = {}        # server URL -> polling task
+        self._wakeups = {}      # server URL -> asyncio.Event cutting the poll's wait short
+        self._catching_up = {}  # server URL -> subscribers waiting for their first page
+        self._fresh_after = {}  # server URL -> time.time() the next poll's page must be newer than
+        self.last_pages = {}    # server URL -> last ServerPage seen
+
+    def subscribe(self, server_url, callback, since: float = None):
+        """Call `callback(old_page, new_page)` on every status change; returns an unsubscribe function.
+
+        The subscriber first gets the current page: the last one seen if
+        it was fetched after `since` (a time.time() value, e.g. when the
+        action being followed finished), otherwise the next poll's, which
+        starts right away.
+        """
+        self._subscribers.setdefault(server_url, []).append(callback)
+        task = self._tasks.get(server_url)
+        last_page = self.last_pages.get(server_url)
+        if since is not None:
+            self._fresh_after[server_url] = max(since, self._fresh_after.get(server_url, since))
+        if task is None or task.done():
+            # The first poll publishes the current state to everyone
+            self.last_pages.pop(server_url, None)
+            self.watch(server_url)
+        elif last_page is not None and (since is None or last_page.fetched_at >= since):
+            # Already polling: bring the new subscriber up to date right away
+            asyncio.create_task(self._notify(callback, None, last_page))
+        else:
+            # The poll may be in a slow-interval wait; poll now instead
+            self._catching_up.setdefault(server_url, []).append(callback)
+            self._wakeups.setdefault(server_url, asyncio.Event()).set()
+
+        def unsubscribe():
+            for registry in (self._subscribers, self._catching_up):
+                callbacks = registry.get(server_url, [])
+                if callback in callbacks:
+                    callbacks.remove(callback)
+        return unsubscribe
+
+    def watch(self, server_url):
+        """Make sure the server is being polled"""
+        task = self._tasks.get(server_url)
+        if task is None or task.done():
+            # The poll outlives whichever command asked for it, so it does
+            # not inherit that command's trace
+            self._tasks[server_url] = asyncio.create_task(self._poll(server_url), context=contextvars.Context())
+
+    def stop(self):
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+
+    async def _notify(self, callback, old_page, new_page):
+        try:
+            await callback(old_page, new_page)
+        except Exception as e:
+            logger.warning(f"Status subscriber failed: {e}")
+
+    async def _publish(self, server_url, old_page, new_page):
+        old_status = old_page.status if old_page else None
+        logger.info(f"Status of {server_url}: {old_status} -> {new_page.status}")
+        for callback in list(self._subscribers.get(server_url, [])):
+            await self._notify(callback, old_page, new_page)
+
+    async def _wait(self, server_url, timeout: float):
+        """Wait for the controller to report a change, a new subscriber or the timeout"""
+        wakeup = self._wakeups.setdefault(server_url, asyncio.Event())
+        changed = asyncio.ensure_future(self.controller.wait_for_status_change(server_url, timeout))
+        woken = asyncio.ensure_future(wakeup.wait())
+        try:
+            await asyncio.wait({changed, woken}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            changed.cancel()
+            woken.cancel()
+        if changed.done() and not changed.cancelled() and changed.exception():
+            logger.warning(f"Waiting for a status change of {server_url} failed: {changed.exception()}")
+            if not woken.done() or woken.cancelled():
+                # Do not turn a failing wait into a busy loop
+                await asyncio.sleep(timeout)
+
+    async def _poll(self, server_url):
+        steady_polls = 0
+        interval = self.fast_interval
+        while True:
+            self._wakeups.setdefault(server_url, asyncio.Event()).clear()
+            catching_up = self._catching_up.pop(server_url, [])
+            fresh_after = self._fresh_after.pop(server_url, None)
+            max_age = self.fast_interval
+            if fresh_after is not None:
+                # A cached page from before the followed action would be stale
+                max_age = min(max_age, max(0.0, time.time() - fresh_after))
+            try:
+                page = await self.controller.get_status_page(server_url, max_age=max_age)
+                previous = self.last_pages.get(server_url)
+                self.last_pages[server_url] = page
+                if previous is None or previous.status != page.status:
+                    await self._publish(server_url, previous, page)
+                else:
+                    for callback in catching_up:
+                        await self._notify(callback, None, page)
+
+                if page.status.lower() in TRANSITIONAL_STATES:
+                    interval = self.fast_interval
+                    steady_polls = 0
+                else:
+                    interval = self.slow_interval
+                    steady_polls += 1
+            except Exception as e:
+                logger.warning(f"Status poll for {server_url} failed: {e}")
+                interval = self.slow_interval
+                steady_polls += 1
+                # Still owed a first page, and one newer than the action
+                self._catching_up.setdefault(server_url, [])[:0] = catching_up
+                if fresh_after is not None:
+                    self._fresh_after.setdefault(server_url, fresh_after)
+
+            if not self._subscribers.get(server_url) and steady_polls >= self.idle_polls:
+                logger.debug(f"Stopped watching {server_url}")
+                self._tasks.pop(server_url, None)
+                return
+
+            # Subscribers are waiting for a transition that may start any
+            # moment (e.g. Offline right after a start request), so keep
+            # the fast pace while anyone is listening
+            await self._wait(server_url, self.fast_interval if self._subscribers.get(server_url) else interval)
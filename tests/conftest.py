@@ -0,0 +1,39 @@
+import os
+import socket
+import sys
+from pathlib import Path
+import pytest
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+# config.py reads everything at import time, so the tests point the
+# controller at a stand-in port chosen here, before anything imports it
+STANDIN_PORT = _free_port()
+
+os.environ.update({
+    'DISCORD_TOKEN': 'test',
+    'ATERNOS_USERNAME': 'standin',
+    'ATERNOS_PASSWORD': 'standin',
+    'ATERNOS_BASE_URL': f"http://127.0.0.1:{STANDIN_PORT}",
+    'ATERNOS_WS_URL': f"ws://127.0.0.1:{STANDIN_PORT}/hermes/",
+    'ATERNOS_WS_ENABLED': 'true',
+    'ATERNOS_SESSION_FILE': '',
+    'LOGIN_VERIFY_DELAY': '0',
+    'LOG_FILE': os.devnull,
+    'LOG_LEVEL': 'WARNING',
+})
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+
+@pytest.fixture
+def standin_port():
+    """Port the controller under test expects the Aternos stand-in on"""
+    return STANDIN_PORT
@@ -0,0 +1,87 @@
+import asyncio
+from action_store import ActionStore, DONE, IN_PROGRESS, PENDING
+from metrics import QUEUE_DEPTH, QUEUE_IN_PROGRESS
+from queue_manager import ServerActionQueue
+
+
+def _states(store):
+    return {row['id']: row['state'] for row in store.conn.execute("SELECT id, state FROM actions")}
+
+
+def test_lease_recheck_leaves_actions_queued_by_this_process_alone(tmp_path):
+    path = tmp_path / 'queue.db'
+    # A previous process died while holding a lease that has not expired yet
+    crashed = ActionStore(path, lease_seconds=0.3)
+    orphan = crashed.enqueue('stop', 'srvB', 1, 11)
+    crashed.lease(orphan)
+    crashed.commit()
+
+    async def scenario():
+        store = ActionStore(path, lease_seconds=0.3)
+        queue = ServerActionQueue(workers=1, store=store)
+        release = asyncio.Event()
+        ran = []
+
+        async def busy(item):
+            ran.append(item['id'])
+            await release.wait()
+            return True
+
+        queue.register('start', busy)
+        queue.register('stop', busy)
+        assert queue.recover() == 0
+
+        first = queue.add_action('start', 1, 10, 'srvA')
+        second = queue.add_action('start', 1, 12, 'srvC')  # waits behind the busy worker
+        await asyncio.sleep(0.1)
+        store.commit()
+        assert _states(store)[2] == IN_PROGRESS
+        assert _states(store)[3] == PENDING
+        assert QUEUE_DEPTH.values[()] == 1
+        assert QUEUE_IN_PROGRESS.values[()] == 1
+
+        # The timer re-check fires once the foreign lease expires
+        await asyncio.sleep(1.5)
+        store.commit()
+        states = _states(store)
+        assert states[3] == PENDING, "an action this process queued was marked superseded"
+        assert states[orphan] in (PENDING, IN_PROGRESS)
+
+        release.set()
+        await asyncio.gather(first, second)
+        await asyncio.sleep(0.1)
+        store.commit()
+        assert sorted(ran) == [orphan, 2, 3]
+        assert set(_states(store).values()) == {DONE}
+        assert QUEUE_DEPTH.values[()] == 0
+        assert QUEUE_IN_PROGRESS.values[()] == 0
+        queue.close()
+
+    asyncio.run(scenario())
+
+
+def test_startup_recover_requeues_pending_actions(tmp_path):
+    path = tmp_path / 'queue.db'
+    crashed = ActionStore(path)
+    action_id = crashed.enqueue('start', 'srvA', 1, 10)
+    crashed.add_requester(action_id, 2, 20)
+    crashed.commit()
+
+    async def scenario():
+        store = ActionStore(path)
+        queue = ServerActionQueue(workers=1, store=store)
+        seen = []
+
+        async def handler(item):
+            seen.append(item['requested_by'])
+            return True
+
+        queue.register('start', handler)
+        assert queue.recover() == 1
+        await asyncio.sleep(0.1)
+        store.commit()
+        assert seen == [[(1, 10), (2, 20)]]
+        assert _states(store) == {action_id: DONE}
+        queue.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,34 @@
+import asyncio
+from aternos_standin import AternosStandin
+from aternos_controller import AternosController
+from circuit_breaker import CircuitOpenError, HALF_OPEN, OPEN
+
+
+def test_cancelled_probe_releases_half_open_breaker():
+    async def scenario():
+        standin = AternosStandin(latency=2)
+        base = await standin.start()
+        controller = AternosController()
+        url = f"{base}/server/"
+        breaker = controller.breakers.for_url(url)
+        breaker.state = OPEN
+        breaker.opened_at = 0.0  # cooldown long over
+
+        probe = asyncio.create_task(controller._send_request('get', url))
+        await asyncio.sleep(0.3)
+        assert breaker.state == HALF_OPEN
+        probe.cancel()
+        await asyncio.gather(probe, return_exceptions=True)
+
+        # The next request must be allowed to probe again
+        assert breaker.before_request() is True
+        try:
+            breaker.before_request()
+        except CircuitOpenError:
+            pass
+        else:
+            raise AssertionError("two probes were let through at once")
+        await controller.cleanup()
+        await standin.stop()
+
+    asyncio.run(scenario())
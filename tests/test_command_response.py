@@ -0,0 +1,54 @@
+import asyncio
+from types import SimpleNamespace
+import discord
+from command_response import MAX_MESSAGE_LENGTH, CommandResponse
+from load_test import FakeInteraction
+
+
+def test_updates_are_coalesced_into_one_edit_per_interval():
+    async def scenario():
+        interaction = FakeInteraction(1, 10, 'admin')
+        response = CommandResponse(interaction, debounce=0.2)
+
+        # Sections set in the same step go out in the first message, right away
+        response.set("server", "Server: survival")
+        response.set("progress", "Starting...")
+        await asyncio.sleep(0.05)
+        assert interaction.messages == ["Server: survival\nStarting..."]
+
+        response.set("progress", "In queue")
+        response.set("status", "#3 of 120")
+        response.set("progress", "")
+        await asyncio.sleep(0.05)
+        assert len(interaction.messages) == 1
+        await asyncio.sleep(0.25)
+        assert interaction.messages[1:] == ["Server: survival\n#3 of 120"]
+
+        # flush() writes now and drops the pending write; unchanged content is not resent
+        response.set("status", "Online")
+        await response.flush()
+        assert interaction.messages[-1] == "Server: survival\nOnline"
+        await asyncio.sleep(0.25)
+        await response.flush()
+        assert len(interaction.messages) == 3
+
+    asyncio.run(scenario())
+
+
+def test_a_deleted_message_is_replaced():
+    async def scenario():
+        interaction = FakeInteraction(1, 10, 'admin')
+        response = CommandResponse(interaction, debounce=0)
+        response.set("progress", "Starting...")
+        await response.flush()
+
+        async def gone(**kwargs):
+            raise discord.NotFound(SimpleNamespace(status=404, reason="Not Found"), "Unknown Message")
+        response.message.edit = gone
+
+        response.set("progress", "x" * (MAX_MESSAGE_LENGTH + 10))
+        await response.flush()
+        assert interaction.messages == ["Starting...", "x" * MAX_MESSAGE_LENGTH]
+        assert response.message.content == "x" * MAX_MESSAGE_LENGTH
+
+    asyncio.run(scenario())
@@ -0,0 +1,42 @@
+import asyncio
+from aternos_standin import AternosStandin
+from load_test import FakeInteraction
+
+ACTION_ROUTE = '/server/{id}/{action}'
+
+
+async def _logged_in_client():
+    import main
+    await main.client.aternos.ensure_logged_in()
+    main.client.aternos_ready.set()
+    await main.client.aternos.directory.refresh()
+    return main
+
+
+def test_start_with_unknown_name_acts_on_no_server(standin_port):
+    async def scenario():
+        standin = AternosStandin(servers=3, latency=0)
+        await standin.start(port=standin_port)
+        main = await _logged_in_client()
+        from config import ADMIN_ROLE_NAME
+        try:
+            for command in (main.start, main.stop):
+                interaction = FakeInteraction(1, 10, ADMIN_ROLE_NAME)
+                await command.callback(interaction, 'server9')
+                reply = interaction.messages[-1]
+                assert "Could not find server 'server9'" in reply
+                assert "Did you mean: server" in reply
+                assert "Processing" not in reply
+            assert standin.requests[ACTION_ROUTE] == 0
+            assert {s.status for s in standin.servers.values()} == {'Offline'}
+
+            # Read-only commands still fall back to the default server
+            interaction = FakeInteraction(1, 10, ADMIN_ROLE_NAME)
+            await main.status.callback(interaction, 'server9')
+            assert "Using default server instead" in interaction.messages[-1]
+        finally:
+            main.client.status_watcher.stop()
+            await main.client.aternos.cleanup()
+            await standin.stop()
+
+    asyncio.run(scenario())
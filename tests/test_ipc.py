@@ -0,0 +1,64 @@
+import asyncio
+import pytest
+from circuit_breaker import CircuitOpenError
+from ipc import IpcClient, dumps, encode_error, loads
+from server_directory import ServerEntry
+from server_page import ServerPage
+
+
+def test_values_round_trip():
+    page = ServerPage(url='https://aternos.org/server/abc', status='Online', players='Players: 1/20')
+    entry = ServerEntry(id='abc', name='survival', url=page.url)
+    message = loads(dumps({'id': 1, 'result': {'page': page, 'entries': [entry]}}))
+    assert message['result'] == {'page': page, 'entries': [entry]}
+
+
+def test_errors_round_trip():
+    error = loads(dumps({'id': 1, 'error': CircuitOpenError('login', 42.5)}))['error']
+    assert isinstance(error, CircuitOpenError)
+    assert (error.operation, error.retry_in, str(error)) == ('login', 42.5, str(CircuitOpenError('login', 42.5)))
+
+    error = loads(dumps({'id': 2, 'error': encode_error(ValueError("bad server"))}))['error']
+    assert type(error) is Exception and str(error) == "bad server"
+
+
+def test_unsupported_values_are_refused():
+    with pytest.raises(TypeError):
+        dumps({'id': 1, 'result': object()})
+
+
+def test_responses_are_matched_by_id(tmp_path):
+    path = str(tmp_path / 'worker.sock')
+
+    async def handle(reader, writer):
+        requests = [loads(await reader.readline()) for _ in range(3)]
+        # Answer in reverse order, one with an error
+        for request in reversed(requests):
+            if request['method'] == 'fail':
+                response = {'id': request['id'], 'error': CircuitOpenError('page', 5)}
+            else:
+                response = {'id': request['id'], 'result': request['args'],
+                            'breakers': [['page', 'open']]}
+            writer.write(dumps(response))
+        await writer.drain()
+        # Drop the connection with one call still waiting
+        await reader.readline()
+        writer.close()
+
+    async def scenario():
+        server = await asyncio.start_unix_server(handle, path)
+        client = IpcClient(path, timeout=5)
+        first, failed, second = await asyncio.gather(
+            client.call('echo', 1), client.call('fail'), client.call('echo', 2), return_exceptions=True
+        )
+        assert (first, second) == ([1], [2])
+        assert isinstance(failed, CircuitOpenError) and failed.retry_in == 5
+        assert client.open_breakers == [['page', 'open']]
+
+        with pytest.raises(Exception, match="lost"):
+            await client.call('echo', 3)
+        await client.close()
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(scenario())
@@ -0,0 +1,112 @@
+import asyncio
+import json
+from metrics import MetricsRegistry, start_metrics_server, url_class
+
+
+def test_url_class():
+    base = 'https://aternos.org'
+    assert url_class(f"{base}/") == 'home'
+    assert url_class(f"{base}/:en/") == 'home'
+    assert url_class(f"{base}/:pt-br/") == 'home'
+    assert url_class(f"{base}/go/") == 'login'
+    assert url_class(f"{base}/server/") == 'server_list'
+    assert url_class(f"{base}/server/abc123") == 'server_page'
+    assert url_class(f"{base}/panel/ajax/confirm.php") == 'confirm'
+
+
+def _registry():
+    registry = MetricsRegistry()
+    requests = registry.counter('requests_total', 'Requests', ('status',))
+    depth = registry.gauge('queue_depth', 'Queued actions')
+    latency = registry.histogram('latency_seconds', 'Latency', ('page',), buckets=(0.1, 1))
+    return registry, requests, depth, latency
+
+
+def test_prometheus_rendering():
+    registry, requests, depth, latency = _registry()
+    requests.inc(status=200)
+    requests.inc(2, status=200)
+    requests.inc(status=503)
+    depth.set(4)
+    depth.set(2)
+    for value in (0.05, 0.5, 0.7, 3):
+        latency.observe(value, page='server')
+    registry.counter('requests_total', 'Registered twice', ('status',)).inc(status=503)
+
+    assert registry.render() == """\
+# HELP requests_total Requests
+# TYPE requests_total counter
+requests_total{status="200"} 3
+requests_total{status="503"} 2
+# HELP queue_depth Queued actions
+# TYPE queue_depth gauge
+queue_depth 2
+# HELP latency_seconds Latency
+# TYPE latency_seconds histogram
+latency_seconds_bucket{page="server",le="0.1"} 1
+latency_seconds_bucket{page="server",le="1"} 3
+latency_seconds_bucket{page="server",le="+Inf"} 4
+latency_seconds_sum{page="server"} 4.25
+latency_seconds_count{page="server"} 4
+"""
+    assert latency.quantile(('server',), 0.5) == 1
+    assert latency.quantile(('server',), 0.95) == float('inf')
+
+
+def test_worker_series_are_labelled():
+    registry, requests, depth, latency = _registry()
+    requests.inc(status=200)
+
+    worker, worker_requests, _, worker_latency = _registry()
+    worker_requests.inc(5, status=200)
+    worker_latency.observe(0.05, page='server')
+    registry.update_source('0', json.loads(json.dumps(worker.snapshot())))
+
+    lines = registry.render().splitlines()
+    assert 'requests_total{status="200"} 1' in lines
+    assert 'requests_total{status="200",worker="0"} 5' in lines
+    assert 'latency_seconds_bucket{page="server",worker="0",le="0.1"} 1' in lines
+    assert 'latency_seconds_count{page="server",worker="0"} 1' in lines
+    assert 'requests_total{status="200",worker="0"}: 5' in registry.summary()
+
+    # A newer snapshot replaces the old one
+    registry.update_source('0', {})
+    assert not any('worker=' in line for line in registry.render().splitlines())
+
+
+def test_scrape_collects_before_rendering():
+    async def scenario():
+        from metrics import metrics
+        collected = []
+
+        async def collector():
+            collected.append(True)
+
+        async def failing():
+            raise Exception("worker is gone")
+
+        metrics.add_collector(collector)
+        metrics.add_collector(failing)
+        server = await start_metrics_server('127.0.0.1', 0)
+        try:
+            port = server.sockets[0].getsockname()[1]
+
+            async def get(path):
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                writer.write(f"GET {path} HTTP/1.1\r\nHost: x\r\n\r\n".encode())
+                response = await reader.read()
+                writer.close()
+                return response
+
+            response = await get('/metrics')
+            assert response.startswith(b'HTTP/1.1 200 OK')
+            assert b'# TYPE aternos_http_requests_total counter' in response
+            assert collected == [True]
+            assert (await get('/other')).startswith(b'HTTP/1.1 404 Not Found')
+        finally:
+            metrics.remove_collector(collector)
+            metrics.remove_collector(failing)
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(scenario())
@@ -0,0 +1,66 @@
+import requests
+from metrics import PAGE_FETCHES
+from page_revalidator import PageRevalidator, fingerprint
+from server_page import ServerPage
+
+URL = 'https://aternos.org/server/abc'
+
+PAGE = '''<html><head><script>var AJAX_TOKEN = "{token}"; var SERVER = {{"status": 1}};</script></head>
+<body data-csrf="{token}"><input type="hidden" name="token" value="{token}">
+<input type="hidden" id="server-state" value="{state}">
+<div class="statuslabel-label">{label}</div><span class="countdown">{countdown}</span></body></html>'''
+
+
+def _page(token='t1', state='1', label='Offline', countdown='0:04:59'):
+    return PAGE.format(token=token, state=state, label=label, countdown=countdown).encode()
+
+
+def _response(body, status=200, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response._content = body
+    response.headers.update(headers or {})
+    response.encoding = 'utf-8'
+    return response
+
+
+def _outcomes():
+    return {outcome: PAGE_FETCHES.values.get((outcome,), 0) for outcome in ('not_modified', 'unchanged', 'parsed')}
+
+
+def test_tokens_are_ignored_but_state_is_not():
+    assert fingerprint(_page(token='t1')) == fingerprint(_page(token='t2'))
+    assert fingerprint(_page()) != fingerprint(_page(label='Online'))
+    assert fingerprint(_page()) != fingerprint(_page(state='2'))
+    assert fingerprint(_page()) != fingerprint(_page(countdown='0:03:12'))
+
+
+def test_status_change_with_identical_scripts_is_parsed_again():
+    revalidator = PageRevalidator()
+    parsed = []
+
+    def parse(text):
+        parsed.append(text)
+        return ServerPage(url=URL, status='Online' if 'Online' in text else 'Offline')
+
+    before = _outcomes()
+    revalidator.page_from(URL, _response(_page()), parse)
+    revalidator.page_from(URL, _response(_page(token='t2')), parse)
+    assert len(parsed) == 1
+
+    page = revalidator.page_from(URL, _response(_page(token='t3', label='Online')), parse)
+    assert len(parsed) == 2
+    assert page.status == 'Online'
+    after = _outcomes()
+    assert {k: after[k] - before[k] for k in after} == {'not_modified': 0, 'unchanged': 1, 'parsed': 2}
+
+
+def test_not_modified_reuses_the_last_page():
+    revalidator = PageRevalidator()
+    first = revalidator.page_from(URL, _response(_page(), headers={'ETag': '"v1"'}), lambda text: ServerPage(url=URL, status='Offline'))
+    assert revalidator.conditional_headers(URL) == {'If-None-Match': '"v1"'}
+
+    before = _outcomes()
+    page = revalidator.page_from(URL, _response(b'', status=304), lambda text: None)
+    assert page.status == first.status and page.fetched_at >= first.fetched_at
+    assert _outcomes()['not_modified'] - before['not_modified'] == 1
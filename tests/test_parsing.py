@@ -0,0 +1,70 @@
+from dataclasses import asdict
+from pathlib import Path
+import pytest
+from parsing import BACKENDS, SelectorPlan, get_backend, run_plans
+from server_page import parse_server_page
+
+PAGES_DIR = Path(__file__).resolve().parent.parent / 'benchmarks' / 'pages'
+URL = 'https://aternos.org/server/abc'
+
+EXPECTED_STATUS = {
+    'server_offline.html': 'Offline',
+    'server_online.html': 'Online',
+    'server_queue_confirm.html': 'In Queue',
+}
+
+# Pages that only parse through the later fallbacks of each cascade
+EDGE_CASES = {
+    # Status words in scripts and comments are not page text
+    'word search': '''<html><body><script>var s = "Online";</script><!-- Stopping -->
+        <p>Server is <b>Starting</b> now</p>
+        <button onclick="window.location='https://aternos.org/server/abc/go-stop'">Stop</button></body></html>''',
+    # No status at all: inferred from which button is there
+    'stop marker': '<html><body><a class="btn-stop" href="/server/abc/stop">x</a></body></html>',
+    'form action': '''<html><body><div class="statuslabel-label">Preparing ...</div>
+        <form action="/panel/start"><div><input type="submit" value="s">Start</input></div></form></body></html>''',
+    'nothing': '<html><body><p>Maintenance</p></body></html>',
+}
+
+
+def _snapshot(html, backend):
+    fields = asdict(parse_server_page(html, URL, get_backend(backend)))
+    fields.pop('fetched_at')
+    return fields
+
+
+def _pages():
+    pages = {path.name: path.read_text(encoding='utf-8') for path in sorted(PAGES_DIR.glob('*.html'))}
+    return {**pages, **EDGE_CASES}
+
+
+@pytest.mark.skipif('lxml' not in BACKENDS, reason='lxml not installed')
+@pytest.mark.parametrize('name', sorted(_pages()))
+def test_backends_extract_the_same_page(name):
+    html = _pages()[name]
+    assert _snapshot(html, 'lxml') == _snapshot(html, 'html.parser')
+
+
+@pytest.mark.parametrize('name', sorted(EXPECTED_STATUS))
+def test_saved_pages_parse(name):
+    page = _snapshot((PAGES_DIR / name).read_text(encoding='utf-8'), 'html.parser')
+    assert page['status'] == EXPECTED_STATUS[name]
+    assert page['address'] == 'myserver.aternos.me'
+
+
+def test_edge_cases_fall_back_in_order():
+    assert _snapshot(EDGE_CASES['word search'], 'html.parser')['status'] == 'Starting'
+    assert _snapshot(EDGE_CASES['word search'], 'html.parser')['stop_url'] == 'https://aternos.org/server/abc/go-stop'
+    assert _snapshot(EDGE_CASES['stop marker'], 'html.parser')['status'] == 'Online'
+    page = _snapshot(EDGE_CASES['form action'], 'html.parser')
+    assert page['status'] == 'Starting' and page['start_url'] == 'https://aternos.org/panel/start'
+    assert _snapshot(EDGE_CASES['nothing'], 'html.parser')['status'] == 'Status unavailable'
+
+
+@pytest.mark.parametrize('backend', sorted(BACKENDS))
+def test_lowest_priority_selector_wins(backend):
+    plan = SelectorPlan(['.missing', 'span:contains("b")', 'div'])
+    parser = get_backend(backend)
+    root = parser.parse('<html><body><div>a</div><p><span class="x">b</span></p></body></html>')
+    match, = run_plans(parser, root, [plan])
+    assert match.selector == 'span:contains("b")' and match.text == 'b'
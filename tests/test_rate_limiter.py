@@ -0,0 +1,67 @@
+import time
+from email.utils import formatdate
+from types import SimpleNamespace
+from rate_limiter import (
+    CLIENT,
+    NETWORK,
+    SERVER,
+    THROTTLED,
+    AdaptiveRateLimiter,
+    backoff_delay,
+    classify_error,
+    parse_retry_after,
+)
+
+URL = 'https://aternos.org/server/abc'
+
+
+def test_backoff_delay_is_jittered_and_capped():
+    for attempt in range(8):
+        for _ in range(50):
+            assert 0 <= backoff_delay(attempt, base=1, cap=10) <= min(10, 2 ** attempt)
+    assert backoff_delay(5, base=1, cap=10, retry_after=42) == 42
+    assert backoff_delay(5, base=1, cap=10, retry_after=0.0) == 0.0
+
+
+def test_retry_after_accepts_seconds_and_http_dates():
+    assert parse_retry_after('120') == 120
+    assert parse_retry_after('-5') == 0
+    assert 55 < parse_retry_after(formatdate(time.time() + 60, usegmt=True)) <= 60
+    assert parse_retry_after(formatdate(time.time() - 60, usegmt=True)) == 0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
+
+
+def test_throttling_halves_the_rate_and_pauses_for_retry_after():
+    limiter = AdaptiveRateLimiter(rate=4, burst=5, min_rate=0.5, max_rate=5, increase=0.5)
+    bucket = limiter.bucket(URL)
+
+    limiter.on_throttled(URL)
+    assert bucket.rate == 2 and bucket.paused_until == 0
+    limiter.on_throttled(URL, retry_after=30)
+    assert bucket.rate == 1
+    assert 29 < bucket.paused_until - time.monotonic() <= 30
+    for _ in range(5):
+        limiter.on_throttled(URL)
+    assert bucket.rate == 0.5
+
+    limiter.on_success(URL)
+    assert bucket.rate == 1
+    for _ in range(20):
+        limiter.on_success(URL)
+    assert bucket.rate == 5
+
+    # Buckets are per host
+    assert limiter.bucket('https://example.com/').rate == 4
+
+
+def test_errors_are_classified_by_status():
+    def classify(status):
+        error = Exception()
+        error.response = SimpleNamespace(status_code=status, headers={})
+        return classify_error(error)
+
+    assert classify(429) == classify(503) == THROTTLED
+    assert classify(500) == SERVER
+    assert classify(404) == CLIENT
+    assert classify_error(ConnectionError()) == NETWORK
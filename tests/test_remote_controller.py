@@ -0,0 +1,84 @@
+import asyncio
+from remote_controller import RemoteController
+from server_directory import ServerEntry
+from server_page import ServerPage
+
+ENTRIES = [ServerEntry(f"id{i}", f"server{i}", f"https://aternos.org/server/id{i}") for i in range(8)]
+
+
+class RecordingWorker:
+    """Answers IPC calls the way a controller worker would, recording them"""
+
+    def __init__(self):
+        self.calls = []
+        self.open_breakers = []
+
+    async def call(self, method, *args, timeout=None, **kwargs):
+        self.calls.append((method, args))
+        if method == 'refresh_directory':
+            return ENTRIES
+        if method == 'get_status_pages':
+            entries, concurrency = args
+            # Results cross IPC as JSON lists, not tuples
+            return [[entry, ServerPage(url=entry.url, status='Online'), None] for entry in entries]
+        raise AssertionError(f"unexpected call {method}")
+
+
+def test_status_all_goes_to_the_worker_owning_each_server():
+    async def scenario():
+        controller = RemoteController(['a', 'b', 'c'], spawn=False)
+        for worker in controller.workers:
+            worker.client = RecordingWorker()
+        assert len({controller._worker_for(e.url) for e in ENTRIES}) > 1
+
+        results = await controller.get_all_status_pages(6)
+
+        assert [entry for entry, page, error in results] == ENTRIES
+        assert all(page.status == 'Online' and error is None for entry, page, error in results)
+        for worker in controller.workers:
+            fanned_out = [args for method, args in worker.client.calls if method == 'get_status_pages']
+            owned = [e for e in ENTRIES if controller._worker_for(e.url) is worker]
+            assert fanned_out == ([(owned, 2)] if owned else [])
+        # Only one server list fetch, and every page is remembered for /status
+        assert sum(method == 'refresh_directory' for w in controller.workers for method, _ in w.client.calls) == 1
+        assert all(controller.peek_status_page(e.url) is not None for e in ENTRIES)
+
+    asyncio.run(scenario())
+
+
+def test_spawned_workers_export_metrics_and_join_traces(standin_port, tmp_path, monkeypatch):
+    import json
+    import remote_controller
+    from aternos_standin import AternosStandin
+    from config import ATERNOS_SERVER_LIST_URL
+    from metrics import metrics
+    from tracing import span
+
+    monkeypatch.setattr(remote_controller, 'TRACE_FILE', str(tmp_path / 'trace.json'))
+
+    async def scenario():
+        standin = AternosStandin(servers=2, latency=0)
+        await standin.start(port=standin_port)
+        controller = RemoteController([str(tmp_path / f'worker.{i}') for i in range(2)], spawn=True)
+        try:
+            await controller.ensure_logged_in()
+            url = f"{ATERNOS_SERVER_LIST_URL}standin0001"
+            with span('test.status') as root:
+                await controller.get_server_page(url)
+            owner = controller._worker_for(url).index
+
+            await metrics.collect()
+            rendered = metrics.render()
+            assert f'aternos_http_requests_total{{url_class="server_page",status="200",worker="{owner}"}} 1' in rendered
+            assert f'worker="{1 - owner}"' in rendered  # its login shows up too
+        finally:
+            await controller.cleanup()
+            await standin.stop()
+
+        # The worker's spans hang off the bot's span in the same trace
+        events = json.loads((tmp_path / f'trace.json.worker{owner}').read_text().rstrip(',\n') + ']')
+        served = [e for e in events if e['name'] == 'worker.get_server_page']
+        assert [(e['args']['trace_id'], e['args']['parent_id']) for e in served] == [(root.trace_id, root.span_id)]
+        assert any(e['name'] == 'http.request' and e['args']['trace_id'] == root.trace_id for e in events)
+
+    asyncio.run(scenario())
@@ -0,0 +1,25 @@
+from server_directory import ServerDirectory, ServerEntry
+
+
+def _directory(*names):
+    directory = ServerDirectory(None, 60)
+    directory.update([ServerEntry(f"id{i}", name, f"https://aternos.org/server/id{i}")
+                      for i, name in enumerate(names)])
+    return directory
+
+
+def test_lookup_does_not_guess_similar_names():
+    directory = _directory('survival1', 'creative')
+    assert directory.lookup('survival2') is None
+    assert directory.lookup('survival1').name == 'survival1'
+    # Fuzzy matches are still offered as suggestions
+    assert [e.name for e in directory.complete('survival2')] == ['survival1']
+
+
+def test_lookup_needs_a_unique_prefix_or_substring():
+    directory = _directory('survival1', 'survival2', 'creative')
+    assert directory.lookup('surv') is None
+    assert directory.lookup('CREA').name == 'creative'
+    assert directory.lookup('val2').name == 'survival2'
+    assert directory.lookup('id1').name == 'survival2'
+    assert directory.lookup('').name == 'survival1'
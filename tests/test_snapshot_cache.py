@@ -0,0 +1,28 @@
+import asyncio
+from metrics import CACHE_REQUESTS
+from snapshot_cache import SnapshotCache
+
+
+def _counts():
+    return {outcome: CACHE_REQUESTS.values.get((outcome,), 0) for outcome in ('hit', 'miss', 'coalesced')}
+
+
+def test_lookups_are_counted_by_outcome():
+    async def scenario():
+        cache = SnapshotCache(ttl=60)
+        loads = []
+
+        async def loader():
+            loads.append(1)
+            await asyncio.sleep(0.05)
+            return 'page'
+
+        before = _counts()
+        results = await asyncio.gather(*(cache.get('server', loader) for _ in range(3)))
+        assert results == ['page'] * 3
+        assert await cache.get('server', loader) == 'page'
+        after = _counts()
+        assert len(loads) == 1
+        assert {k: after[k] - before[k] for k in after} == {'hit': 1, 'miss': 1, 'coalesced': 2}
+
+    asyncio.run(scenario())
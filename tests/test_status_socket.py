@@ -0,0 +1,78 @@
+import asyncio
+import json
+from aternos_standin import AternosStandin
+from aternos_controller import AternosController
+from config import ATERNOS_SERVER_LIST_URL
+from status_socket import StatusSocket, decode_status_message
+
+SERVER_ID = 'standin0000'
+SERVER_URL = f"{ATERNOS_SERVER_LIST_URL}{SERVER_ID}"
+PAGE_ROUTE = '/server/{id}'
+
+
+async def _until(condition, timeout=3.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.02)
+
+
+def test_decode_status_message():
+    page = decode_status_message({'id': SERVER_ID, 'label': 'Waiting in queue', 'players': 1, 'max': 20,
+                                  'address': 'a.aternos.me', 'queue': {'position': 3, 'count': 120}})
+    assert page.url == SERVER_URL
+    assert page.status == 'In Queue'
+    assert page.players == '1/20 players'
+    assert page.queue_position == 'Position 3/120'
+    assert page.start_url is None
+    assert decode_status_message({'label': 'online'}) is None
+
+
+def test_handle_frame_ignores_other_frames():
+    updates = []
+    socket = StatusSocket(dict, on_update=lambda old, new: updates.append((old, new)))
+    assert socket.handle_frame('not json') is None
+    assert socket.handle_frame(json.dumps({'type': 'tick', 'message': '{}'})) is None
+    page = socket.handle_frame(json.dumps({'type': 'status', 'message': json.dumps({'id': SERVER_ID, 'label': 'Online'})}))
+    assert page.status == 'Online'
+    assert updates == [(None, page)]
+    assert socket.stats == {'connects': 0, 'frames': 3, 'status_frames': 1}
+
+
+def test_pushed_status_answers_reads_until_the_socket_drops(standin_port):
+    async def scenario():
+        standin = AternosStandin(servers=2, latency=0, transition=0.2)
+        await standin.start(port=standin_port)
+        controller = AternosController()
+        try:
+            await controller.ensure_logged_in()
+            controller.live_status.start()
+            await _until(lambda: controller.live_status.page(SERVER_URL) is not None)
+
+            # Answered from the push, without fetching the page
+            page = await controller.get_status_page(SERVER_URL)
+            assert page.status == 'Offline' and page.start_url is None
+            assert standin.requests[PAGE_ROUTE] == 0
+
+            standin.servers[SERVER_ID].set('Starting')
+            assert await controller.live_status.wait_for_update(SERVER_URL, 2)
+            assert (await controller.get_status_page(SERVER_URL)).status == 'Starting'
+            assert standin.requests[PAGE_ROUTE] == 0
+
+            # Once the socket drops, reads fall back to the HTML page
+            await standin.drop_sockets()
+            await _until(lambda: not controller.live_status.connected)
+            assert controller.live_status.page(SERVER_URL) is None
+            page = await controller.get_status_page(SERVER_URL)
+            assert page.status in ('Starting', 'Online')
+            assert page.stop_url is not None
+            assert standin.requests[PAGE_ROUTE] == 1
+
+            # And it reconnects on its own
+            await _until(lambda: controller.live_status.page(SERVER_URL) is not None)
+            assert controller.live_status.stats['connects'] == 2
+        finally:
+            await controller.cleanup()
+            await standin.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,81 @@
+import asyncio
+import time
+from server_page import ServerPage
+from status_watcher import StatusWatcher
+
+
+class UnreachableController:
+    """Controller whose status reads always fail"""
+
+    def __init__(self):
+        self.polls = 0
+
+    async def get_status_page(self, server_url, max_age=None):
+        self.polls += 1
+        raise Exception("upstream unavailable")
+
+    async def wait_for_status_change(self, server_url, timeout):
+        await asyncio.sleep(0)
+
+
+def test_failing_server_stops_being_polled():
+    async def scenario():
+        controller = UnreachableController()
+        watcher = StatusWatcher(controller, fast_interval=0, slow_interval=0, idle_polls=3)
+        watcher.watch('https://aternos.org/server/a')
+        task = watcher._tasks['https://aternos.org/server/a']
+        await asyncio.wait_for(task, 1)
+        assert controller.polls == 3
+        assert not watcher._tasks
+
+    asyncio.run(scenario())
+
+
+class CachingController:
+    """Serves a status with a snapshot cache, like AternosController"""
+
+    def __init__(self, status):
+        self.status = status
+        self.cached = None
+        self.fetches = 0
+
+    async def get_status_page(self, server_url, max_age=None):
+        if self.cached is None or self.cached.age > max_age:
+            self.fetches += 1
+            self.cached = ServerPage(url=server_url, status=self.status)
+        return self.cached
+
+    async def wait_for_status_change(self, server_url, timeout):
+        await asyncio.sleep(timeout)
+
+
+def test_subscriber_wakes_a_slow_poll_and_never_sees_a_page_from_before_its_action():
+    async def scenario():
+        url = 'https://aternos.org/server/a'
+        controller = CachingController('Offline')
+        watcher = StatusWatcher(controller, fast_interval=0.05, slow_interval=30, idle_polls=5)
+        watcher.watch(url)
+        await asyncio.sleep(0.1)  # first poll done; now in a 30s wait
+        assert watcher.last_pages[url].status == 'Offline'
+
+        # /start finishes; the cached Offline page predates it
+        controller.status = 'Starting'
+        since = time.time()
+        seen = []
+
+        async def on_change(old_page, new_page):
+            seen.append(new_page)
+
+        unsubscribe = watcher.subscribe(url, on_change, since=since)
+        await asyncio.sleep(0.2)
+        assert [page.status for page in seen] == ['Starting']
+        assert seen[0].fetched_at >= since
+
+        # Transitions are followed at the fast pace while subscribed
+        controller.status = 'Online'
+        await asyncio.sleep(0.2)
+        assert [page.status for page in seen] == ['Starting', 'Online']
+        unsubscribe()
+        watcher.stop()
+
+    asyncio.run(scenario())
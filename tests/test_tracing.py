@@ -0,0 +1,114 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+import pytest
+import tracing
+from tracing import SpanContext, TraceIdFilter, Tracer, current_span, record_span, span
+
+
+def _events(path):
+    with open(path) as f:
+        return json.loads(f.read().rstrip().rstrip(',') + ']')
+
+
+@pytest.fixture
+def tracer(tmp_path, monkeypatch):
+    tracer = Tracer()
+    monkeypatch.setattr(tracing, 'tracer', tracer)
+    tracer.configure(str(tmp_path / 'trace.json'))
+    yield tracer
+    tracer.close()
+
+
+def _by_name(tracer):
+    path = tracer.path
+    tracer.close()
+    return {event['name']: event for event in _events(path)}
+
+
+def test_child_spans_share_the_trace_of_their_parent(tracer):
+    with span('command', guild='g1') as root:
+        assert current_span() is root
+        with span('queue.wait') as child:
+            assert (child.trace_id, child.parent_id) == (root.trace_id, root.span_id)
+        record_span('queue.dispatch', time.monotonic() - 0.5, time.monotonic())
+    assert current_span() is None
+
+    events = _by_name(tracer)
+    assert set(events) == {'command', 'queue.wait', 'queue.dispatch'}
+    assert events['command']['args']['guild'] == 'g1'
+    assert events['command']['args']['parent_id'] is None
+    assert events['queue.dispatch']['args']['parent_id'] == root.span_id
+    assert 450_000 <= events['queue.dispatch']['dur'] <= 550_000
+    assert len({event['tid'] for event in events.values()}) == 1
+
+
+def test_remote_parent_starts_a_local_root(tracer):
+    remote = SpanContext('0123456789abcdef', 'cafebabe')
+    with span('worker.get_server_page', parent=remote) as worker:
+        assert worker.is_root
+    events = _by_name(tracer)
+    assert events['worker.get_server_page']['args']['trace_id'] == remote.trace_id
+    assert events['worker.get_server_page']['args']['parent_id'] == remote.span_id
+
+
+def test_errors_and_late_children_are_recorded(tracer):
+    async def scenario():
+        with span('command') as root:
+            # A background task outlives the command that started it
+            late = asyncio.create_task(asyncio.sleep(0.05))
+            with pytest.raises(ValueError):
+                with span('parse.server_page'):
+                    raise ValueError("bad page")
+
+            async def follow_up():
+                with span('status.follow'):
+                    await late
+            follow = asyncio.create_task(follow_up())
+        await follow
+        return root
+
+    root = asyncio.run(scenario())
+    events = _by_name(tracer)
+    assert events['parse.server_page']['args']['error'] == 'ValueError'
+    assert events['status.follow']['args']['trace_id'] == root.trace_id
+
+
+def test_log_records_carry_the_trace_id():
+    record = logging.LogRecord('minecraft_bot', logging.INFO, __file__, 1, "hi", None, None)
+    TraceIdFilter().filter(record)
+    assert record.trace_id == '-'
+    with span('command') as root:
+        TraceIdFilter().filter(record)
+    assert record.trace_id == root.trace_id
+
+
+def test_spans_are_written_off_the_calling_thread_and_flushed_on_close(tmp_path, monkeypatch):
+    path = tmp_path / 'trace.json'
+    writers = []
+
+    def recording_open(*args, **kwargs):
+        writers.append(threading.current_thread().name)
+        return open(*args, **kwargs)
+
+    tracer = Tracer()
+    monkeypatch.setattr(tracing, 'tracer', tracer)
+    tracer.configure(str(path))
+    monkeypatch.setattr(tracing, 'open', recording_open, raising=False)
+
+    with span('command') as root:
+        with span('http.request'):
+            pass
+    tracer.close()
+
+    assert writers and set(writers) == {'trace-writer'}
+    events = _events(path)
+    assert [e['name'] for e in events] == ['http.request', 'command']
+    assert {e['args']['trace_id'] for e in events} == {root.trace_id}
+
+    # Nothing is exported once closed
+    with span('late'):
+        pass
+    assert len(_events(path)) == 2
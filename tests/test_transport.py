@@ -0,0 +1,29 @@
+import asyncio
+from aternos_standin import AternosStandin, SESSION_COOKIE
+from transport import ExecutorTransport
+
+
+def test_threads_use_their_own_sessions_with_shared_cookies():
+    async def scenario():
+        standin = AternosStandin(servers=1, latency=0.02)
+        base = await standin.start()
+        transport = ExecutorTransport(max_workers=4)
+        try:
+            login = await transport.request('post', f"{base}/go/", data={'user': 'standin', 'password': 'standin'})
+            assert login.json()['success']
+            assert transport.cookies.get(SESSION_COOKIE) == 'standin-session'
+
+            # Every thread's session sends the cookie set on another thread
+            responses = await asyncio.gather(*(transport.request('get', f"{base}/server/") for _ in range(12)))
+            assert all(r.status_code == 200 and r.url.endswith('/server/') for r in responses)
+
+            sessions = transport._sessions
+            assert 1 < len(sessions) <= 4
+            assert len({id(s) for s in sessions}) == len(sessions)
+            assert all(s.cookies is transport.scraper.cookies for s in sessions)
+            assert all(s.headers is transport.scraper.headers for s in sessions)
+        finally:
+            transport.close()
+            await standin.stop()
+
+    asyncio.run(scenario())
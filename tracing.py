@@ -0,0 +1,198 @@
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from logging_config import logger
+
+# The span the current task (or executor call) is running in
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+# Spans are timed on the monotonic clock and exported as wall-clock time
+_WALL_OFFSET = time.time() - time.monotonic()
+_PID = os.getpid()
+
+
+class Span:
+    """One timed operation within a trace"""
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'is_root', 'start', 'end', 'attrs')
+
+    def __init__(self, name, parent=None, start=None, **attrs):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(8).hex()
+        self.span_id = os.urandom(4).hex()
+        self.parent_id = parent.span_id if parent else None
+        # The first span of a trace in this process, even if its parent is in another one
+        self.is_root = parent is None or isinstance(parent, SpanContext)
+        self.start = time.monotonic() if start is None else start
+        self.end = None
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_chrome_event(self):
+        """Complete ("X") event in the Chrome trace event format"""
+        return {
+            'name': self.name,
+            'ph': 'X',
+            'ts': round((self.start + _WALL_OFFSET) * 1e6),
+            'dur': round((self.end - self.start) * 1e6),
+            # Workers write their own trace files; keep their spans apart
+            'pid': _PID,
+            # One row per trace in the viewer
+            'tid': int(self.trace_id[:6], 16),
+            'args': {'trace_id': self.trace_id, 'span_id': self.span_id,
+                     'parent_id': self.parent_id, **self.attrs},
+        }
+
+
+class SpanContext:
+    """The ids of a span in another process, to parent local spans under it"""
+    __slots__ = ('trace_id', 'span_id')
+
+    def __init__(self, trace_id, span_id):
+        self.trace_id = trace_id
+        self.span_id = span_id
+
+
+class Tracer:
+    """Collects finished spans and appends them to a Chrome trace file.
+
+    The file is a JSON array without its closing bracket, which
+    chrome://tracing and Perfetto accept as-is. The spans of a trace are
+    queued in one batch when its root span finishes; a background thread
+    does the file writes, so finishing a span never blocks the event loop.
+    """
+
+    def __init__(self):
+        self.path = None
+        self._pending = {}  # trace id -> finished spans not yet written
+        self._written = OrderedDict()  # recently written trace ids, for late child spans
+        self._lock = threading.Lock()
+        self._batches = None
+        self._writer = None
+
+    def configure(self, path):
+        """Start exporting to `path` (empty to disable)"""
+        self.close()
+        with self._lock:
+            self.path = path or None
+            if not self.path:
+                return
+            if not os.path.exists(self.path):
+                with open(self.path, 'w') as f:
+                    f.write('[\n')
+            self._batches = queue.SimpleQueue()
+            self._writer = threading.Thread(
+                target=self._write_batches, args=(self.path, self._batches), name='trace-writer', daemon=True
+            )
+            self._writer.start()
+
+    def close(self):
+        """Write out the queued spans and stop exporting"""
+        with self._lock:
+            writer, self._writer = self._writer, None
+            if writer is None:
+                return
+            self.path = None
+            self._pending.clear()
+            self._batches.put(None)
+        writer.join()
+
+    def finish(self, span):
+        span.end = time.monotonic() if span.end is None else span.end
+        if not self.path:
+            return
+        with self._lock:
+            if self._writer is None:
+                return
+            if span.trace_id in self._written:
+                # A child that outlived its root is written on its own
+                spans = [span]
+            else:
+                spans = self._pending.setdefault(span.trace_id, [])
+                spans.append(span)
+                if not span.is_root:
+                    return
+                del self._pending[span.trace_id]
+                self._written[span.trace_id] = None
+                if len(self._written) > 1000:
+                    self._written.popitem(last=False)
+            self._batches.put(spans)
+
+    @staticmethod
+    def _write_batches(path, batches):
+        stopping = False
+        while not stopping:
+            spans = []
+            batch = batches.get()
+            # Take whatever else is queued so a burst of traces is one write
+            while batch is not None:
+                spans.extend(batch)
+                try:
+                    batch = batches.get_nowait()
+                except queue.Empty:
+                    break
+            stopping = batch is None
+            if not spans:
+                continue
+            try:
+                with open(path, 'a') as f:
+                    f.write(''.join(json.dumps(s.to_chrome_event()) + ',\n' for s in spans))
+            except OSError as e:
+                logger.warning(f"Could not write trace: {e}")
+
+
+tracer = Tracer()
+atexit.register(tracer.close)
+
+
+def current_span():
+    return _current_span.get()
+
+
+@contextmanager
+def span(name, parent=None, **attrs):
+    """Run the enclosed block in a child span of `parent` (default: the current span)"""
+    current = Span(name, parent or _current_span.get(), **attrs)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.set(error=type(e).__name__)
+        raise
+    finally:
+        _current_span.reset(token)
+        tracer.finish(current)
+
+
+def record_span(name, start, end, parent=None, **attrs):
+    """Record an interval measured elsewhere, e.g. time spent waiting in a queue"""
+    recorded = Span(name, parent or _current_span.get(), start=start, **attrs)
+    recorded.end = end
+    tracer.finish(recorded)
+    return recorded
+
+
+class TraceIdFilter(logging.Filter):
+    """Stamps every log record with the trace id of the span it was logged in"""
+
+    def filter(self, record):
+        current = _current_span.get()
+        record.trace_id = current.trace_id if current else '-'
+        return True
+
+
+def install_log_filter():
+    """Add trace ids to records before they reach the (queued) root handlers"""
+    for handler in logging.getLogger().handlers:
+        if not any(isinstance(f, TraceIdFilter) for f in handler.filters):
+            handler.addFilter(TraceIdFilter())
+
+install_log_filter()
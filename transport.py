@@ -0,0 +1,86 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from logging_config import logger
+from config import HTTP_MAX_WORKERS
+
+# Options for every cloudscraper session
+SCRAPER_OPTIONS = {
+    'browser': {
+        'browser': 'firefox',
+        'platform': 'windows',
+        'mobile': False
+    },
+    'delay': 10
+}
+
+
+class ExecutorTransport:
+    """Runs blocking cloudscraper requests on a thread pool so the event loop stays free.
+
+    Each worker thread sends through its own cloudscraper session, since
+    a session keeps per-request challenge-solving state that is not
+    thread-safe. All of them share the cookie jar and headers of one
+    primary session, so a Cloudflare clearance or a login obtained on
+    any thread is used by every other one.
+    """
+
+    def __init__(self, max_workers: int = HTTP_MAX_WORKERS):
+        self._scraper = None
+        self._local = threading.local()
+        self._sessions = []  # every thread's session, for close()
+        self._sessions_lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix='aternos-http'
+        )
+
+    @property
+    def scraper(self):
+        """The primary cloudscraper session, holding the shared cookies; created on first use"""
+        with self._sessions_lock:
+            if self._scraper is None:
+                # Imported here: cloudscraper pulls in requests and its challenge
+                # interpreters, which is a noticeable share of bot startup
+                import cloudscraper
+                self._scraper = cloudscraper.create_scraper(**SCRAPER_OPTIONS)
+            return self._scraper
+
+    def _thread_session(self):
+        """This worker thread's session, sharing the primary's cookies and headers"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            import cloudscraper
+            with self._sessions_lock:
+                session = cloudscraper.create_scraper(sess=self.scraper, **SCRAPER_OPTIONS)
+                self._sessions.append(session)
+            self._local.session = session
+        return session
+
+    def _send(self, method, url, **kwargs):
+        return self._thread_session().request(method, url, **kwargs)
+
+    @property
+    def cookies(self):
+        return self.scraper.cookies
+
+    async def request(self, method, url, **kwargs):
+        """Send a request on a worker thread and await its response"""
+        loop = asyncio.get_running_loop()
+        # Carry the caller's context (e.g. its trace span) into the worker thread
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, self._send, method.upper(), url, **kwargs)
+        return await loop.run_in_executor(self._executor, call)
+
+    def close(self):
+        """Close pooled connections and stop the worker threads"""
+        try:
+            for session in self._sessions:
+                session.close()
+            if self._scraper is not None:
+                self._scraper.close()
+        finally:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            logger.debug("HTTP transport closed")